@@ -8,8 +8,16 @@ import platform
 import time
 import logging
 
-from service.index import Index
-from service.transform import HTMLFileMapper
+from service.index import INDEX_BACKEND, INDEX_CACHE_DIR, Index
+from service.transform import HTMLFileMapper, iter_jsonl_records
+
+# Arquivos de mapeamento aceitos, em ordem de preferência
+MAP_FILES = ("html_files_map.jsonl", "html_files_map.json")
+
+
+def find_map_file():
+    """Retorna o primeiro arquivo de mapeamento existente (ou o preferido, para gerá-lo)"""
+    return next((path for path in MAP_FILES if os.path.exists(path)), MAP_FILES[0])
 
 st.set_page_config(
     page_title="Navegador de Documentos IPEA",
@@ -18,6 +26,25 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource(show_spinner=False)
+def load_index_system(json_file_path, fingerprint, num_workers):
+    """
+    Carrega (ou constrói) os índices uma única vez por fingerprint.
+
+    O resultado é compartilhado entre todas as sessões do Streamlit; o
+    fingerprint faz parte da chave para que um novo mapeamento gere novos
+    índices. Entre reinícios do servidor, os índices vêm do cache em disco.
+    """
+    index_system = Index(json_file_path)
+    analyzer = index_system.start(
+        num_workers=num_workers, backend=INDEX_BACKEND, cache_dir=INDEX_CACHE_DIR
+    )
+    if analyzer is None:
+        # Exceções não são guardadas pelo cache_resource; None seria.
+        raise ValueError("Não foi possível criar o analisador de índices.")
+    return analyzer, index_system.documents
+
+
 class IPEANavigator:
     def __init__(self):
         self.analyzer = None
@@ -60,10 +87,17 @@ class IPEANavigator:
         })
 
     def load_data(self, json_file_path):
-        """Carrega os dados do arquivo JSON"""
+        """Carrega os dados do arquivo JSON (em JSON Lines, apenas os caminhos dos arquivos)"""
         try:
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                self.json_data = json.load(f)
+            if json_file_path.endswith('.jsonl'):
+                self.json_data = {'ipea': {}}
+                for record in iter_jsonl_records(json_file_path):
+                    date_key, subdir_name, file_name = record['id'].split('/', 2)
+                    subdirs = self.json_data['ipea'].setdefault(date_key, {})
+                    subdirs.setdefault(subdir_name, {})[file_name] = {'path': record['path']}
+            else:
+                with open(json_file_path, 'r', encoding='utf-8') as f:
+                    self.json_data = json.load(f)
             return True
         except Exception as e:
             st.error(f"Erro ao carregar arquivo JSON: {e}")
@@ -73,21 +107,23 @@ class IPEANavigator:
         """Inicializa o sistema de indexação"""
         try:
             if json_file_path is None:
-                json_file_path = "html_files_map.json"
+                json_file_path = find_map_file()
+
+            import multiprocessing
+            num_cpus = max(1, multiprocessing.cpu_count() // 2)
 
             if not os.path.exists(json_file_path):
                 st.info("Arquivo de mapeamento não encontrado. Gerando...")
-                import multiprocessing
-                num_cpus = max(1, multiprocessing.cpu_count() // 2)
                 st.info(f"Usando {num_cpus} processos paralelos")
 
-                mapper = HTMLFileMapper(num_workers=num_cpus)
+                mapper = HTMLFileMapper(output_file=json_file_path, num_workers=num_cpus)
                 result = mapper.run(extract_content=True)
                 st.success(f"Mapeamento concluído: {mapper.output_file}")
 
-            index_system = Index(json_file_path)
-            self.analyzer = index_system.start()
-            self.documents = index_system.documents
+            fingerprint = Index(json_file_path).fingerprint()
+            self.analyzer, self.documents = load_index_system(
+                json_file_path, fingerprint, num_cpus
+            )
 
             if self.analyzer:
                 self.analyzer.compare_indices()
@@ -150,7 +186,7 @@ def main():
 
     with st.sidebar:
         st.header("Configurações")
-        json_file_path = "html_files_map.json"
+        json_file_path = find_map_file()
 
         if os.path.exists(json_file_path):
             st.success(f"Arquivo encontrado: {json_file_path}")
@@ -266,7 +302,7 @@ def main():
                     processed_query = navigator.analyzer.processor.process_text(query)
 
                     start_time = time.time()
-                    results = selected_analyzer.rank_search(processed_query["tokens"])[:top_n]
+                    results = selected_analyzer.rank_search(processed_query["tokens"], top_k=top_n)
                     search_time = (time.time() - start_time) * 1000
 
                     if results:
@@ -311,7 +347,7 @@ def main():
                             for idx_name, idx in navigator.analyzer.indices.items():
                                 if idx_name != selected_index:
                                     start_time = time.time()
-                                    comp_results = idx.rank_search(processed_query["tokens"])[:5]
+                                    comp_results = idx.rank_search(processed_query["tokens"], top_k=5)
                                     comp_time = (time.time() - start_time) * 1000
 
                                     comparison_data.append({
@@ -4,7 +4,8 @@
 Módulo: drive.py
 ~~~~~~~~~~~~~~~~~
 
-inicializar o WebDriver Selenium (DriverManager).
+inicializar o WebDriver Selenium (DriverManager) e manter um pool de
+navegadores reutilizados entre extrações (DriverPool).
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 :author: AriHenrique
@@ -12,10 +13,16 @@ inicializar o WebDriver Selenium (DriverManager).
 """
 
 import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
 
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from urllib3.exceptions import HTTPError
 from webdriver_manager.chrome import ChromeDriverManager
 
 logging.basicConfig(
@@ -24,6 +31,28 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Falhas de um navegador que não responde: erro do WebDriver ou conexão perdida
+# com o chromedriver
+DRIVER_ERRORS = (WebDriverException, HTTPError, OSError)
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def resolve_driver_path():
+    """
+    Resolve (e baixa, se necessário) o binário do ChromeDriver uma única vez por processo.
+
+    :return: Caminho do executável do ChromeDriver.
+    :rtype: str
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = ChromeDriverManager().install()
+            logger.info(f"ChromeDriver: {_driver_path}")
+        return _driver_path
+
 
 class DriverManager:
     """
@@ -47,7 +76,7 @@ class DriverManager:
         :return: Instância do WebDriver configurado.
         :rtype: selenium.webdriver.Chrome
         """
-        chrome_service = Service(ChromeDriverManager().install())
+        chrome_service = Service(resolve_driver_path())
         chrome_options = Options()
 
         default_options = [
@@ -65,3 +94,158 @@ class DriverManager:
             chrome_options.add_argument(option)
         self.driver = webdriver.Chrome(service=chrome_service, options=chrome_options)
         return self.driver
+
+
+class DriverPool:
+    """
+    Pool de WebDrivers do Chrome reutilizados entre extrações.
+
+    Os navegadores são iniciados sob demanda, até ``size``, e devolvidos ao pool
+    ao fim de cada tarefa com o estado limpo (cookies, armazenamento local e
+    página em branco). Um navegador que não responde à limpeza é encerrado e
+    substituído na próxima requisição.
+    """
+
+    def __init__(self, size: int = 1, headless: bool = False):
+        """
+        Construtor da classe DriverPool.
+
+        :param size: Número máximo de navegadores abertos ao mesmo tempo.
+        :type size: int
+        :param headless: Define se os navegadores são iniciados sem interface gráfica.
+        :type headless: bool
+        """
+        self.size = max(1, size)
+        self.headless = headless
+        self._available = queue.Queue()
+        self._drivers = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self, timeout: float | None = None):
+        """
+        Obtém um navegador livre, iniciando um novo se o pool ainda não estiver cheio.
+
+        :param timeout: Tempo máximo de espera por um navegador livre, em segundos.
+        :type timeout: float
+        :return: Instância do WebDriver.
+        :rtype: selenium.webdriver.Chrome
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("DriverPool já foi encerrado")
+            try:
+                return self._available.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                position = len(self._drivers) + 1
+                start_new = position <= self.size
+                if start_new:
+                    # Reserva a vaga antes de iniciar o navegador, fora do lock
+                    self._drivers.append(None)
+            if start_new:
+                return self._start_driver(position)
+
+            # Espera em intervalos curtos: um navegador descartado libera uma vaga
+            # sem passar pela fila
+            wait = 1.0 if deadline is None else min(1.0, deadline - time.monotonic())
+            if wait <= 0:
+                raise queue.Empty
+            try:
+                return self._available.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    def _start_driver(self, position):
+        try:
+            driver = DriverManager().start_driver(headless=self.headless)
+        except Exception:
+            with self._lock:
+                self._drivers.remove(None)
+            raise
+        with self._lock:
+            self._drivers[self._drivers.index(None)] = driver
+        logger.info(f"Navegador iniciado no pool ({position}/{self.size})")
+        return driver
+
+    @staticmethod
+    def reset(driver):
+        """
+        Limpa o estado do navegador entre tarefas.
+
+        :param driver: Instância do WebDriver.
+        :type driver: selenium.webdriver.Chrome
+        """
+        driver.switch_to.default_content()
+        try:
+            driver.execute_script(
+                "window.localStorage.clear(); window.sessionStorage.clear();"
+            )
+        except WebDriverException:
+            # Páginas sem origem (about:blank, data:) não expõem o armazenamento
+            pass
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def release(self, driver):
+        """
+        Devolve um navegador ao pool, limpando seu estado.
+
+        :param driver: Instância do WebDriver obtida com ``acquire``.
+        :type driver: selenium.webdriver.Chrome
+        """
+        if not self._closed:
+            try:
+                self.reset(driver)
+                self._available.put(driver)
+                return
+            except DRIVER_ERRORS as e:
+                logger.warning(f"Navegador descartado após falha na limpeza: {e}")
+        self._discard(driver)
+
+    def _discard(self, driver):
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except DRIVER_ERRORS:
+            pass
+
+    @contextmanager
+    def driver(self, timeout: float | None = None):
+        """
+        Context manager que obtém um navegador e o devolve ao pool ao final.
+
+        :param timeout: Tempo máximo de espera por um navegador livre, em segundos.
+        :type timeout: float
+        """
+        driver = self.acquire(timeout=timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """
+        Encerra todos os navegadores do pool.
+        """
+        self._closed = True
+        with self._lock:
+            drivers = [driver for driver in self._drivers if driver is not None]
+            self._drivers = []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except DRIVER_ERRORS:
+                pass
+        logger.info(f"{len(drivers)} navegador(es) do pool encerrado(s)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,7 +1,7 @@
 import logging
 import multiprocessing
 
-from service.index import Index
+from service.index import INDEX_BACKEND, INDEX_CACHE_DIR, Index
 from service.transform import HTMLFileMapper
 
 logging.basicConfig(
@@ -13,13 +13,20 @@ if __name__ == "__main__":
     try:
         num_cpus = max(1, multiprocessing.cpu_count() // 2)
         logger.info(f"Iniciando processamento com {num_cpus} processos paralelos")
-        mapper = HTMLFileMapper(num_workers=num_cpus)
+        mapper = HTMLFileMapper(
+            output_file="html_files_map.jsonl", num_workers=num_cpus, incremental=True
+        )
         result = mapper.run(extract_content=True)
         logger.info(
             f"Mapeamento de arquivos HTML concluído. Arquivo de saída: {mapper.output_file}"
         )
 
-        analyzer = Index(mapper.output_file).start()
+        analyzer = Index(mapper.output_file).start(
+            num_workers=num_cpus,
+            backend=INDEX_BACKEND,
+            cache_dir=INDEX_CACHE_DIR,
+            keep_documents=False,
+        )
 
         if analyzer:
             analyzer.compare_indices()
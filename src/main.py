@@ -1,6 +1,13 @@
+import concurrent.futures
 import os
 
+from config.drive import DriverPool
+from service.catalog import write_catalog
+from service.client import HTTPClient, set_client
+from service.convert import PDFCache, PDFConversionService
 from service.extract import IPEAExtractor
+from service.state import CrawlState
+from service.upload import S3Uploader
 
 BUCKET = os.getenv(
     "BUCKET_NAME",
@@ -8,6 +15,47 @@ BUCKET = os.getenv(
     None,
 )
 
+# Extrações simultâneas, cada uma com seu navegador; o padrão é fixo porque cada
+# Chrome ocupa centenas de MB, independentemente do número de CPUs
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS") or 2)
+
+# Navegadores sem interface gráfica; HEADLESS=false abre as janelas (depuração com Xvfb)
+HEADLESS = (os.getenv("HEADLESS") or "true").lower() not in ("0", "false", "no")
+
+# "browser" abre cada série no Chrome; "http" baixa as páginas sem o navegador pelo
+# IPEA_SERIES_URL, ainda não validado (as falhas voltam ao navegador e são contadas)
+FETCH_MODE = os.getenv("FETCH_MODE") or "browser"
+
+# Threads de envio para o S3, compartilhadas por todas as extrações
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS") or 16)
+
+# Conversões de PDF simultâneas (pdftohtml); por padrão, uma por CPU
+PDF_WORKERS = int(os.getenv("PDF_WORKERS") or os.cpu_count() or 1)
+
+# Downloads simultâneos de páginas de séries por extração, no modo "http"
+HTTP_WORKERS = int(os.getenv("HTTP_WORKERS") or 8)
+
+
+def crawl(js, pool, prefix, uploader, pdf_service, crawl_state):
+    """
+    Executa a extração de um comando JavaScript com um navegador do pool e
+    retorna os registros do catálogo das séries extraídas.
+    """
+    with pool.driver() as driver:
+        extractor = IPEAExtractor(
+            js,
+            BUCKET,
+            prefix,
+            headless=HEADLESS,
+            driver=driver,
+            fetch_mode=FETCH_MODE,
+            uploader=uploader,
+            pdf_service=pdf_service,
+            http_workers=HTTP_WORKERS,
+            crawl_state=crawl_state,
+        )
+        return [extractor.series_record(data) for data in extractor.run_extraction()]
+
 
 def lambda_handler(event, context):
 
@@ -45,10 +93,83 @@ def lambda_handler(event, context):
 
     prefix = "ipea/"
 
-    for js in list_js:
-        extractor = IPEAExtractor(js, BUCKET, prefix, headless=True)
-        extractor.run_extraction()
+    workers = int((event or {}).get("crawl_workers", CRAWL_WORKERS))
+    workers = max(1, min(workers, len(list_js)))
+    print(f"Extraindo {len(list_js)} comandos com {workers} navegador(es)")
+
+    # Um pool de conexões para todas as extrações e conversões simultâneas
+    set_client(HTTPClient(pool_size=workers * HTTP_WORKERS + PDF_WORKERS))
+
+    failures = {}
+    records = []
+    uploader = S3Uploader(BUCKET, num_workers=UPLOAD_WORKERS)
+    # Com bucket, o cache de PDFs fica no S3 para sobreviver entre execuções
+    if BUCKET:
+        pdf_cache = PDFCache(
+            f"{prefix}pdf_cache/index.json", bucket_name=BUCKET, s3_client=uploader.s3
+        )
+    else:
+        pdf_cache = PDFCache()
+    pdf_service = PDFConversionService(uploader, pdf_cache, num_workers=PDF_WORKERS)
+    # Estado da extração anterior; "force_refresh" baixa todas as séries de novo
+    force = bool((event or {}).get("force_refresh"))
+    if BUCKET:
+        crawl_state = CrawlState(
+            f"{prefix}crawl_state/series.json",
+            bucket_name=BUCKET,
+            s3_client=uploader.s3,
+            force=force,
+        )
+    else:
+        crawl_state = CrawlState(force=force)
+    try:
+        with DriverPool(size=workers, headless=HEADLESS) as pool, concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers
+        ) as executor:
+            futures = {
+                executor.submit(
+                    crawl, js, pool, prefix, uploader, pdf_service, crawl_state
+                ): js
+                for js in list_js
+            }
+            for future in concurrent.futures.as_completed(futures):
+                js = futures[future]
+                try:
+                    dados = future.result()
+                    records.extend(dados)
+                    print(f"Concluído: {js} ({len(dados)} séries)")
+                except Exception as e:
+                    failures[js] = f"{type(e).__name__}: {e}"
+                    print(f"Falha em {js}: {failures[js]}")
+    finally:
+        # Conclui as conversões e os envios pendentes antes de encerrar
+        pdf_failures = pdf_service.close()
+        upload_failures = uploader.close()
+        pdf_cache.save(failed_keys=upload_failures)
+        crawl_state.save(failed_keys=upload_failures)
+    print(
+        f"{pdf_service.converted} PDF(s) convertido(s), "
+        f"{uploader.uploaded} arquivo(s) enviado(s), "
+        f"{crawl_state.skipped_fetch} série(s) sem novo período e "
+        f"{crawl_state.skipped_upload} página(s) sem alterações"
+    )
+
+    # Catálogo das séries da execução, em uma única gravação
+    try:
+        write_catalog(records, BUCKET, prefix)
+    except Exception as e:
+        failures["catalog"] = f"{type(e).__name__}: {e}"
+        print(f"Falha ao gravar o catálogo: {failures['catalog']}")
 
+    if failures or upload_failures or pdf_failures:
+        return {
+            "statusCode": 207,
+            "body": f"Extração concluída com {len(failures)} falha(s) em {len(list_js)} comandos "
+            f"e {len(upload_failures)} envio(s) com falha.",
+            "failures": failures,
+            "upload_failures": upload_failures,
+            "pdf_failures": pdf_failures,
+        }
     return {
         "statusCode": 200,
         "body": "Extração e envio para o S3 concluídos com sucesso.",
@@ -0,0 +1,94 @@
+"""
+Catálogo dos metadados das séries extraídas.
+
+Cada execução grava, de uma só vez, um conjunto Parquet particionado por
+``date=<data da extração>`` com uma linha por série: número, nome, unidade,
+frequência, período, comando de origem e a chave do HTML salvo. Consultas por
+frequência, unidade ou período leem o catálogo em vez de percorrer os arquivos.
+"""
+
+import os
+import shutil
+from datetime import datetime
+
+import pandas as pd
+
+CATALOG_DIR = "catalog"
+
+CATALOG_COLUMNS = [
+    "numero_js",
+    "nome",
+    "unidade",
+    "freq",
+    "periodo",
+    "iso_date",
+    "tema",
+    "html_key",
+]
+
+
+def catalog_path(bucket_name=None, prefix="ipea/"):
+    """Local do catálogo: s3://<bucket>/<prefixo>catalog ou <prefixo>catalog em disco"""
+    path = f"{prefix}/{CATALOG_DIR}".replace("//", "/")
+    return f"s3://{bucket_name}/{path}" if bucket_name else path
+
+
+def write_catalog(records, bucket_name=None, prefix="ipea/", date=None):
+    """
+    Grava os registros da execução como a partição ``date=`` do catálogo.
+
+    A partição do dia é substituída, então repetir a extração no mesmo dia não
+    duplica linhas.
+
+    Args:
+        records (list): Dicionários com as chaves de CATALOG_COLUMNS.
+        bucket_name (str, opcional): Bucket de destino; sem ele, grava em disco.
+        prefix (str): Prefixo (ou pasta) onde fica o catálogo.
+        date (str, opcional): Partição; por padrão, a data atual.
+
+    Returns:
+        str: Local do catálogo, ou None se não havia registros.
+    """
+    if not records:
+        return None
+    date = str(date or datetime.now().date())
+    df = pd.DataFrame.from_records(records, columns=CATALOG_COLUMNS)
+    df["numero_js"] = pd.to_numeric(df["numero_js"], errors="coerce").astype("Int64")
+    df["date"] = date
+    path = catalog_path(bucket_name, prefix)
+
+    if bucket_name:
+        import awswrangler as wr
+
+        wr.s3.to_parquet(
+            df=df,
+            path=path,
+            dataset=True,
+            partition_cols=["date"],
+            mode="overwrite_partitions",
+        )
+    else:
+        shutil.rmtree(os.path.join(path, f"date={date}"), ignore_errors=True)
+        df.to_parquet(path, partition_cols=["date"], index=False)
+    print(f"Catálogo com {len(df)} séries salvo em: {path} (date={date})")
+    return path
+
+
+def read_catalog(bucket_name=None, prefix="ipea/", date=None):
+    """
+    Lê o catálogo, opcionalmente só a partição de uma data.
+
+    Returns:
+        pandas.DataFrame: Uma linha por série extraída, com a coluna ``date``.
+    """
+    path = catalog_path(bucket_name, prefix)
+    if bucket_name:
+        import awswrangler as wr
+
+        return wr.s3.read_parquet(
+            path,
+            dataset=True,
+            partition_filter=(lambda p: p["date"] == str(date)) if date else None,
+        )
+    filters = [("date", "=", str(date))] if date else None
+    return pd.read_parquet(path, filters=filters)
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Conexões mantidas abertas por host; deve cobrir as requisições simultâneas
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE") or 32)
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def _retry_policy(max_retries, backoff):
+    options = {
+        "total": max_retries,
+        "backoff_factor": backoff,
+        "status_forcelist": RETRY_STATUS,
+        "allowed_methods": frozenset(["GET", "HEAD"]),
+        "raise_on_status": False,
+        "respect_retry_after_header": True,
+    }
+    try:
+        # Espalha as novas tentativas das várias threads (urllib3 >= 2)
+        return Retry(backoff_jitter=backoff, **options)
+    except TypeError:
+        return Retry(**options)
+
+
+class HTTPClient:
+    """
+    Cliente HTTP compartilhado pelas threads da extração.
+
+    Uma única sessão ``requests`` com pool de conexões (keep-alive) e novas
+    tentativas com espera exponencial para erros de conexão e respostas 429/5xx.
+    ``conditional_get`` envia If-None-Match / If-Modified-Since com os
+    validadores da última resposta da mesma URL e registra os novos.
+    """
+
+    def __init__(self, pool_size=None, max_retries=3, backoff=0.5, timeout=30):
+        """
+        Args:
+            pool_size (int, opcional): Conexões por host; por padrão, HTTP_POOL_SIZE.
+            max_retries (int): Novas tentativas por requisição.
+            backoff (float): Espera base, em segundos, entre tentativas.
+            timeout (float): Tempo máximo padrão de cada requisição.
+        """
+        self.pool_size = max(1, pool_size or HTTP_POOL_SIZE)
+        self.timeout = timeout
+        self.adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=_retry_policy(max_retries, backoff),
+        )
+        self.session = self.new_session()
+        self.validators = {}
+        self._lock = threading.Lock()
+
+    def new_session(self):
+        """
+        Sessão com cookies e cabeçalhos próprios que usa o pool de conexões do
+        cliente. Não deve ser fechada, pois isso fecharia o pool compartilhado.
+        """
+        session = requests.Session()
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+        return session
+
+    def get(self, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return self.session.get(url, **kwargs)
+
+    def conditional_get(self, url, validators=None, **kwargs):
+        """
+        GET condicional: 304 indica que o conteúdo não mudou.
+
+        Args:
+            url (str): URL do recurso.
+            validators (dict, opcional): {"etag", "last_modified"} conhecidos;
+                sem eles, usa os registrados pela última resposta da URL.
+
+        Returns:
+            requests.Response: Resposta do servidor.
+        """
+        if validators is None:
+            with self._lock:
+                validators = self.validators.get(url) or {}
+        headers = dict(kwargs.pop("headers", None) or {})
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        response = self.get(url, headers=headers, **kwargs)
+        if response.status_code == 200:
+            with self._lock:
+                self.validators[url] = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+        return response
+
+    def close(self):
+        self.session.close()
+
+
+def read_content(response, timeout=None, chunk_size=64 * 1024):
+    """
+    Lê o corpo de uma resposta obtida com ``stream=True``.
+
+    O timeout do requests vale para cada leitura do socket; aqui ``timeout`` é o
+    tempo máximo da transferência inteira, para que um servidor que envia o
+    corpo aos poucos não prenda quem baixa.
+
+    Raises:
+        TimeoutError: Se a transferência passar de ``timeout`` segundos.
+    """
+    if timeout is None:
+        return response.content
+    deadline = time.monotonic() + timeout
+    # read1 (urllib3 >= 2) devolve o que já chegou em vez de esperar chunk_size
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is not None:
+        parts = iter(lambda: read1(chunk_size, decode_content=True), b"")
+    else:
+        parts = response.iter_content(chunk_size)
+    chunks = []
+    try:
+        for chunk in parts:
+            chunks.append(chunk)
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Download excedeu {timeout}s: {response.url}")
+    finally:
+        response.close()
+    return b"".join(chunks)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Retorna o cliente HTTP compartilhado, criando-o na primeira chamada."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
+
+
+def set_client(client):
+    """Substitui o cliente compartilhado (por exemplo, com outro pool_size)."""
+    global _client
+    with _client_lock:
+        _client = client
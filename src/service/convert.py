@@ -1,105 +1,298 @@
+import hashlib
+import io
 import os
+import queue
+import re
 import shutil
 import subprocess
+import sys
 import tempfile
+import threading
+from datetime import datetime
 
-import requests
+from service.client import get_client, read_content
+from service.state import JSONStore
 
+# Diretório do cache de conversões quando ele é mantido em disco local
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR") or os.path.join(
+    tempfile.gettempdir(), "pdf_cache"
+)
 
-def pdf_to_html_string(pdf_source):
-    """
-    Converte um PDF (arquivo local ou URL) para HTML e retorna como string.
 
-    Parâmetros:
-    -----------
-    pdf_source : str
-        Caminho para o arquivo PDF local ou URL para um PDF online
-
-    Retorna:
-    --------
-    str
-        Conteúdo HTML como uma string
-    """
-    temp_dir = tempfile.mkdtemp()
+# Modos de conversão: "memory" passa o PDF ao pdftohtml por um memfd e lê o HTML
+# da saída padrão; "pdfminer" converte no próprio processo; "file" usa arquivos
+# temporários (necessário onde não há os.memfd_create)
+PDF_CONVERSION_MODES = ("memory", "pdfminer", "file")
+PDF_CONVERSION = os.getenv("PDF_CONVERSION") or "memory"
 
-    try:
-        if pdf_source.startswith("http://") or pdf_source.startswith("https://"):
-            temp_pdf = os.path.join(temp_dir, "temp_file.pdf")
-            response = requests.get(pdf_source, stream=True, timeout=30)
-            response.raise_for_status()
+PDFTOHTML_ARGS = ["pdftohtml", "-c", "-q", "-noframes", "-i"]
+# O modo complexo (-c) só grava em arquivos e ignora -stdout
+PDFTOHTML_STDOUT_ARGS = ["pdftohtml", "-q", "-noframes", "-i", "-stdout"]
+# Conversão pelo pdfminer em um processo à parte (PDF na entrada padrão, HTML na
+# saída), para que ela possa ser encerrada ao estourar o tempo máximo
+PDFMINER_ARGS = [sys.executable, "-m", "service.convert"]
 
-            with open(temp_pdf, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+_BODY_RE = re.compile(r"(<body[^>]*>)(.*)(</body>)", re.IGNORECASE | re.DOTALL)
+_PAGE_BREAK_RE = re.compile(r"<hr\s*/?>", re.IGNORECASE)
+_LINE_BREAK_RE = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_ANCHOR_RE = re.compile(r"<a\s+name=[^>]*>\s*</a>", re.IGNORECASE)
 
-            pdf_path = temp_pdf
-        else:
-            pdf_path = pdf_source
-        temp_html_base = os.path.join(temp_dir, "temp_output")
-        subprocess.run(
-            ["pdftohtml", "-c", "-q", "-noframes", "-i", pdf_path, temp_html_base],
-            check=True,
-        )
-        temp_html_file = temp_html_base + ".html"
+# Tempo máximo, em segundos, do download e da conversão de um PDF pelo
+# PDFConversionService
+PDF_TIMEOUT = float(os.getenv("PDF_TIMEOUT") or 120)
 
-        if not os.path.exists(temp_html_file):
-            raise FileNotFoundError("pdftohtml falhou ao gerar o arquivo HTML")
-        with open(temp_html_file, "r", encoding="utf-8", errors="replace") as f:
-            html_content = f.read()
-        enhanced_html = f"""<!DOCTYPE html>
+HTML_HEAD = """<!DOCTYPE html>
 <html lang="pt-BR">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>PDF Convertido</title>
     <style>
-        body {{ 
+        body { 
             font-family: Arial, sans-serif; 
             line-height: 1.6; 
             margin: 2em; 
             max-width: 1200px;
             margin: 0 auto;
             padding: 20px;
-        }}
-        table {{
+        }
+        table {
             border-collapse: collapse;
             margin: 15px 0;
             width: auto;
-        }}
-        td, th {{
+        }
+        td, th {
             border: 1px solid #ddd;
             padding: 8px;
-        }}
-        hr {{
+        }
+        hr {
             border: 0;
             height: 1px;
             background-color: #eee;
             margin: 30px 0;
-        }}
-        .pdf-page {{
+        }
+        .pdf-page {
             margin-bottom: 40px;
             padding-bottom: 20px;
             border-bottom: 1px solid #eee;
-        }}
+        }
     </style>
 </head>
 <body>
-{html_content}
+"""
+HTML_TAIL = """
 </body>
 </html>"""
 
-        return enhanced_html
+
+def _wrap_html(html_content):
+    return f"{HTML_HEAD}{html_content}{HTML_TAIL}"
+
+
+def _read_pdf(pdf_source, timeout=None):
+    """
+    Retorna o conteúdo do PDF (bytes, URL ou caminho local) em memória. O
+    download de uma URL é interrompido se passar de ``timeout`` segundos.
+    """
+    if isinstance(pdf_source, bytes):
+        return pdf_source
+    if pdf_source.startswith(("http://", "https://")):
+        response = get_client().get(pdf_source, stream=True, timeout=timeout)
+        response.raise_for_status()
+        return read_content(response, timeout)
+    with open(pdf_source, "rb") as f:
+        return f.read()
+
+
+def _pdftohtml_memory(content, timeout=None):
+    """
+    Executa o pdftohtml sobre um memfd, lendo o HTML da saída padrão.
+
+    Sem o modo complexo, que ignora -stdout, o texto vem em sequência; ele é
+    reorganizado no layout do modo complexo por ``_page_layout``.
+    """
+    fd = os.memfd_create("pdf")
+    try:
+        with open(fd, "wb", closefd=False) as f:
+            f.write(content)
+        result = subprocess.run(
+            PDFTOHTML_STDOUT_ARGS + [f"/dev/fd/{fd}"],
+            pass_fds=(fd,),
+            stdout=subprocess.PIPE,
+            check=True,
+            timeout=timeout,
+        )
+    finally:
+        os.close(fd)
+    return _page_layout(result.stdout.decode("utf-8", errors="replace"))
+
+
+def _page_layout(html_content):
+    """
+    Reorganiza a saída simples do pdftohtml no layout do modo complexo, lido por
+    extract_html_content_pdf_format: uma <div> por página (separadas por <hr/>)
+    e um <p> por linha (terminadas por <br/>).
+    """
+    match = _BODY_RE.search(html_content)
+    if match is None:
+        return html_content
+    pages = []
+    for number, page in enumerate(_PAGE_BREAK_RE.split(match.group(2)), start=1):
+        lines = (line.strip() for line in _LINE_BREAK_RE.split(_ANCHOR_RE.sub("", page)))
+        paragraphs = "".join(f"<p>{line}</p>\n" for line in lines if line)
+        if paragraphs:
+            pages.append(f'<div id="page{number}-div">\n{paragraphs}</div>\n')
+    return "".join(
+        (html_content[: match.end(1)], "\n", *pages, html_content[match.start(3) :])
+    )
+
+
+def _pdfminer_html(content, timeout=None):
+    """
+    Converte o PDF com o pdfminer. Com ``timeout``, a conversão roda em outro
+    processo (encerrado ao estourar o tempo e fora do GIL das demais threads).
+    """
+    if timeout is None:
+        return _pdfminer_html_in_process(content)
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src_dir, env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        PDFMINER_ARGS,
+        input=content,
+        capture_output=True,
+        check=False,
+        env=env,
+        timeout=timeout,
+    )
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", errors="replace").strip().splitlines()
+        raise RuntimeError(f"pdfminer falhou: {error[-1] if error else result.returncode}")
+    return result.stdout.decode("utf-8", errors="replace")
+
+
+def _pdfminer_html_in_process(content):
+    from pdfminer3.high_level import extract_text_to_fp
+    from pdfminer3.layout import LAParams
+
+    output = io.BytesIO()
+    extract_text_to_fp(
+        io.BytesIO(content), output, output_type="html", laparams=LAParams()
+    )
+    return output.getvalue().decode("utf-8", errors="replace")
+
+
+def pdf_bytes_to_text(content):
+    """
+    Extrai o texto de um PDF já baixado, em memória (pdfminer).
+
+    Parâmetros:
+    -----------
+    content : bytes
+        Conteúdo do PDF
+
+    Retorna:
+    --------
+    str
+        Texto do PDF
+    """
+    from pdfminer3.high_level import extract_text_to_fp
+    from pdfminer3.layout import LAParams
+
+    output = io.BytesIO()
+    extract_text_to_fp(io.BytesIO(content), output, laparams=LAParams())
+    return output.getvalue().decode("utf-8", errors="replace")
+
+
+def _conversion_error(e):
+    """Traduz a falha do pdftohtml, indicando quando ele não está instalado"""
+    try:
+        subprocess.run(
+            ["pdftohtml", "-h"], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except FileNotFoundError:
+        return Exception("pdftohtml não encontrado. Instale o pacote poppler-utils.")
+    return Exception(f"Erro ao executar pdftohtml: {e}")
+
+
+def pdf_to_html_string(pdf_source, mode=None, timeout=None):
+    """
+    Converte um PDF (arquivo local, URL ou conteúdo já baixado) para HTML e
+    retorna como string.
+
+    Parâmetros:
+    -----------
+    pdf_source : str ou bytes
+        Caminho para o arquivo PDF local, URL para um PDF online ou o conteúdo
+        do PDF
+    mode : str, opcional
+        Um de PDF_CONVERSION_MODES; por padrão, PDF_CONVERSION
+    timeout : float, opcional
+        Tempo máximo do pdftohtml; ao estourar, o processo é encerrado
+
+    Retorna:
+    --------
+    str
+        Conteúdo HTML como uma string
+    """
+    mode = mode or PDF_CONVERSION
+    if mode not in PDF_CONVERSION_MODES:
+        raise ValueError(f"Modo de conversão desconhecido: {mode}")
+    if mode == "file" or (mode == "memory" and not hasattr(os, "memfd_create")):
+        return _pdf_to_html_file(pdf_source, timeout)
+
+    try:
+        content = _read_pdf(pdf_source, timeout)
+        if mode == "pdfminer":
+            return _wrap_html(_pdfminer_html(content, timeout))
+        return _wrap_html(_pdftohtml_memory(content, timeout))
 
     except subprocess.CalledProcessError as e:
-        try:
-            subprocess.run(
-                ["pdftohtml", "-h"], stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-        except FileNotFoundError:
-            raise Exception(
-                "pdftohtml não encontrado. Instale o pacote poppler-utils."
-            ) from e
-        raise Exception(f"Erro ao executar pdftohtml: {e}") from e
+        raise _conversion_error(e) from e
+
+    except FileNotFoundError as e:
+        if e.filename == "pdftohtml":
+            raise _conversion_error(e) from e
+        raise Exception(f"Erro ao converter PDF para HTML: {e}") from e
+
+    except Exception as e:
+        raise Exception(f"Erro ao converter PDF para HTML: {e}") from e
+
+
+def _pdf_to_html_file(pdf_source, timeout=None):
+    """Conversão por arquivos temporários (modo "file")"""
+    temp_dir = tempfile.mkdtemp()
+
+    try:
+        if isinstance(pdf_source, bytes):
+            pdf_path = os.path.join(temp_dir, "temp_file.pdf")
+            with open(pdf_path, "wb") as f:
+                f.write(pdf_source)
+        elif pdf_source.startswith("http://") or pdf_source.startswith("https://"):
+            temp_pdf = os.path.join(temp_dir, "temp_file.pdf")
+            response = get_client().get(pdf_source, stream=True, timeout=timeout)
+            response.raise_for_status()
+
+            with open(temp_pdf, "wb") as f:
+                f.write(read_content(response, timeout))
+
+            pdf_path = temp_pdf
+        else:
+            pdf_path = pdf_source
+        temp_html_base = os.path.join(temp_dir, "temp_output")
+        subprocess.run(
+            PDFTOHTML_ARGS + [pdf_path, temp_html_base], check=True, timeout=timeout
+        )
+        temp_html_file = temp_html_base + ".html"
+
+        if not os.path.exists(temp_html_file):
+            raise FileNotFoundError("pdftohtml falhou ao gerar o arquivo HTML")
+        with open(temp_html_file, "r", encoding="utf-8", errors="replace") as f:
+            html_content = f.read()
+        return _wrap_html(html_content)
+
+    except subprocess.CalledProcessError as e:
+        raise _conversion_error(e) from e
 
     except Exception as e:
         raise Exception(f"Erro ao converter PDF para HTML: {e}") from e
@@ -146,5 +339,233 @@ def process_pdf_urls(urls):
     return results
 
 
-def convert_pdf(url):
-    return convert_pdf_from_url(url)
+class PDFCache(JSONStore):
+    """
+    Cache de conversões de PDF entre execuções.
+
+    Guarda, por URL, o ETag, o Last-Modified e o SHA-256 do último PDF
+    convertido e a chave onde o HTML foi salvo. O índice é um JSON em disco
+    local ou, com ``bucket_name``, um objeto no S3. Também evita que o mesmo
+    PDF, referenciado por várias séries, seja baixado mais de uma vez na mesma
+    execução.
+    """
+
+    def __init__(self, path=None, bucket_name=None, s3_client=None):
+        """
+        Parâmetros:
+        -----------
+        path : str, opcional
+            Caminho do índice (chave do objeto, se houver bucket)
+        bucket_name : str, opcional
+            Bucket onde o índice é mantido; sem ele, o índice fica em disco
+        s3_client : opcional
+            Cliente S3 usado para ler e gravar o índice no bucket
+        """
+        super().__init__(
+            path or os.path.join(PDF_CACHE_DIR, "index.json"), bucket_name, s3_client
+        )
+        self._claimed = set()
+
+    def claim(self, url):
+        """Retorna True só na primeira vez que a URL é pedida nesta execução"""
+        with self._lock:
+            if url in self._claimed:
+                return False
+            self._claimed.add(url)
+            return True
+
+    def save(self, failed_keys=()):
+        """
+        Grava o índice, descartando os PDFs cujo HTML não chegou a ser enviado
+        para que sejam convertidos de novo na próxima execução.
+        """
+        failed_keys = set(failed_keys)
+        if failed_keys:
+            with self._lock:
+                self.entries = {
+                    url: entry
+                    for url, entry in self.entries.items()
+                    if entry.get("key") not in failed_keys
+                }
+        super().save()
+
+
+def convert_pdf_cached(url, cache, timeout=None, key=None):
+    """
+    Converte o PDF da URL apenas se ele mudou desde a última conversão.
+
+    A requisição é condicional (If-None-Match / If-Modified-Since) com os
+    validadores guardados no cache; se o servidor responder 200, o SHA-256 do
+    conteúdo ainda evita reconverter um PDF idêntico. ``key`` é a chave onde o
+    HTML será salvo, registrada para que ``PDFCache.save`` descarte a entrada
+    se o envio falhar.
+
+    Retorna:
+    --------
+    str ou None
+        Conteúdo HTML, ou None se o PDF não mudou
+    """
+    entry = cache.get(url) or {}
+    response = get_client().conditional_get(url, entry, stream=True, timeout=timeout)
+    if response.status_code == 304:
+        response.close()
+        return None
+    response.raise_for_status()
+
+    content = read_content(response, timeout)
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": hashlib.sha256(content).hexdigest(),
+    }
+    if entry.get("sha256") == validators["sha256"]:
+        cache.put(url, {**entry, **validators})
+        return None
+
+    html_string = pdf_to_html_string(content, timeout=timeout)
+    entry = {**validators, "converted_at": datetime.now().isoformat()}
+    if key is not None:
+        entry["key"] = key
+    cache.put(url, entry)
+    return html_string
+
+
+def convert_pdf(url, cache=None, timeout=None):
+    if cache is None and timeout is None:
+        return convert_pdf_from_url(url)
+    try:
+        if cache is None:
+            html_string = pdf_to_html_string(url, timeout=timeout)
+        else:
+            html_string = convert_pdf_cached(url, cache, timeout)
+    except Exception as e:
+        print(f"Erro: {e}")
+        return None
+    if html_string is None:
+        print(f"PDF sem alterações desde a última conversão: {url}")
+    return html_string
+
+
+_STOP = object()
+
+
+class PDFConversionService:
+    """
+    Conversão de PDFs em segundo plano durante toda a execução.
+
+    As extrações enfileiram ``(url, chave)`` com ``submit``; um número fixo de
+    threads (por padrão, uma por CPU) converte cada PDF uma única vez na execução
+    e entrega o HTML ao uploader. A fila é limitada, então as extrações esperam
+    quando a conversão fica para trás. O download e a conversão têm, cada um, um
+    tempo máximo; a conversão (pdftohtml ou pdfminer) roda sempre em outro
+    processo, que é encerrado ao estourá-lo, registrando a falha sem travar as
+    demais conversões.
+    """
+
+    def __init__(
+        self, uploader, cache=None, num_workers=None, queue_size=None, timeout=None
+    ):
+        """
+        Parâmetros:
+        -----------
+        uploader : S3Uploader
+            Destino do HTML convertido
+        cache : PDFCache, opcional
+            Cache de conversões entre execuções
+        num_workers : int, opcional
+            Conversões simultâneas; por padrão, o número de CPUs
+        queue_size : int, opcional
+            PDFs aguardando conversão; por padrão, o dobro de num_workers
+        timeout : float, opcional
+            Tempo máximo de cada conversão; por padrão, PDF_TIMEOUT
+        """
+        self.uploader = uploader
+        self.cache = cache
+        self.timeout = timeout or PDF_TIMEOUT
+        num_workers = max(1, num_workers or os.cpu_count() or 1)
+        self.failures = {}
+        self.converted = 0
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._queue = queue.Queue(maxsize=queue_size or 2 * num_workers)
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"pdf-convert-{i}", daemon=True)
+            for i in range(num_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, url, key):
+        """
+        Enfileira a conversão do PDF da URL, com o HTML enviado para ``key``.
+
+        Retorna False, sem enfileirar, se a URL já foi pedida nesta execução.
+        """
+        if self._closed:
+            raise RuntimeError("PDFConversionService já foi encerrado")
+        with self._lock:
+            if url in self._seen:
+                return False
+            self._seen.add(url)
+        self._queue.put((url, key))
+        return True
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._convert(*item)
+            finally:
+                self._queue.task_done()
+
+    def _convert(self, url, key):
+        try:
+            if self.cache is None:
+                html_string = pdf_to_html_string(url, timeout=self.timeout)
+            else:
+                html_string = convert_pdf_cached(url, self.cache, self.timeout, key)
+        except Exception as e:
+            with self._lock:
+                self.failures[url] = str(e)
+            print(f"Erro ao processar {url}: {e}")
+            return
+        if html_string is None:
+            print(f"PDF sem alterações desde a última conversão: {url}")
+            return
+        with self._lock:
+            self.converted += 1
+        print(f"Extraído com sucesso: {url}")
+        self.uploader.submit(key, html_string)
+
+    def close(self):
+        """
+        Conclui as conversões pendentes e encerra as threads.
+
+        Retorna:
+        --------
+        dict
+            URL -> erro dos PDFs que não puderam ser convertidos
+        """
+        if not self._closed:
+            self._closed = True
+            for _ in self._threads:
+                self._queue.put(_STOP)
+            for thread in self._threads:
+                thread.join()
+        return dict(self.failures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    # Processo de conversão do pdfminer usado por _pdfminer_html
+    sys.stdout.buffer.write(
+        _pdfminer_html_in_process(sys.stdin.buffer.read()).encode("utf-8")
+    )
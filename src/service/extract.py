@@ -1,19 +1,50 @@
 import concurrent.futures
+import json
 import os
 import re
 import time
 import unicodedata
 from datetime import datetime
 
-import boto3
 import chardet
-from selenium.common.exceptions import StaleElementReferenceException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
 from config import drive
+from service.client import get_client
 from service.convert import convert_pdf
+from service.upload import S3Uploader
+
+# Página de detalhe de uma série, aberta no site por javascript:show(<id>), usada
+# pelo modo "http". O endereço ainda não foi validado contra o site; cada série que
+# falha por HTTP é contada em IPEAExtractor.http_fallbacks e aberta pelo navegador
+SERIES_URL_TEMPLATE = os.getenv(
+    "IPEA_SERIES_URL", "http://www.ipeadata.gov.br/ExibeSerie.aspx?serid={}&module=M"
+)
+
+FETCH_MODES = ("browser", "http")
+
+# Lê todas as linhas da grade de uma vez: [href, nome, unidade, freq, periodo]
+GRID_ROWS_SCRIPT = """
+var table = document.getElementById("grid_DXMainTable");
+var rows = table ? table.getElementsByTagName("tr") : [];
+var result = [];
+for (var i = 1; i < rows.length; i++) {
+    var cells = rows[i].getElementsByTagName("td");
+    if (cells.length < 5) continue;
+    var link = cells[1].getElementsByTagName("a")[0];
+    if (!link) continue;
+    result.push([
+        link.href || "",
+        link.innerText.trim(),
+        cells[2].innerText.trim(),
+        cells[3].innerText.trim(),
+        cells[4].innerText.trim()
+    ]);
+}
+return JSON.stringify(result);
+"""
 
 
 class IPEAExtractor:
@@ -23,13 +54,55 @@ class IPEAExtractor:
         bucket_name=None,
         s3_key_prefix="ipeadata",
         headless: bool = False,
+        driver=None,
+        fetch_mode="browser",
+        http_workers=8,
+        uploader=None,
+        pdf_cache=None,
+        pdf_service=None,
+        http_client=None,
+        crawl_state=None,
     ):
+        """
+        Args:
+            fetch_mode (str): "browser" abre cada série no navegador; "http" usa o
+                navegador só para listar a grade e baixa as páginas das séries por
+                HTTP, em paralelo, voltando ao navegador nas que falharem.
+            http_workers (int): Downloads simultâneos no modo "http".
+            uploader (S3Uploader, opcional): Envio em segundo plano compartilhado;
+                sem ele a extração cria o seu e aguarda os envios ao terminar.
+            pdf_cache (PDFCache, opcional): Cache de conversões de PDF entre
+                execuções; PDFs inalterados não são convertidos nem reenviados.
+            pdf_service (PDFConversionService, opcional): Conversão de PDFs em
+                segundo plano, compartilhada pela execução; sem ela os PDFs de
+                cada página são convertidos antes de seguir para a próxima.
+            http_client (HTTPClient, opcional): Pool de conexões usado no modo
+                "http"; por padrão, o cliente compartilhado do processo.
+            crawl_state (CrawlState, opcional): Estado da extração anterior;
+                séries sem novo período não são baixadas e páginas idênticas
+                às já salvas não são reenviadas.
+        """
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"Modo de extração desconhecido: {fetch_mode}")
         self.url = "http://www.ipeadata.gov.br/Default.aspx"
+        self.series_url = SERIES_URL_TEMPLATE
+        self.fetch_mode = fetch_mode
+        self.http_workers = http_workers
         self.javascript_command = javascript_command
         self.bucket_name = bucket_name
         self.s3_key_prefix = s3_key_prefix
-        self.driver = drive.DriverManager().start_driver(headless=False)
-        self.s3 = boto3.client("s3") if bucket_name else None
+        # Um driver recebido (por exemplo, de um drive.DriverPool) pertence a quem o
+        # forneceu e não é encerrado ao fim da extração
+        self.owns_driver = driver is None
+        self.driver = driver or drive.DriverManager().start_driver(headless=headless)
+        self.owns_uploader = uploader is None
+        self.uploader = uploader or S3Uploader(bucket_name)
+        self.pdf_cache = pdf_cache
+        self.pdf_service = pdf_service
+        self.http_client = http_client or get_client()
+        self.crawl_state = crawl_state
+        # Séries que falharam por HTTP e foram abertas pelo navegador
+        self.http_fallbacks = 0
 
     @staticmethod
     def __sanitize_filename(input_string):
@@ -75,84 +148,148 @@ class IPEAExtractor:
     def run_extraction(self):
         self.driver.get(self.url)
         self.driver.execute_script(f"javascript:{self.javascript_command}")
+        self.__wait_grid(10, 15)
+        rows = self.__list_rows()
+
+        unchanged = []
+        if self.crawl_state is not None:
+            pending = []
+            for data in rows:
+                if self.crawl_state.period_unchanged(data[0], data[4]):
+                    unchanged.append(data)
+                else:
+                    pending.append(data)
+            print(f"{len(unchanged)} série(s) sem novo período não serão baixadas")
+            rows = pending
+
+        if self.fetch_mode == "http":
+            dados = self.__fetch_rows_http(rows)
+        else:
+            dados = self.__fetch_rows_browser(rows)
+        # As séries sem novo período continuam no resultado (e no catálogo), com
+        # a página salva na extração anterior
+        dados.extend(unchanged)
+
+        if self.owns_driver:
+            self.driver.quit()
+        if self.owns_uploader:
+            self.uploader.close()
+        return dados
 
-        iframe = WebDriverWait(self.driver, 10).until(
+    def __wait_grid(self, iframe_timeout=30, table_timeout=30):
+        iframe = WebDriverWait(self.driver, iframe_timeout).until(
             EC.presence_of_element_located((By.TAG_NAME, "iframe"))
         )
         self.driver.switch_to.frame(iframe)
-
-        table = WebDriverWait(self.driver, 15).until(
+        return WebDriverWait(self.driver, table_timeout).until(
             EC.presence_of_element_located((By.ID, "grid_DXMainTable"))
         )
 
+    def __list_rows(self):
+        """
+        Lê as linhas da grade de séries: [numero_js, nome, unidade, freq, periodo, iso_date]
+
+        A grade inteira é lida em uma única chamada ao navegador (GRID_ROWS_SCRIPT),
+        em vez de uma consulta por linha e célula, e o processamento segue sobre
+        essa cópia, sem referências a elementos que possam ficar obsoletas.
+        """
+        rows_data = []
+        for href, nome, unidade, freq, periodo in json.loads(
+            self.driver.execute_script(GRID_ROWS_SCRIPT)
+        ):
+            match = re.search(r"javascript:show\((\d+)\)", href)
+            numero_js = match.group(1) if match else ""
+            iso_date = self.__convert_date(periodo)
+            rows_data.append([numero_js, nome, unidade, freq, periodo, iso_date])
+        return rows_data
+
+    def __fetch_rows_browser(self, rows):
+        """Abre cada série no navegador, salva a página e volta para a grade"""
         dados = []
-        max_attempts = 3
+        for data in rows:
+            print(data)
+            html_utf8 = self.__extract_html(data)
+            if self.__store_series(data, html_utf8):
+                self.extract_pdf_links(html_utf8)
+            self.driver.back()
+            time.sleep(1)
+            self.__wait_grid()
+            dados.append(data)
+        return dados
+
+    def __http_session(self):
+        """Sessão HTTP com os cookies do navegador sobre o pool de conexões compartilhado"""
+        session = self.http_client.new_session()
+        session.headers.update(
+            {
+                "User-Agent": self.driver.execute_script("return navigator.userAgent"),
+                "Referer": self.url,
+            }
+        )
+        for cookie in self.driver.get_cookies():
+            session.cookies.set(
+                cookie["name"],
+                cookie["value"],
+                domain=cookie.get("domain"),
+                path=cookie.get("path", "/"),
+            )
+        return session
+
+    def __fetch_rows_http(self, rows):
+        """
+        Baixa as páginas das séries por HTTP, em paralelo.
 
-        for i in range(1, len(table.find_elements(By.TAG_NAME, "tr"))):
-            attempts = 0
-            while attempts < max_attempts:
+        Séries cuja resposta não é uma página válida são abertas em seguida pelo
+        navegador, como no modo "browser".
+        """
+        dados = []
+        fallback = []
+        # A sessão não é fechada: o pool de conexões é do cliente compartilhado
+        session = self.__http_session()
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, self.http_workers)
+        ) as executor:
+            futures = {
+                executor.submit(self.__fetch_html, session, data): data for data in rows
+            }
+            for future in concurrent.futures.as_completed(futures):
+                data = futures[future]
                 try:
-                    rows = table.find_elements(By.TAG_NAME, "tr")
-                    cells = rows[i].find_elements(By.TAG_NAME, "td")
-                    if not cells:
-                        break
-                    try:
-                        link_element = cells[1].find_element(By.TAG_NAME, "a")
-                        href = link_element.get_attribute("href")
-                        nome = link_element.text
-                    except Exception:
-                        break
-                    match = re.search(r"javascript:show\((\d+)\)", href)
-                    numero_js = match.group(1) if match else ""
-                    unidade = cells[2].text
-                    freq = cells[3].text
-                    periodo = cells[4].text
-                    iso_date = self.__convert_date(periodo)
-                    data = [numero_js, nome, unidade, freq, periodo, iso_date]
-                    print(data)
-                    html_utf8 = self.__extract_html(data)
+                    html_utf8 = future.result()
+                except Exception as e:
+                    print(f"Erro ao baixar a série {data[0]} por HTTP: {e}")
+                    html_utf8 = None
+                if html_utf8 is None:
+                    fallback.append(data)
+                    continue
+                print(data)
+                if self.__store_series(data, html_utf8):
                     self.extract_pdf_links(html_utf8)
-                    self.driver.back()
-                    time.sleep(1)
-                    iframe = WebDriverWait(self.driver, 30).until(
-                        EC.presence_of_element_located((By.TAG_NAME, "iframe"))
-                    )
-                    self.driver.switch_to.frame(iframe)
-                    table = WebDriverWait(self.driver, 30).until(
-                        EC.presence_of_element_located((By.ID, "grid_DXMainTable"))
-                    )
-                    dados.append(data)
-                    break
-                except StaleElementReferenceException:
-                    attempts += 1
-                    if attempts == max_attempts:
-                        print(
-                            f"Failed to process row {i} after {max_attempts} attempts"
-                        )
-                        break
-        self.driver.quit()
+                dados.append(data)
+
+        if fallback:
+            self.http_fallbacks += len(fallback)
+            print(
+                f"{len(fallback)} de {len(rows)} série(s) falharam por HTTP "
+                f"({self.series_url}) e serão abertas pelo navegador"
+            )
+            dados.extend(self.__fetch_rows_browser(fallback))
         return dados
 
+    def __fetch_html(self, session, data):
+        response = session.get(
+            self.series_url.format(int(data[0])), timeout=self.http_client.timeout
+        )
+        if response.status_code != 200 or b"<table" not in response.content.lower():
+            return None
+        return self.__convert_to_utf8(response.content)
+
+    def __object_key(self, file_name, key):
+        return f"{self.s3_key_prefix}/{key}/{file_name}".replace("//", "/")
+
     def __upload_to_s3(self, file_name, key, content):
-        _key = f"{self.s3_key_prefix}/{key}/{file_name}".replace("//", "/")
-        if isinstance(content, str):
-            content_bytes = content.encode("utf-8")
-        else:
-            content_bytes = content
-
-        if self.bucket_name:
-            self.s3.put_object(
-                Bucket=self.bucket_name,
-                Key=_key,
-                Body=content_bytes,
-                ContentType="text/html",
-            )
-            print(f"Arquivo salvo no S3 em: s3://{self.bucket_name}/{key}")
-        else:
-            folder = f"{self.s3_key_prefix}/{key}"
-            os.makedirs(folder, exist_ok=True)
-            with open(_key, "wb") as f:
-                f.write(content_bytes)
+        """Enfileira o arquivo no uploader; o envio ocorre em segundo plano"""
+        self.uploader.submit(self.__object_key(file_name, key), content)
 
     def __extract_html(self, data):
         numero_js = data[0]
@@ -160,11 +297,41 @@ class IPEAExtractor:
         WebDriverWait(self.driver, 10).until(
             EC.presence_of_element_located((By.TAG_NAME, "table"))
         )
+        return self.__convert_to_utf8(self.driver.page_source)
+
+    def __store_series(self, data, html_utf8):
+        """
+        Envia a página da série; retorna False, sem enviar, se ela é idêntica à
+        salva na extração anterior.
+        """
+        file_name, folder = self.__series_location(data)
+        if self.crawl_state is not None and self.crawl_state.content_unchanged(
+            data[0], data[4], html_utf8, self.__object_key(file_name, folder)
+        ):
+            print(f"Série {data[0]} sem alterações, envio dispensado")
+            return False
+        self.__upload_to_s3(file_name, folder, html_utf8)
+        return True
+
+    def __series_location(self, data):
+        """Retorna (nome do arquivo, pasta) da página de uma série"""
         folder_name = self.__sanitize_filename("==".join(data[1:4]))
         file_name = self.__sanitize_filename("_".join(data)) + ".html"
-        html_utf8 = self.__convert_to_utf8(self.driver.page_source)
-        self.__upload_to_s3(file_name, f"date={data[-1]}/{folder_name}", html_utf8)
-        return html_utf8
+        return file_name, f"date={data[-1]}/{folder_name}"
+
+    def series_record(self, data):
+        """Registro do catálogo (service.catalog) de uma linha retornada pela extração"""
+        numero_js, nome, unidade, freq, periodo, iso_date = data
+        return {
+            "numero_js": numero_js,
+            "nome": nome,
+            "unidade": unidade,
+            "freq": freq,
+            "periodo": periodo,
+            "iso_date": iso_date,
+            "tema": self.javascript_command,
+            "html_key": self.__object_key(*self.__series_location(data)),
+        }
 
     def extract_pdf_links(self, html_utf8):
         """
@@ -188,14 +355,23 @@ class IPEAExtractor:
         for link in relative_pdf_links:
             absolute_link = link.replace("../", f"{base_url}/")
             absolute_pdf_links.append(absolute_link)
-        if len(absolute_pdf_links):
-            result = self.extract_pdfs_in_parallel(list(set(absolute_pdf_links)))
-            for html_name in result:
-                name = (
-                    html_name.split("/doc/")[-1]
-                    .replace(" ", "_")
-                    .replace(".pdf", ".html")
+        if len(absolute_pdf_links) and self.pdf_service is not None:
+            for url in set(absolute_pdf_links):
+                self.pdf_service.submit(
+                    url,
+                    self.__object_key(
+                        self.__pdf_html_name(url),
+                        f"pdf_to_html/date={datetime.now().date()}/",
+                    ),
                 )
+        elif len(absolute_pdf_links):
+            pdf_urls = set(absolute_pdf_links)
+            if self.pdf_cache is not None:
+                # PDFs já tratados por outra página nesta execução
+                pdf_urls = [url for url in pdf_urls if self.pdf_cache.claim(url)]
+            result = self.extract_pdfs_in_parallel(list(pdf_urls), cache=self.pdf_cache)
+            for html_name in result:
+                name = self.__pdf_html_name(html_name)
                 if result[html_name]:
                     content = result[html_name]
                     if isinstance(content, str):
@@ -207,20 +383,28 @@ class IPEAExtractor:
             print("nao possui links para pdfs")
 
     @staticmethod
-    def extract_pdfs_in_parallel(pdf_urls, max_workers=5):
+    def __pdf_html_name(url):
+        return url.split("/doc/")[-1].replace(" ", "_").replace(".pdf", ".html")
+
+    @staticmethod
+    def extract_pdfs_in_parallel(pdf_urls, max_workers=5, cache=None):
         """
         Realiza a extração de múltiplos PDFs em paralelo.
 
         Args:
             pdf_urls (list): Lista de URLs de PDFs para processar.
             max_workers (int, opcional): Número máximo de workers para processamento paralelo.
+            cache (PDFCache, opcional): Cache de conversões; PDFs inalterados
+                retornam None.
 
         Returns:
             dict: Dicionário com as URLs como chaves e o conteúdo HTML como valores.
         """
         results = {}
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_url = {executor.submit(convert_pdf, url): url for url in pdf_urls}
+            future_to_url = {
+                executor.submit(convert_pdf, url, cache): url for url in pdf_urls
+            }
             for future in concurrent.futures.as_completed(future_to_url):
                 url = future_to_url[future]
                 try:
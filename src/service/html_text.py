@@ -0,0 +1,249 @@
+"""
+Conversão de HTML na estrutura de dicionários do html_to_json em uma única passada.
+
+``html_to_json.convert`` monta a árvore completa do BeautifulSoup (com atributos)
+e depois a percorre recursivamente para gerar o dicionário. Aqui o dicionário é
+montado diretamente pelos eventos do ``html.parser``, reproduzindo as regras de
+árvore do BeautifulSoup com o parser ``html.parser``:
+
+- elementos vazios (``br``, ``img``, ...) e ``<tag/>`` são fechados na abertura;
+- uma tag de fechamento fecha a tag aberta mais recente com o mesmo nome e é
+  ignorada se não houver nenhuma;
+- texto contíguo vira um único nó; comentários, DOCTYPE, CDATA e instruções de
+  processamento viram nós próprios.
+
+Cada nó de texto é registrado como no html_to_json: o primeiro em ``_value``, os
+seguintes em ``_values``. Atributos não são capturados, pois a extração de texto
+não os usa.
+
+``find_cell_values`` segue as mesmas regras, mas não monta a árvore: acompanha só
+os caminhos pedidos (como ``["table"][0]["tbody"][0]``) e para de ler o HTML assim
+que a célula procurada é fechada ou deixa de poder existir.
+"""
+
+import html
+from html.entities import html5
+from html.parser import HTMLParser
+
+# Mesmas tags tratadas como vazias pelo BeautifulSoup (HTMLTreeBuilder)
+EMPTY_ELEMENT_TAGS = frozenset(
+    [
+        "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen",
+        "link", "menuitem", "meta", "param", "source", "track", "wbr",
+        "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid",
+        "spacer",
+    ]
+)
+
+
+def _record_value(text, node):
+    """Registra um nó de texto no dicionário do elemento, como o html_to_json"""
+    text = text.strip()
+    if text:
+        if node.get("_value"):
+            node["_values"] = [node["_value"], text]
+            del node["_value"]
+        elif node.get("_values"):
+            node["_values"].append(text)
+        else:
+            node["_value"] = text
+
+
+class _DictTreeParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.root = {}
+        self._stack = [("", self.root)]
+        self._data = []
+        self._closed_empty = []
+
+    def _end_data(self):
+        if self._data:
+            _record_value("".join(self._data), self._stack[-1][1])
+            self._data = []
+
+    def _open(self, tag):
+        self._end_data()
+        node = {}
+        parent = self._stack[-1][1]
+        if not parent.get(tag):
+            parent[tag] = []
+        parent[tag].append(node)
+        self._stack.append((tag, node))
+
+    def _close(self, tag):
+        self._end_data()
+        for i in range(len(self._stack) - 1, 0, -1):
+            if self._stack[i][0] == tag:
+                del self._stack[i:]
+                return
+
+    def handle_starttag(self, tag, attrs):
+        self._open(tag)
+        if tag in EMPTY_ELEMENT_TAGS:
+            self._close(tag)
+            self._closed_empty.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_empty:
+            self._closed_empty.remove(tag)
+        else:
+            self._close(tag)
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_charref(self, name):
+        self._data.append(html.unescape(f"&#{name};"))
+
+    def handle_entityref(self, name):
+        self._data.append(html5.get(f"{name};", f"&{name}"))
+
+    def _special(self, data):
+        self._end_data()
+        self._data.append(data)
+        self._end_data()
+
+    def handle_comment(self, data):
+        self._special(data)
+
+    def handle_decl(self, decl):
+        self._special(decl[len("DOCTYPE "):])
+
+    def unknown_decl(self, data):
+        if data.upper().startswith("CDATA["):
+            data = data[len("CDATA["):]
+        self._special(data)
+
+    def handle_pi(self, data):
+        self._special(data)
+
+    def close(self):
+        super().close()
+        self._end_data()
+
+
+def html_to_dict(html_string):
+    """
+    Converte HTML no dicionário aninhado do ``html_to_json.convert``, sem atributos.
+
+    Args:
+        html_string (str): Conteúdo HTML.
+
+    Returns:
+        dict: Nome da tag -> lista de elementos filhos, com ``_value``/``_values``.
+    """
+    parser = _DictTreeParser()
+    parser.feed(html_string)
+    parser.close()
+    return parser.root
+
+
+class _CellFound(Exception):
+    pass
+
+
+class _CellTextParser(_DictTreeParser):
+    """
+    Percorre o HTML com as regras de _DictTreeParser guardando, por elemento, só a
+    contagem de filhos por tag e os caminhos dos quais ele é prefixo.
+    """
+
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+        # Por caminho: None enquanto pendente, a lista de textos se encontrado
+        # ou False se a célula não existe (ou não tem ``_values``)
+        self.results = [None] * len(paths)
+        self.root = self._node([(p, 0) for p in range(len(paths))])
+        self._stack = [("", self.root)]
+
+    @staticmethod
+    def _node(matches, texts=None):
+        return {"counts": {}, "matches": matches, "texts": texts}
+
+    def _end_data(self):
+        if self._data:
+            texts = self._stack[-1][1]["texts"]
+            text = "".join(self._data).strip()
+            if texts is not None and text:
+                texts.append(text)
+            self._data = []
+
+    def _open(self, tag):
+        self._end_data()
+        parent = self._stack[-1][1]
+        index = parent["counts"].get(tag, 0)
+        parent["counts"][tag] = index + 1
+        matches = [
+            (p, level + 1)
+            for p, level in parent["matches"]
+            if self.results[p] is None
+            and level < len(self.paths[p])
+            and self.paths[p][level] == (tag, index)
+        ]
+        is_target = any(level == len(self.paths[p]) for p, level in matches)
+        self._stack.append((tag, self._node(matches, [] if is_target else None)))
+
+    def _close(self, tag):
+        self._end_data()
+        for i in range(len(self._stack) - 1, 0, -1):
+            if self._stack[i][0] == tag:
+                closed = self._stack[i:]
+                del self._stack[i:]
+                self._resolve(closed)
+                return
+
+    def _resolve(self, closed):
+        for _, node in reversed(closed):
+            for p, level in node["matches"]:
+                if self.results[p] is None:
+                    found = level == len(self.paths[p]) and len(node["texts"]) > 1
+                    self.results[p] = node["texts"] if found else False
+        for result in self.results:
+            if result is None:
+                return
+            if result:
+                break
+        raise _CellFound()
+
+    def close(self):
+        super().close()
+        closed = self._stack[1:]
+        del self._stack[1:]
+        if closed:
+            try:
+                self._resolve(closed)
+            except _CellFound:
+                pass
+
+
+def find_cell_values(html_string, paths):
+    """
+    Obtém o ``_values`` de um elemento sem montar a árvore.
+
+    Equivale a percorrer ``html_to_dict(html_string)`` por cada caminho, em ordem,
+    e retornar o ``_values`` do primeiro que existir.
+
+    Args:
+        html_string (str): Conteúdo HTML.
+        paths (list): Caminhos de pares (tag, índice) a partir da raiz, como
+            [("html", 0), ("body", 0), ...].
+
+    Returns:
+        list: Textos do elemento, ou None se nenhum caminho leva a um ``_values``.
+    """
+    parser = _CellTextParser(paths)
+    try:
+        parser.feed(html_string)
+        parser.close()
+    except _CellFound:
+        pass
+    for result in parser.results:
+        if result:
+            return result
+    return None
@@ -1,28 +1,127 @@
+import bisect
+import concurrent.futures
+import functools
+import hashlib
+import heapq
+import itertools
 import json
 import math
+import os
 import pickle
 import re
+import shutil
 import time
 import unicodedata
-from collections import Counter, defaultdict
+from array import array
+from collections import Counter, defaultdict, deque
 
 import matplotlib.pyplot as plt
 import nltk
+import numpy as np
 from nltk import tokenize
 from nltk.corpus import stopwords
 from nltk.stem import RSLPStemmer
 
+from service.transform import iter_jsonl_records
+
 nltk.download("punkt", quiet=True)
 nltk.download("stopwords", quiet=True)
 nltk.download("rslp", quiet=True)
 nltk.download("punkt_tab", quiet=True)
 
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_DIGITS_RE = re.compile(r"\d+")
+_SPACES_RE = re.compile(r"\s+")
+# Após a normalização para ASCII, tudo que não é letra, "_" ou espaço vira separador.
+_NON_WORD_RE = re.compile(r"[^A-Za-z_\s]+")
+# Contrações que o word_tokenize do NLTK separa mesmo em texto sem pontuação.
+_CONTRACTIONS_RE = re.compile(
+    r"(?i)\b(can(?=not\b)|gim(?=me\b)|gon(?=na\b)|got(?=ta\b)|lem(?=me\b)|wan(?=na(?:\s|$)))"
+)
+
+DEFAULT_PARAMS = {
+    "remove_stop": True,
+    "apply_stem": True,
+    "create_grams": False,
+    "n_gram": 2,
+    "create_shing": False,
+    "max_n": 3,
+}
+
+INDEX_VARIANTS = {
+    "básico": {},
+    "sem_stopwords": {"remove_stop": True, "apply_stem": False},
+    "com_stemming": {"remove_stop": True, "apply_stem": True},
+    "bigramas": {
+        "remove_stop": True,
+        "apply_stem": True,
+        "create_grams": True,
+        "n_gram": 2,
+    },
+    "shingles": {
+        "remove_stop": True,
+        "apply_stem": True,
+        "create_shing": True,
+        "max_n": 3,
+    },
+}
+
 
 class TextProcessor:
-    def __init__(self, language="portuguese"):
+    def __init__(self, language="portuguese", cache_size=100_000, tokenizer="fast"):
+        if tokenizer not in ("fast", "nltk"):
+            raise ValueError(f"Tokenizador desconhecido: {tokenizer}")
         self.language = language
+        self.tokenizer = tokenizer
         self.stopwords = set(stopwords.words(language))
         self.stemmer = RSLPStemmer()
+        self.cache_size = cache_size
+        self._build_caches()
+
+    def _build_caches(self):
+        """Cria os caches LRU de stemming e de verificação de stopwords"""
+        self._stem = functools.lru_cache(maxsize=self.cache_size)(self.stemmer.stem)
+        self._is_stopword = functools.lru_cache(maxsize=self.cache_size)(
+            self._check_stopword
+        )
+
+    def _check_stopword(self, token):
+        return token.lower() in self.stopwords
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_stem"]
+        del state["_is_stopword"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_caches()
+
+    def cache_stats(self):
+        """Retorna acertos e falhas dos caches de stemming e de stopwords"""
+        stats = {}
+        for name, cached in (("stem", self._stem), ("stopwords", self._is_stopword)):
+            info = cached.cache_info()
+            stats[name] = {
+                "hits": info.hits,
+                "misses": info.misses,
+                "size": info.currsize,
+                "maxsize": info.maxsize,
+            }
+        return stats
+
+    @staticmethod
+    def cache_stats_delta(before, after):
+        """Calcula os acertos e falhas ocorridos entre dois retratos de cache_stats"""
+        return {
+            name: {
+                **after[name],
+                "hits": after[name]["hits"] - before[name]["hits"],
+                "misses": after[name]["misses"] - before[name]["misses"],
+            }
+            for name in after
+        }
 
     @staticmethod
     def normalize_text(text):
@@ -33,9 +132,9 @@ class TextProcessor:
             .encode("ASCII", "ignore")
             .decode("ASCII")
         )
-        text = re.sub(r"[^\w\s]", " ", text)
-        text = re.sub(r"\d+", " ", text)
-        text = re.sub(r"\s+", " ", text).strip()
+        text = _PUNCTUATION_RE.sub(" ", text)
+        text = _DIGITS_RE.sub(" ", text)
+        text = _SPACES_RE.sub(" ", text).strip()
 
         return text
 
@@ -43,13 +142,38 @@ class TextProcessor:
         """Tokeniza o texto"""
         return tokenize.word_tokenize(text, language=self.language)
 
+    @staticmethod
+    def fast_tokenize(text):
+        """
+        Normaliza e tokeniza o texto sem passar pelo NLTK.
+
+        Produz os mesmos tokens que ``tokenize(normalize_text(text))``: como o
+        texto normalizado só contém letras, "_" e espaços, basta separar por
+        espaços, aplicando as mesmas contrações que o word_tokenize separa.
+        """
+        text = (
+            unicodedata.normalize("NFKD", text.lower())
+            .encode("ASCII", "ignore")
+            .decode("ASCII")
+        )
+        text = _NON_WORD_RE.sub(" ", text)
+        return _CONTRACTIONS_RE.sub(r"\1 ", text).split()
+
+    def normalize_and_tokenize(self, text):
+        """Normaliza e tokeniza o texto com o tokenizador configurado"""
+        if self.tokenizer == "nltk":
+            return self.tokenize(self.normalize_text(text))
+        return self.fast_tokenize(text)
+
     def remove_stopwords(self, tokens):
         """Remove stopwords"""
-        return [token for token in tokens if token.lower() not in self.stopwords]
+        is_stopword = self._is_stopword
+        return [token for token in tokens if not is_stopword(token)]
 
     def apply_stemming(self, tokens):
         """Aplica stemming"""
-        return [self.stemmer.stem(token) for token in tokens]
+        stem = self._stem
+        return [stem(token) for token in tokens]
 
     @staticmethod
     def create_ngrams(tokens, n=2):
@@ -74,8 +198,7 @@ class TextProcessor:
         max_n=3,
     ):
         """Processa o texto aplicando todas as transformações"""
-        normalized_text = self.normalize_text(text)
-        tokens = self.tokenize(normalized_text)
+        tokens = self.normalize_and_tokenize(text)
 
         if remove_stop:
             tokens = self.remove_stopwords(tokens)
@@ -93,31 +216,224 @@ class TextProcessor:
 
         return result
 
+    def select_terms(self, tokens, params):
+        """Deriva os termos indexados (tokens, n-gramas ou shingles) de uma variante"""
+        if params["create_grams"] and not params["create_shing"]:
+            return self.create_ngrams(tokens, params["n_gram"])
+        if params["create_shing"]:
+            return self.create_shingles(tokens, params["max_n"])
+        return tokens
+
+    def process_variants(self, text, variants):
+        """
+        Processa o texto uma única vez e deriva os termos de cada variante.
+
+        A normalização e a tokenização são feitas uma vez por documento; a remoção
+        de stopwords e o stemming são compartilhados entre as variantes que usam a
+        mesma combinação de ``remove_stop`` e ``apply_stem``.
+
+        Args:
+            text (str): Texto do documento.
+            variants (dict): Nome da variante -> parâmetros completos.
+
+        Returns:
+            dict: Nome da variante -> lista de termos a indexar.
+        """
+        tokens = self.normalize_and_tokenize(text)
+        filtered = None
+        streams = {}
+        terms = {}
+
+        for name, params in variants.items():
+            key = (params["remove_stop"], params["apply_stem"])
+            if key not in streams:
+                stream = tokens
+                if params["remove_stop"]:
+                    if filtered is None:
+                        filtered = self.remove_stopwords(tokens)
+                    stream = filtered
+                if params["apply_stem"]:
+                    stream = self.apply_stemming(stream)
+                streams[key] = stream
+
+            terms[name] = self.select_terms(streams[key], params)
+
+        return terms
+
+
+def _ranking_key(item):
+    """Ordem do ranking: maior score primeiro e, nos empates, menor ID de documento"""
+    doc_id, score = item
+    return -score, doc_id
+
 
 class InvertedIndex:
+    """
+    Índice invertido em dicionários, com atualização incremental de documentos.
+
+    Documentos removidos ou alterados não reescrevem as listas de postings: as
+    postings antigas viram tombstones (pares ``(doc_id, frequência)`` em
+    ``stale``) e são ignoradas nas consultas, enquanto ``df``, ``tf``,
+    ``documents`` e ``total_docs`` refletem apenas os documentos vivos. Quando
+    os tombstones passam de ``COMPACTION_RATIO`` das postings vivas, ``compact``
+    remove-os das listas.
+    """
+
+    COMPACTION_RATIO = 0.25
+    read_only = False
+
     def __init__(self):
         self.index = defaultdict(list)
         self.documents = {}
         self.tf = defaultdict(Counter)
         self.df = Counter()
+        self.max_tf = Counter()
         self.vocabulary = set()
         self.total_docs = 0
+        self.stale = {}
+        self.stale_postings = 0
+        self.live_postings = 0
 
     def add_document(self, doc_id, tokens):
-        """Adiciona um documento ao índice invertido"""
+        """Adiciona um documento ao índice invertido (ou o atualiza, se já existir)"""
+        if doc_id in self.documents:
+            self.update_document(doc_id, tokens)
+            return
+
         self.documents[doc_id] = len(tokens)
         self.total_docs += 1
         term_count = Counter(tokens)
+        self.live_postings += len(term_count)
 
         for term, count in term_count.items():
-            self.index[term].append((doc_id, count))
+            if self.stale:
+                self._insert_posting(term, doc_id, count)
+            else:
+                self.index[term].append((doc_id, count))
             self.tf[doc_id][term] = count
             self.df[term] += 1
             self.vocabulary.add(term)
+            self.max_tf[term] = max(self.max_tf[term], count)
+
+    def update_document(self, doc_id, tokens):
+        """
+        Substitui os termos de um documento já indexado.
+
+        Apenas os termos cuja frequência mudou geram postings novas; as antigas
+        viram tombstones. Documentos ainda não indexados são adicionados.
+        """
+        if doc_id not in self.documents:
+            self.add_document(doc_id, tokens)
+            return
+
+        old_count = self.tf[doc_id]
+        new_count = Counter(tokens)
+        for term, count in old_count.items():
+            if new_count.get(term) != count:
+                self._retire_posting(term, doc_id, count)
+                if term not in new_count:
+                    self._decrement_df(term)
+        for term, count in new_count.items():
+            if old_count.get(term) != count:
+                self._insert_posting(term, doc_id, count)
+                if term not in old_count:
+                    self.df[term] += 1
+                    self.vocabulary.add(term)
+                self.max_tf[term] = max(self.max_tf[term], count)
+        self.live_postings += len(new_count) - len(old_count)
+
+        self.tf[doc_id] = new_count
+        self.documents[doc_id] = len(tokens)
+        self._maybe_compact()
+
+    def remove_document(self, doc_id):
+        """
+        Remove um documento do índice.
+
+        Returns:
+            bool: True se o documento estava indexado.
+        """
+        if doc_id not in self.documents:
+            return False
+
+        # Documentos sem tokens (só stopwords ou pontuação) não têm entrada em tf
+        term_count = self.tf.pop(doc_id, Counter())
+        for term, count in term_count.items():
+            self._retire_posting(term, doc_id, count)
+            self._decrement_df(term)
+        self.live_postings -= len(term_count)
+        del self.documents[doc_id]
+        self.total_docs -= 1
+        self._maybe_compact()
+        return True
+
+    def _insert_posting(self, term, doc_id, count):
+        """Insere uma posting, reaproveitando um tombstone idêntico se houver"""
+        stale = self.stale.get(term)
+        if stale and (doc_id, count) in stale:
+            stale.discard((doc_id, count))
+            self.stale_postings -= 1
+            if not stale:
+                del self.stale[term]
+        else:
+            self.index[term].append((doc_id, count))
+
+    def _retire_posting(self, term, doc_id, count):
+        """Marca uma posting como tombstone"""
+        self.stale.setdefault(term, set()).add((doc_id, count))
+        self.stale_postings += 1
+
+    def _decrement_df(self, term):
+        self.df[term] -= 1
+        if self.df[term] <= 0:
+            del self.df[term]
+            self.vocabulary.discard(term)
+
+    def _maybe_compact(self):
+        if self.stale_postings > self.COMPACTION_RATIO * max(1, self.live_postings):
+            self.compact()
+
+    def compact(self):
+        """Remove os tombstones das listas de postings e recalcula o max_tf dos termos afetados"""
+        for term, stale in self.stale.items():
+            postings = [posting for posting in self.index[term] if posting not in stale]
+            if postings:
+                self.index[term] = postings
+                self.max_tf[term] = max(count for _, count in postings)
+            else:
+                del self.index[term]
+                self.max_tf.pop(term, None)
+        self.stale = {}
+        self.stale_postings = 0
+
+    def merge(self, other):
+        """
+        Incorpora ao índice os documentos de outro índice.
+
+        Os índices devem conter conjuntos disjuntos de documentos, como os
+        índices parciais construídos por shard em ``IndexAnalyzer.create_indices``.
+        As postings são concatenadas na ordem dos merges.
+        """
+        for term, postings in other.index.items():
+            self.index[term].extend(postings)
+        for term, stale in other.stale.items():
+            self.stale.setdefault(term, set()).update(stale)
+        self.documents.update(other.documents)
+        self.tf.update(other.tf)
+        self.df.update(other.df)
+        self.max_tf |= other.max_tf
+        self.vocabulary |= other.vocabulary
+        self.total_docs += other.total_docs
+        self.stale_postings += other.stale_postings
+        self.live_postings += other.live_postings
 
     def get_postings(self, term):
-        """Retorna a lista de postings para um termo"""
-        return self.index.get(term, [])
+        """Retorna a lista de postings para um termo, sem os tombstones"""
+        postings = self.index.get(term, [])
+        stale = self.stale.get(term)
+        if stale:
+            return [posting for posting in postings if posting not in stale]
+        return postings
 
     def get_term_frequency(self, term, doc_id):
         """Retorna a frequência de um termo em um documento"""
@@ -127,6 +443,10 @@ class InvertedIndex:
         """Retorna a frequência de documentos que contém o termo"""
         return self.df.get(term, 0)
 
+    def get_max_term_frequency(self, term):
+        """Retorna a maior frequência do termo em um documento (limite superior do TF)"""
+        return self.max_tf.get(term, 0)
+
     def get_idf(self, term):
         """Calcula o IDF (Inverse Document Frequency) para um termo"""
         return math.log10(self.total_docs / (1 + self.get_document_frequency(term)))
@@ -148,23 +468,111 @@ class InvertedIndex:
 
         return list(result)
 
-    def rank_search(self, query_terms):
-        """Busca documentos e retorna ranking baseado em TF-IDF"""
-        if not query_terms:
+    def rank_search(self, query_terms, top_k=None):
+        """
+        Busca documentos e retorna ranking baseado em TF-IDF.
+
+        Os scores são acumulados termo a termo: o IDF de cada termo da consulta
+        é calculado uma única vez e somado às postings do termo. Com top_k, a
+        busca usa MaxScore (ver ``_max_score_search``) para evitar percorrer as
+        postings de termos que não podem mais alterar o top_k.
+
+        Args:
+            query_terms (list): Termos da consulta já processados.
+            top_k (int, opcional): Se informado, retorna apenas os top_k melhores.
+
+        Returns:
+            list: Tuplas (doc_id, score) em ordem decrescente de score.
+        """
+        if not query_terms or not self.total_docs:
             return []
 
-        docs = set()
-        for term in query_terms:
-            docs.update(doc_id for doc_id, _ in self.get_postings(term))
+        if top_k is not None:
+            ranked_docs = self._max_score_search(query_terms, top_k)
+            if ranked_docs is not None:
+                return ranked_docs
 
         scores = {}
-        for doc_id in docs:
-            score = sum(self.get_tf_idf(term, doc_id) for term in query_terms)
-            scores[doc_id] = score
-
-        ranked_docs = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        for term, weight in Counter(query_terms).items():
+            # Termos sem postings não pontuam (e o IDF deles não é calculado)
+            if not self.get_document_frequency(term):
+                continue
+            weighted_idf = weight * self.get_idf(term)
+            for doc_id, tf in self.get_postings(term):
+                scores[doc_id] = scores.get(doc_id, 0) + tf * weighted_idf
+
+        # Empates são desfeitos pelo ID do documento, como no backend compact
+        if top_k is not None:
+            return heapq.nsmallest(top_k, scores.items(), key=_ranking_key)
+        ranked_docs = sorted(scores.items(), key=_ranking_key)
         return ranked_docs
 
+    def _term_bounds(self, query_terms):
+        """
+        Calcula o limite superior de score de cada termo da consulta.
+
+        Returns:
+            list: Tuplas (limite, peso, termo) em ordem decrescente de limite, onde
+                peso é o IDF multiplicado pelas ocorrências do termo na consulta.
+                None se algum peso não for positivo, caso em que os limites não
+                permitem podar documentos.
+        """
+        bounds = []
+        for term, weight in Counter(query_terms).items():
+            if not self.get_document_frequency(term):
+                continue
+            weighted_idf = weight * self.get_idf(term)
+            if weighted_idf <= 0:
+                return None
+            bounds.append(
+                (weighted_idf * self.get_max_term_frequency(term), weighted_idf, term)
+            )
+        bounds.sort(key=lambda x: x[0], reverse=True)
+        return bounds
+
+    def _max_score_search(self, query_terms, top_k):
+        """
+        Busca os top_k documentos com MaxScore, termo a termo.
+
+        Os termos são processados em ordem decrescente de limite superior. Quando
+        o k-ésimo score acumulado alcança a soma dos limites dos termos restantes,
+        nenhum documento ainda não visto pode entrar no top_k: as postings dos
+        termos restantes (em geral os mais frequentes) deixam de ser percorridas
+        e apenas os candidatos que ainda podem alcançar o top_k são completados.
+
+        Returns:
+            list: Tuplas (doc_id, score) ou None se a poda não se aplica à consulta.
+        """
+        bounds = self._term_bounds(query_terms)
+        if bounds is None or top_k <= 0:
+            return None
+
+        remaining = sum(upper for upper, _, _ in bounds)
+        scores = {}
+        pruning = False
+        for upper, weighted_idf, term in bounds:
+            if len(scores) >= top_k:
+                threshold = heapq.nlargest(top_k, scores.values())[-1]
+                pruning = pruning or threshold >= remaining
+                if pruning:
+                    scores = {
+                        doc_id: score
+                        for doc_id, score in scores.items()
+                        if score + remaining >= threshold
+                    }
+
+            if pruning:
+                for doc_id in scores:
+                    tf = self.get_term_frequency(term, doc_id)
+                    if tf:
+                        scores[doc_id] += tf * weighted_idf
+            else:
+                for doc_id, tf in self.get_postings(term):
+                    scores[doc_id] = scores.get(doc_id, 0) + tf * weighted_idf
+            remaining -= upper
+
+        return heapq.nsmallest(top_k, scores.items(), key=_ranking_key)
+
     def save_index(self, filepath):
         """Salva o índice no disco"""
         with open(filepath, "wb") as f:
@@ -174,8 +582,10 @@ class InvertedIndex:
                     "documents": self.documents,
                     "tf": dict(self.tf),
                     "df": self.df,
+                    "max_tf": self.max_tf,
                     "vocabulary": self.vocabulary,
                     "total_docs": self.total_docs,
+                    "stale": self.stale,
                 },
                 f,
             )
@@ -185,11 +595,28 @@ class InvertedIndex:
         with open(filepath, "rb") as f:
             data = pickle.load(f)
             self.index = defaultdict(list, data["index"])
+            self.stale = data.get("stale", {})
+            self.stale_postings = sum(len(stale) for stale in self.stale.values())
             self.documents = data["documents"]
             self.tf = defaultdict(Counter, data["tf"])
             self.df = data["df"]
             self.vocabulary = data["vocabulary"]
             self.total_docs = data["total_docs"]
+            self.max_tf = data.get("max_tf") or Counter(
+                {
+                    term: max(count for _, count in postings)
+                    for term, postings in self.index.items()
+                    if postings
+                }
+            )
+            self.live_postings = sum(len(counts) for counts in self.tf.values())
+
+    def freeze(self):
+        """Finaliza a construção do índice; nada a fazer na estrutura em dicionários"""
+
+    def estimate_size(self):
+        """Retorna o tamanho serializado das postings, em bytes"""
+        return len(pickle.dumps(self.index))
 
     def get_stats(self):
         """Retorna estatísticas sobre o índice"""
@@ -198,37 +625,534 @@ class InvertedIndex:
             "vocabulary_size": len(self.vocabulary),
             "mean_terms_per_doc": sum(self.documents.values())
             / max(1, self.total_docs),
-            "postings_size": sum(len(postings) for postings in self.index.values()),
+            "postings_size": self.live_postings,
+        }
+
+
+class CompactInvertedIndex(InvertedIndex):
+    """
+    Índice invertido compacto, com IDs inteiros para termos e documentos.
+
+    Durante a construção, as postings de cada termo ficam em dois ``array('I')``
+    paralelos (IDs de documento em ordem crescente e frequências), sem o mapa
+    ``tf`` duplicado. ``freeze`` concatena todas as postings em dois arrays
+    contíguos indexados por ``offsets``. A API de consulta (``search``,
+    ``rank_search``, ``get_stats``) é a mesma de ``InvertedIndex`` e os
+    documentos continuam identificados pelo caminho.
+
+    Sem o mapa ``tf``, um documento removido vira um tombstone: seu ID interno
+    entra em ``deleted`` e é filtrado das consultas. Um documento atualizado é
+    removido e reinserido com um novo ID. ``compact`` descarta os tombstones e
+    renumera os documentos.
+    """
+
+    def __init__(self):
+        self.term_ids = {}
+        self.doc_ids = {}
+        self.doc_paths = []
+        self.doc_lengths = array("I")
+        self.total_docs = 0
+        self.postings_docs = []
+        self.postings_freqs = []
+        self.max_tf = array("I")
+        self.offsets = None
+        self.docs = None
+        self.freqs = None
+        self._views = None
+        self.deleted = set()
+        self._stale_df = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_views"] = None
+        return state
+
+    @property
+    def documents(self):
+        if self.deleted:
+            return {
+                path: length
+                for did, (path, length) in enumerate(zip(self.doc_paths, self.doc_lengths))
+                if did not in self.deleted
+            }
+        return dict(zip(self.doc_paths, self.doc_lengths))
+
+    @property
+    def vocabulary(self):
+        if self.deleted:
+            return {term for term in self.term_ids if self.get_document_frequency(term)}
+        return self.term_ids.keys()
+
+    def freeze(self):
+        """Concatena as postings de todos os termos em arrays contíguos"""
+        if self.postings_docs is None:
+            return
+        offsets = array("Q", [0])
+        docs = array("I")
+        freqs = array("I")
+        for term_docs, term_freqs in zip(self.postings_docs, self.postings_freqs):
+            docs.extend(term_docs)
+            freqs.extend(term_freqs)
+            offsets.append(len(docs))
+        self.offsets, self.docs, self.freqs = offsets, docs, freqs
+        self.postings_docs = self.postings_freqs = None
+
+    def _thaw(self):
+        """Volta as postings para arrays por termo, permitindo novas inserções"""
+        if self.postings_docs is not None:
+            return
+        self._views = None
+        offsets = self.offsets
+        self.postings_docs = [
+            self.docs[offsets[tid] : offsets[tid + 1]] for tid in range(len(offsets) - 1)
+        ]
+        self.postings_freqs = [
+            self.freqs[offsets[tid] : offsets[tid + 1]]
+            for tid in range(len(offsets) - 1)
+        ]
+        self.offsets = self.docs = self.freqs = None
+
+    def _postings(self, tid):
+        """Retorna (IDs de documento, frequências) das postings de um termo"""
+        if self.postings_docs is not None:
+            return self.postings_docs[tid], self.postings_freqs[tid]
+        if self._views is None:
+            self._views = (memoryview(self.docs), memoryview(self.freqs))
+        start, end = self.offsets[tid], self.offsets[tid + 1]
+        return self._views[0][start:end], self._views[1][start:end]
+
+    def _term_id(self, term):
+        tid = self.term_ids.get(term)
+        if tid is None:
+            tid = len(self.term_ids)
+            self.term_ids[term] = tid
+            self.postings_docs.append(array("I"))
+            self.postings_freqs.append(array("I"))
+            self.max_tf.append(0)
+        return tid
+
+    def add_document(self, doc_id, tokens):
+        """Adiciona um documento ao índice invertido (ou o atualiza, se já existir)"""
+        if doc_id in self.doc_ids:
+            self.remove_document(doc_id)
+        self._thaw()
+        did = len(self.doc_paths)
+        self.doc_ids[doc_id] = did
+        self.doc_paths.append(doc_id)
+        self.doc_lengths.append(len(tokens))
+        self.total_docs += 1
+
+        for term, count in Counter(tokens).items():
+            tid = self._term_id(term)
+            self.postings_docs[tid].append(did)
+            self.postings_freqs[tid].append(count)
+            self.max_tf[tid] = max(self.max_tf[tid], count)
+
+    def update_document(self, doc_id, tokens):
+        """Substitui os termos de um documento: o ID antigo vira tombstone e o documento ganha um novo ID"""
+        self.add_document(doc_id, tokens)
+        self._maybe_compact()
+
+    def remove_document(self, doc_id):
+        """
+        Remove um documento do índice, marcando seu ID interno como tombstone.
+
+        Returns:
+            bool: True se o documento estava indexado.
+        """
+        did = self.doc_ids.pop(doc_id, None)
+        if did is None:
+            return False
+        self.deleted.add(did)
+        self._stale_df = None
+        self.total_docs -= 1
+        self._maybe_compact()
+        return True
+
+    def _maybe_compact(self):
+        if len(self.deleted) > self.COMPACTION_RATIO * max(1, self.total_docs):
+            self.compact()
+
+    def _deleted_ids(self):
+        return np.fromiter(self.deleted, dtype=np.intp, count=len(self.deleted))
+
+    def _stale_counts(self):
+        """Retorna, por termo, o número de postings de documentos removidos"""
+        if self._stale_df is None:
+            self.freeze()
+            docs = np.frombuffer(self.docs, dtype=np.uintc)
+            dead = np.isin(docs, self._deleted_ids())
+            cumulative = np.concatenate(([0], np.cumsum(dead)))
+            self._stale_df = np.diff(cumulative[np.asarray(self.offsets, dtype=np.intp)])
+        return self._stale_df
+
+    def compact(self):
+        """
+        Descarta as postings de documentos removidos e renumera documentos e termos.
+
+        Termos que ficaram sem postings saem do dicionário e o max_tf dos termos
+        restantes é recalculado.
+        """
+        if not self.deleted:
+            return
+        self.freeze()
+        num_docs = len(self.doc_paths)
+        alive = np.ones(num_docs, dtype=bool)
+        alive[self._deleted_ids()] = False
+        new_ids = np.cumsum(alive) - 1
+
+        docs = np.frombuffer(self.docs, dtype=np.uintc)
+        freqs = np.frombuffer(self.freqs, dtype=np.uintc)
+        keep = alive[docs]
+        cumulative = np.concatenate(([0], np.cumsum(keep)))
+        counts = np.diff(cumulative[np.asarray(self.offsets, dtype=np.intp)])
+        docs = new_ids[docs[keep]].astype(np.uintc)
+        freqs = freqs[keep]
+
+        kept_terms = np.flatnonzero(counts)
+        offsets = np.concatenate(([0], np.cumsum(counts[kept_terms]))).astype(np.uint64)
+        max_tf = (
+            np.maximum.reduceat(freqs, offsets[:-1].astype(np.intp))
+            if len(freqs)
+            else np.zeros(0, dtype=np.uintc)
+        )
+
+        terms = list(self.term_ids)
+        self.term_ids = {terms[tid]: i for i, tid in enumerate(kept_terms)}
+        self.doc_paths = [path for did, path in enumerate(self.doc_paths) if alive[did]]
+        self.doc_ids = {path: did for did, path in enumerate(self.doc_paths)}
+        self.doc_lengths = array("I", (np.frombuffer(self.doc_lengths, dtype=np.uintc)[alive]).tobytes())
+        self.offsets = array("Q", offsets.tobytes())
+        self.docs = array("I", docs.tobytes())
+        self.freqs = array("I", freqs.tobytes())
+        self.max_tf = array("I", max_tf.astype(np.uintc).tobytes())
+        self.total_docs = len(self.doc_paths)
+        self.deleted = set()
+        self._stale_df = None
+        self._views = None
+
+    def merge(self, other):
+        """
+        Incorpora ao índice os documentos de outro índice compacto.
+
+        Os IDs de documento do outro índice são deslocados para depois dos
+        existentes, mantendo as postings ordenadas.
+        """
+        other.compact()
+        self._thaw()
+        offset = len(self.doc_paths)
+        for path, did in other.doc_ids.items():
+            self.doc_ids[path] = did + offset
+        self.doc_paths.extend(other.doc_paths)
+        self.doc_lengths.extend(other.doc_lengths)
+        self.total_docs += other.total_docs
+
+        for term, other_tid in other.term_ids.items():
+            tid = self._term_id(term)
+            other_docs, other_freqs = other._postings(other_tid)
+            self.postings_docs[tid].extend(did + offset for did in other_docs)
+            self.postings_freqs[tid].extend(other_freqs)
+            self.max_tf[tid] = max(self.max_tf[tid], other.max_tf[other_tid])
+
+    def get_postings(self, term):
+        """Retorna a lista de postings para um termo"""
+        tid = self.term_ids.get(term)
+        if tid is None:
+            return []
+        doc_paths = self.doc_paths
+        docs, freqs = self._postings(tid)
+        if self.deleted:
+            deleted = self.deleted
+            return [
+                (doc_paths[did], count)
+                for did, count in zip(docs, freqs)
+                if did not in deleted
+            ]
+        return [(doc_paths[did], count) for did, count in zip(docs, freqs)]
+
+    def get_term_frequency(self, term, doc_id):
+        """Retorna a frequência de um termo em um documento"""
+        tid = self.term_ids.get(term)
+        did = self.doc_ids.get(doc_id)
+        if tid is None or did is None:
+            return 0
+        docs, freqs = self._postings(tid)
+        pos = bisect.bisect_left(docs, did)
+        if pos < len(docs) and docs[pos] == did:
+            return freqs[pos]
+        return 0
+
+    def get_document_frequency(self, term):
+        """Retorna a frequência de documentos que contém o termo"""
+        tid = self.term_ids.get(term)
+        if tid is None:
+            return 0
+        if self.deleted:
+            return len(self._postings(tid)[0]) - int(self._stale_counts()[tid])
+        return len(self._postings(tid)[0])
+
+    def get_max_term_frequency(self, term):
+        """Retorna a maior frequência do termo em um documento (limite superior do TF)"""
+        tid = self.term_ids.get(term)
+        return 0 if tid is None else self.max_tf[tid]
+
+    def _postings_arrays(self, tid):
+        """Retorna as postings de um termo como arrays NumPy, sem cópia"""
+        docs, freqs = self._postings(tid)
+        return np.frombuffer(docs, dtype=np.uintc), np.frombuffer(freqs, dtype=np.uintc)
+
+    def _rank_candidates(self, candidates, scores, top_k):
+        """
+        Ordena os candidatos por score, selecionando antes os top_k com argpartition.
+
+        Os empatados com o k-ésimo score também são mantidos, para que o empate
+        seja desfeito pelo ID do documento, como no backend dict.
+        """
+        candidate_scores = scores[candidates]
+        if top_k is not None and top_k < len(candidates):
+            top = np.argpartition(-candidate_scores, top_k - 1)[:top_k]
+            top = np.flatnonzero(candidate_scores >= candidate_scores[top].min())
+            candidates, candidate_scores = candidates[top], candidate_scores[top]
+
+        doc_paths = self.doc_paths
+        ranked_docs = sorted(
+            zip(
+                (doc_paths[i] for i in candidates.tolist()),
+                candidate_scores.tolist(),
+            ),
+            key=_ranking_key,
+        )
+        return ranked_docs if top_k is None else ranked_docs[:top_k]
+
+    def rank_search(self, query_terms, top_k=None):
+        """
+        Busca documentos e retorna ranking baseado em TF-IDF.
+
+        Os scores são acumulados em um array NumPy indexado pelo ID do
+        documento, com o IDF de cada termo calculado uma única vez. Com top_k,
+        os melhores documentos são selecionados com ``argpartition`` e apenas
+        eles são ordenados, e a busca usa MaxScore para não percorrer as
+        postings de termos que não podem mais alterar o top_k.
+        """
+        if not query_terms or not self.total_docs:
+            return []
+
+        if top_k is not None:
+            ranked_docs = self._max_score_search(query_terms, top_k)
+            if ranked_docs is not None:
+                return ranked_docs
+
+        num_docs = len(self.doc_paths)
+        scores = np.zeros(num_docs)
+        matched = np.zeros(num_docs, dtype=bool)
+        for term, weight in Counter(query_terms).items():
+            tid = self.term_ids.get(term)
+            if tid is None or not self.get_document_frequency(term):
+                continue
+            doc_ids, freqs = self._postings_arrays(tid)
+            scores[doc_ids] += freqs * (weight * self.get_idf(term))
+            matched[doc_ids] = True
+
+        if self.deleted:
+            matched[self._deleted_ids()] = False
+        return self._rank_candidates(np.flatnonzero(matched), scores, top_k)
+
+    def _max_score_search(self, query_terms, top_k):
+        """
+        Versão vetorizada de ``InvertedIndex._max_score_search``.
+
+        Enquanto novos documentos podem entrar no top_k, as postings são somadas
+        ao acumulador; depois, os candidatos restantes são procurados nas
+        postings de cada termo com ``searchsorted``.
+        """
+        bounds = self._term_bounds(query_terms)
+        if bounds is None or top_k <= 0:
+            return None
+
+        num_docs = len(self.doc_paths)
+        scores = np.zeros(num_docs)
+        matched = np.zeros(num_docs, dtype=bool)
+        deleted = self._deleted_ids() if self.deleted else None
+        remaining = sum(upper for upper, _, _ in bounds)
+        candidates = None
+        for upper, weighted_idf, term in bounds:
+            if candidates is None and np.count_nonzero(matched) >= top_k:
+                matched_ids = np.flatnonzero(matched)
+                threshold = np.partition(scores[matched_ids], -top_k)[-top_k]
+                if threshold >= remaining:
+                    candidates = matched_ids
+            if candidates is not None:
+                threshold = np.partition(scores[candidates], -top_k)[-top_k]
+                candidates = candidates[scores[candidates] + remaining >= threshold]
+
+            doc_ids, freqs = self._postings_arrays(self.term_ids[term])
+            if candidates is None:
+                scores[doc_ids] += freqs * weighted_idf
+                matched[doc_ids] = True
+                if deleted is not None:
+                    matched[deleted] = False
+            else:
+                pos = np.searchsorted(doc_ids, candidates)
+                inside = pos < len(doc_ids)
+                pos, found = pos[inside], candidates[inside]
+                hit = doc_ids[pos] == found
+                scores[found[hit]] += freqs[pos[hit]] * weighted_idf
+            remaining -= upper
+
+        if candidates is None:
+            candidates = np.flatnonzero(matched)
+        return self._rank_candidates(candidates, scores, top_k)
+
+    def save_index(self, filepath):
+        """Salva o índice no disco, já sem os documentos removidos"""
+        self.compact()
+        self.freeze()
+        with open(filepath, "wb") as f:
+            pickle.dump(
+                {
+                    "term_ids": self.term_ids,
+                    "doc_paths": self.doc_paths,
+                    "doc_lengths": self.doc_lengths,
+                    "offsets": self.offsets,
+                    "docs": self.docs,
+                    "freqs": self.freqs,
+                    "max_tf": self.max_tf,
+                },
+                f,
+            )
+
+    def load_index(self, filepath):
+        """Carrega o índice do disco"""
+        with open(filepath, "rb") as f:
+            data = pickle.load(f)
+            self.term_ids = data["term_ids"]
+            self.doc_paths = data["doc_paths"]
+            self.doc_lengths = data["doc_lengths"]
+            self.offsets = data["offsets"]
+            self.docs = data["docs"]
+            self.freqs = data["freqs"]
+            self.max_tf = data["max_tf"]
+            self.postings_docs = self.postings_freqs = None
+            self._views = None
+            self.doc_ids = {path: did for did, path in enumerate(self.doc_paths)}
+            self.total_docs = len(self.doc_paths)
+            self.deleted = set()
+            self._stale_df = None
+
+    def estimate_size(self):
+        """Retorna o tamanho serializado das postings, em bytes"""
+        self.freeze()
+        return len(pickle.dumps((self.term_ids, self.offsets, self.docs, self.freqs)))
+
+    def get_stats(self):
+        """Retorna estatísticas sobre o índice"""
+        if self.deleted:
+            stale = self._stale_counts()
+            postings_size = len(self.docs) - int(stale.sum())
+            vocabulary_size = len(self.term_ids) - int(np.count_nonzero(
+                np.diff(np.asarray(self.offsets, dtype=np.int64)) == stale
+            ))
+            doc_lengths = sum(self.documents.values())
+        else:
+            if self.postings_docs is None:
+                postings_size = len(self.docs)
+            else:
+                postings_size = sum(len(postings) for postings in self.postings_docs)
+            vocabulary_size = len(self.term_ids)
+            doc_lengths = sum(self.doc_lengths)
+        return {
+            "num_documents": self.total_docs,
+            "vocabulary_size": vocabulary_size,
+            "mean_terms_per_doc": doc_lengths / max(1, self.total_docs),
+            "postings_size": postings_size,
         }
 
 
+INDEX_BACKENDS = {
+    "dict": InvertedIndex,
+    "compact": CompactInvertedIndex,
+}
+
+
+# Documentos por shard quando os documentos são lidos sob demanda
+STREAM_SHARD_SIZE = 500
+
+_worker_processor = None
+
+
+def _init_shard_worker(processor):
+    """Inicializa o processador de texto de cada processo worker"""
+    global _worker_processor
+    _worker_processor = processor
+
+
+def _build_shard(args):
+    """
+    Constrói os índices parciais de um shard de documentos em um processo worker.
+
+    Args:
+        args (tuple): (index_class, variants, shard) onde shard é uma lista de
+            (doc_id, texto).
+
+    Returns:
+        tuple: (índices, cache) onde índices mapeia o nome da variante para o
+            InvertedIndex parcial do shard e cache é o uso dos caches no shard.
+    """
+    index_class, variants, shard = args
+    indices = {name: index_class() for name in variants}
+    cache_before = _worker_processor.cache_stats()
+
+    for doc_id, doc_text in shard:
+        terms = _worker_processor.process_variants(doc_text, variants)
+        for name, index in indices.items():
+            index.add_document(doc_id, terms[name])
+
+    for index in indices.values():
+        index.freeze()
+
+    cache = TextProcessor.cache_stats_delta(
+        cache_before, _worker_processor.cache_stats()
+    )
+    return indices, cache
+
+
 class IndexAnalyzer:
-    def __init__(self, processor, documents):
+    def __init__(self, processor, documents, backend="dict"):
         self.processor = processor
         self.documents = documents
+        self.index_class = INDEX_BACKENDS[backend]
         self.indices = {}
         self.stats = {}
         self.times = {}
         self.memory_usage = {}
+        self.params = {}
+
+    @staticmethod
+    def resolve_params(params=None):
+        """Completa os parâmetros informados com os valores padrão"""
+        if params:
+            return {**DEFAULT_PARAMS, **params}
+        return dict(DEFAULT_PARAMS)
+
+    def _register_index(self, name, index, elapsed, cache=None, params=None):
+        """Registra o índice criado junto com suas estatísticas"""
+        index.freeze()
+        self.indices[name] = index
+        if params is not None:
+            self.params[name] = params
+        self.stats[name] = index.get_stats()
+        if cache is not None:
+            self.stats[name]["cache"] = cache
+        self.times[name] = elapsed
+        self.memory_usage[name] = index.estimate_size()
 
     def create_index(self, name, params=None):
         """Cria um índice com os parâmetros especificados"""
         t0 = time.time()
-        default_params = {
-            "remove_stop": True,
-            "apply_stem": True,
-            "create_grams": False,
-            "n_gram": 2,
-            "create_shing": False,
-            "max_n": 3,
-        }
+        params = self.resolve_params(params)
+        cache_before = self.processor.cache_stats()
 
-        if params:
-            params = {**default_params, **params}
-        else:
-            params = default_params
-
-        index = InvertedIndex()
+        index = self.index_class()
 
         for doc_id, doc_text in self.documents.items():
             result = self.processor.process_text(
@@ -248,14 +1172,174 @@ class IndexAnalyzer:
             else:
                 index.add_document(doc_id, result["tokens"])
 
-        self.indices[name] = index
-        self.stats[name] = index.get_stats()
-        self.times[name] = time.time() - t0
-        index_size = len(pickle.dumps(index.index))
-        self.memory_usage[name] = index_size
+        cache = self.processor.cache_stats_delta(
+            cache_before, self.processor.cache_stats()
+        )
+        self._register_index(name, index, time.time() - t0, cache, params)
 
         return index
 
+    def create_indices(self, variants=None, num_workers=None, documents=None):
+        """
+        Cria vários índices em uma única passada pelos documentos.
+
+        Cada documento é normalizado e tokenizado uma única vez e os termos de
+        todas as variantes são derivados desse resultado intermediário. O tempo
+        registrado para cada índice inclui o processamento compartilhado.
+
+        Args:
+            variants (dict, opcional): Nome do índice -> parâmetros. Padrão: INDEX_VARIANTS.
+            num_workers (int, opcional): Se maior que 1, divide os documentos em
+                shards processados em paralelo por processos distintos.
+            documents (iterable, opcional): Pares (id, texto) consumidos sob
+                demanda, em vez de ``self.documents``. Os textos não são mantidos
+                e, em paralelo, apenas alguns shards ficam em memória por vez.
+
+        Returns:
+            dict: Nome do índice -> InvertedIndex criado.
+        """
+        variants = variants if variants is not None else INDEX_VARIANTS
+        variants = {name: self.resolve_params(params) for name, params in variants.items()}
+
+        if num_workers and num_workers > 1 and (documents is not None or len(self.documents) > 1):
+            return self._create_indices_parallel(variants, num_workers, documents)
+
+        indices = {name: self.index_class() for name in variants}
+        shared_time = 0.0
+        own_times = dict.fromkeys(variants, 0.0)
+        cache_before = self.processor.cache_stats()
+
+        items = self.documents.items() if documents is None else documents
+        for doc_id, doc_text in items:
+            t0 = time.time()
+            terms = self.processor.process_variants(doc_text, variants)
+            shared_time += time.time() - t0
+
+            for name, index in indices.items():
+                t0 = time.time()
+                index.add_document(doc_id, terms[name])
+                own_times[name] += time.time() - t0
+
+        cache = self.processor.cache_stats_delta(
+            cache_before, self.processor.cache_stats()
+        )
+        for name, index in indices.items():
+            self._register_index(
+                name, index, shared_time + own_times[name], cache, variants[name]
+            )
+
+        return indices
+
+    def _create_indices_parallel(self, variants, num_workers, documents=None):
+        """
+        Constrói os índices em paralelo, um índice parcial por shard, e os combina.
+
+        Os shards são fatias contíguas dos documentos e são combinados na ordem
+        original, de modo que o resultado é igual ao da construção sequencial. No
+        máximo ``2 * num_workers`` shards ficam pendentes ao mesmo tempo. O tempo
+        registrado é o tempo total da construção paralela.
+        """
+        t0 = time.time()
+        if documents is None:
+            items = list(self.documents.items())
+            num_shards = min(len(items), num_workers * 4)
+            shard_size = math.ceil(len(items) / num_shards)
+            shards = (items[i : i + shard_size] for i in range(0, len(items), shard_size))
+        else:
+            documents = iter(documents)
+            shards = iter(lambda: list(itertools.islice(documents, STREAM_SHARD_SIZE)), [])
+
+        indices = {name: self.index_class() for name in variants}
+        cache = None
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_init_shard_worker,
+            initargs=(self.processor,),
+        ) as executor:
+            pending = deque()
+            for shard in shards:
+                pending.append(
+                    executor.submit(_build_shard, (self.index_class, variants, shard))
+                )
+                while pending and (len(pending) >= num_workers * 2 or pending[0].done()):
+                    cache = self._merge_shard(indices, cache, pending.popleft().result())
+            while pending:
+                cache = self._merge_shard(indices, cache, pending.popleft().result())
+
+        elapsed = time.time() - t0
+        for name, index in indices.items():
+            self._register_index(name, index, elapsed, cache, variants[name])
+
+        return indices
+
+    def _merge_shard(self, indices, cache, result):
+        """Combina os índices parciais de um shard e soma o uso dos caches"""
+        partial, shard_cache = result
+        for name, index in indices.items():
+            index.merge(partial[name])
+        return self._sum_cache_stats(cache, shard_cache)
+
+    def apply_changes(self, documents, removed=()):
+        """
+        Atualiza os índices existentes em vez de reconstruí-los.
+
+        Cada documento novo ou alterado é processado uma única vez para todas as
+        variantes e atualizado em cada índice; documentos removidos viram
+        tombstones. Índices somente leitura (segmentos) são antes copiados para
+        um ``CompactInvertedIndex`` em memória.
+
+        Args:
+            documents (dict): Documentos novos ou alterados (id -> texto).
+            removed (iterable, opcional): IDs dos documentos removidos.
+
+        Returns:
+            float: Tempo gasto na atualização, em segundos.
+        """
+        t0 = time.time()
+        missing = [name for name in self.indices if name not in self.params]
+        if missing:
+            raise ValueError(f"Parâmetros desconhecidos para os índices: {missing}")
+        variants = {name: self.params[name] for name in self.indices}
+
+        for name, index in self.indices.items():
+            if index.read_only:
+                self.indices[name] = index.to_compact()
+
+        removed = list(removed)
+        for doc_id in removed:
+            self.documents.pop(doc_id, None)
+            for index in self.indices.values():
+                index.remove_document(doc_id)
+
+        for doc_id, doc_text in documents.items():
+            self.documents[doc_id] = doc_text
+            terms = self.processor.process_variants(doc_text, variants)
+            for name, index in self.indices.items():
+                index.update_document(doc_id, terms[name])
+
+        elapsed = time.time() - t0
+        for name, index in self.indices.items():
+            index.freeze()
+            self.stats[name].update(index.get_stats())
+            self.memory_usage[name] = index.estimate_size()
+
+        print(
+            f"Índices atualizados em {elapsed:.2f}s: {len(documents)} documentos "
+            f"novos ou alterados, {len(removed)} removidos."
+        )
+        return elapsed
+
+    @staticmethod
+    def _sum_cache_stats(total, shard_cache):
+        """Soma os acertos e falhas de cache de um shard ao total acumulado"""
+        if total is None:
+            return shard_cache
+        for name, info in shard_cache.items():
+            total[name]["hits"] += info["hits"]
+            total[name]["misses"] += info["misses"]
+            total[name]["size"] = max(total[name]["size"], info["size"])
+        return total
+
     def compare_indices(self):
         """Compara os diferentes índices criados"""
         if not self.indices:
@@ -304,6 +1388,13 @@ class IndexAnalyzer:
             print(f"  Média de Termos por Documento: {stats['mean_terms_per_doc']:.2f}")
             print(f"  Tamanho do Índice: {self.memory_usage[name]/1024/1024:.2f} MB")
             print(f"  Tempo de Indexação: {self.times[name]:.2f} s")
+            for cache_name, info in stats.get("cache", {}).items():
+                lookups = info["hits"] + info["misses"]
+                hit_rate = info["hits"] / lookups if lookups else 0.0
+                print(
+                    f"  Cache {cache_name}: {info['hits']} acertos, "
+                    f"{info['misses']} falhas ({hit_rate:.1%})"
+                )
 
     def test_search(self, query, top_n=5):
         """Testa a busca em todos os índices criados"""
@@ -317,16 +1408,16 @@ class IndexAnalyzer:
             processed_query = self.processor.process_text(query)
 
             start_time = time.time()
-            results = index.rank_search(processed_query["tokens"])
+            results = index.rank_search(processed_query["tokens"], top_k=top_n)
             end_time = time.time()
 
             print(f"\n{name}:")
             print(f"  Tempo de busca: {(end_time - start_time)*1000:.2f} ms")
-            print(f"  Documentos encontrados: {len(results)}")
+            print(f"  Documentos retornados: {len(results)}")
 
             if results:
-                print(f"  Top {min(top_n, len(results))} resultados:")
-                for i, (doc_id, score) in enumerate(results[:top_n]):
+                print(f"  Top {len(results)} resultados:")
+                for i, (doc_id, score) in enumerate(results):
                     print(f"    {i+1}. Documento {doc_id} (score: {score:.4f})")
             else:
                 print("  Nenhum documento encontrado.")
@@ -340,19 +1431,188 @@ class IndexAnalyzer:
         results = []
         processed = self.processor.process_text(query)["tokens"]
         for name, index in self.indices.items():
-            ranked = index.rank_search(processed)[:top_n]
+            ranked = index.rank_search(processed, top_k=top_n)
             results.append((name, ranked))
         return results
 
 
+INDEX_CACHE_VERSION = 1
+INDEX_CACHE_DIR = ".index_cache"
+# Estrutura dos índices usada pela aplicação e pelo script de indexação: "compact"
+# pontua as consultas com arrays NumPy; "dict" é a estrutura original
+INDEX_BACKEND = os.getenv("INDEX_BACKEND") or "compact"
+# Acima desta fração de documentos alterados, reconstruir é mais barato que atualizar
+INCREMENTAL_REFRESH_RATIO = 0.5
+
+_file_digests = {}
+
+
+def _file_digest(filepath):
+    """Calcula o SHA-256 de um arquivo, reaproveitando o resultado enquanto tamanho e mtime não mudarem"""
+    stat = os.stat(filepath)
+    key = (os.path.abspath(filepath), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_digests:
+        digest = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        _file_digests[key] = digest.hexdigest()
+    return _file_digests[key]
+
+
 class Index:
     def __init__(self, json_file_path=None, documents=None):
         self.json_file_path = json_file_path
         self.documents = documents or {}
 
+    def fingerprint(self, variants=None):
+        """
+        Identifica o conjunto de índices gerado a partir do arquivo JSON.
+
+        Combina o hash do conteúdo do arquivo com os parâmetros de cada variante
+        de índice, de modo que qualquer mudança em um deles invalida o cache.
+
+        Returns:
+            str: Fingerprint hexadecimal ou None se não houver arquivo JSON.
+        """
+        if not self.json_file_path or not os.path.exists(self.json_file_path):
+            return None
+        variants = variants if variants is not None else INDEX_VARIANTS
+        params = {
+            name: IndexAnalyzer.resolve_params(variant)
+            for name, variant in variants.items()
+        }
+        digest = hashlib.sha256()
+        digest.update(_file_digest(self.json_file_path).encode())
+        digest.update(json.dumps(params, sort_keys=True).encode())
+        digest.update(str(INDEX_CACHE_VERSION).encode())
+        return digest.hexdigest()[:32]
+
+    @staticmethod
+    def document_digest(text):
+        """Resumo do texto de um documento, usado para detectar alterações"""
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _save_document_digests(self, cache_path):
+        """Grava o resumo de cada documento indexado junto aos índices do cache"""
+        digests = {
+            doc_id: self.document_digest(text) for doc_id, text in self._document_items()
+        }
+        with open(os.path.join(cache_path, "documents.json"), "w", encoding="utf-8") as f:
+            json.dump(digests, f, ensure_ascii=False)
+
+    def _refresh_from_cache(self, cache_dir, processor):
+        """
+        Atualiza incrementalmente os índices mais recentes do cache.
+
+        Compara os documentos atuais com os resumos gravados junto aos índices e
+        aplica apenas as inclusões, alterações e remoções, sem reprocessar o
+        restante do corpus.
+
+        Returns:
+            IndexAnalyzer: Analisador atualizado ou None se não houver índices
+                reaproveitáveis (parâmetros diferentes ou alterações demais).
+        """
+        from service.segment import load_analyzer
+
+        if not os.path.isdir(cache_dir):
+            return None
+        previous = [
+            os.path.join(cache_dir, entry)
+            for entry in os.listdir(cache_dir)
+            if os.path.exists(os.path.join(cache_dir, entry, "documents.json"))
+        ]
+        if not previous:
+            return None
+        cache_path = max(previous, key=os.path.getmtime)
+
+        try:
+            with open(os.path.join(cache_path, "documents.json"), "r", encoding="utf-8") as f:
+                digests = json.load(f)
+            changed = {}
+            current = set()
+            for doc_id, text in self._document_items():
+                current.add(doc_id)
+                if digests.get(doc_id) != self.document_digest(text):
+                    changed[doc_id] = text
+            removed = [doc_id for doc_id in digests if doc_id not in current]
+            if len(changed) + len(removed) > INCREMENTAL_REFRESH_RATIO * len(current):
+                return None
+
+            analyzer = load_analyzer(cache_path, processor, self.documents)
+            variants = {
+                name: IndexAnalyzer.resolve_params(params)
+                for name, params in INDEX_VARIANTS.items()
+            }
+            if analyzer.params != variants:
+                return None
+
+            print(f"Atualizando índices do cache: {cache_path}")
+            analyzer.apply_changes(changed, removed)
+            return analyzer
+        except Exception as e:
+            print(f"Não foi possível atualizar os índices do cache: {e}")
+            return None
+
+    @staticmethod
+    def _prune_cache(cache_dir, cache_path):
+        """
+        Remove do cache os índices concluídos mais antigos que ``cache_path``.
+
+        Pastas ``.tmp`` (gravações em andamento, possivelmente de outro processo)
+        e índices mais recentes são preservados.
+        """
+        current_mtime = os.path.getmtime(cache_path)
+        for entry in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, entry)
+            if (
+                entry.endswith(".tmp")
+                or entry == os.path.basename(cache_path)
+                or not os.path.exists(os.path.join(path, "manifest.json"))
+            ):
+                continue
+            try:
+                if os.path.getmtime(path) <= current_mtime:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                continue
+
+    def iter_documents(self):
+        """
+        Percorre os documentos do arquivo de mapeamento.
+
+        Em JSON Lines (``.jsonl``), os registros são lidos um a um, sem carregar
+        o arquivo inteiro; no JSON aninhado, o arquivo é carregado e percorrido.
+
+        Yields:
+            tuple: (id, texto) de cada documento.
+        """
+        if self.json_file_path.endswith(".jsonl"):
+            for record in iter_jsonl_records(self.json_file_path):
+                if "content" in record:
+                    yield record["id"], record["content"]
+            return
+
+        with open(self.json_file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        for date_key, date_content in data.get("ipea", {}).items():
+            for subdir_name, subdir_content in date_content.items():
+                for file_name, file_info in subdir_content.items():
+                    if isinstance(file_info, dict) and "content" in file_info:
+                        doc_path = f"{date_key}/{subdir_name}/{file_name}"
+                        yield doc_path, file_info.get("content", "")
+                    elif isinstance(file_info, str):
+                        doc_path = f"{date_key}/{subdir_name}/{file_name}"
+                        yield doc_path, "Conteúdo não disponível"
+
+    def _document_items(self):
+        """Documentos em memória ou, se não foram carregados, lidos do arquivo"""
+        return self.documents.items() if self.documents else self.iter_documents()
+
     def load_from_json(self):
         """
-        Carrega documentos a partir do arquivo JSON no novo formato.
+        Carrega documentos a partir do arquivo de mapeamento (JSON ou JSON Lines).
 
         Returns:
             Dict[str, str]: Dicionário de documentos (id -> texto)
@@ -362,24 +1622,7 @@ class Index:
             return self.documents
 
         try:
-            with open(self.json_file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            documents = {}
-            doc_id = 1
-
-            for date_key, date_content in data.get("ipea", {}).items():
-                for subdir_name, subdir_content in date_content.items():
-                    for file_name, file_info in subdir_content.items():
-                        if isinstance(file_info, dict) and "content" in file_info:
-                            doc_path = f"{date_key}/{subdir_name}/{file_name}"
-                            content = file_info.get("content", "")
-                            documents[doc_path] = content
-                            doc_id += 1
-                        elif isinstance(file_info, str):
-                            doc_path = f"{date_key}/{subdir_name}/{file_name}"
-                            documents[doc_path] = "Conteúdo não disponível"
-                            doc_id += 1
-
+            documents = dict(self.iter_documents())
             print(f"Carregados {len(documents)} documentos do arquivo JSON.")
             self.documents = documents
             return documents
@@ -388,44 +1631,73 @@ class Index:
             print(f"Erro ao carregar o arquivo JSON: {e}")
             return self.documents
 
-    def start(self):
+    def start(self, num_workers=None, backend="dict", cache_dir=None, keep_documents=True):
         """
         Inicia o processo de indexação.
 
+        Args:
+            num_workers (int, opcional): Número de processos usados na construção
+                dos índices. Se None ou 1, a construção é sequencial.
+            backend (str, opcional): Estrutura dos índices, "dict" (padrão) ou
+                "compact" (IDs inteiros e postings em arrays).
+            cache_dir (str, opcional): Diretório do cache de índices. Se o cache
+                tiver índices com o mesmo fingerprint, eles são abertos (como
+                segmentos mapeados em memória) em vez de reconstruídos. Senão,
+                os índices de uma versão anterior do JSON são atualizados apenas
+                com os documentos alterados, se possível, ou reconstruídos; em
+                ambos os casos o resultado é gravado no cache.
+            keep_documents (bool, opcional): Se False e o mapeamento for JSON
+                Lines, os documentos são lidos do arquivo em lotes durante a
+                indexação em vez de carregados de uma vez, e ``documents`` fica
+                vazio. Útil quando só os índices interessam.
+
         Returns:
             IndexAnalyzer: O analisador de índices configurado.
         """
-        if self.json_file_path and not self.documents:
+        processor = TextProcessor()
+        # O fingerprint depende só do arquivo: o cache é consultado antes de
+        # carregar os documentos, que num acerto só são lidos se forem mantidos
+        fingerprint = self.fingerprint() if cache_dir else None
+        if fingerprint:
+            from service.segment import load_analyzer, save_analyzer
+
+            cache_path = os.path.join(cache_dir, fingerprint)
+            if os.path.exists(os.path.join(cache_path, "manifest.json")):
+                if keep_documents and not self.documents:
+                    self.load_from_json()
+                print(f"Carregando índices do cache: {cache_path}")
+                return load_analyzer(cache_path, processor, self.documents)
+
+        streaming = (
+            not keep_documents
+            and not self.documents
+            and bool(self.json_file_path)
+            and self.json_file_path.endswith(".jsonl")
+        )
+        if self.json_file_path and not self.documents and not streaming:
             self.load_from_json()
 
-        if not self.documents:
+        if not self.documents and not streaming:
             print("Nenhum documento para indexar.")
             return None
 
-        processor = TextProcessor()
-        analyzer = IndexAnalyzer(processor, self.documents)
-        analyzer.create_index("básico")
-
-        analyzer.create_index(
-            "sem_stopwords", {"remove_stop": True, "apply_stem": False}
-        )
-
-        analyzer.create_index("com_stemming", {"remove_stop": True, "apply_stem": True})
-
-        analyzer.create_index(
-            "bigramas",
-            {
-                "remove_stop": True,
-                "apply_stem": True,
-                "create_grams": True,
-                "n_gram": 2,
-            },
-        )
-
-        analyzer.create_index(
-            "shingles",
-            {"remove_stop": True, "apply_stem": True, "create_shing": True, "max_n": 3},
-        )
+        analyzer = self._refresh_from_cache(cache_dir, processor) if fingerprint else None
+        if analyzer is None:
+            analyzer = IndexAnalyzer(processor, self.documents, backend=backend)
+            analyzer.create_indices(
+                INDEX_VARIANTS,
+                num_workers=num_workers,
+                documents=self.iter_documents() if streaming else None,
+            )
+            if not any(stats["num_documents"] for stats in analyzer.stats.values()):
+                print("Nenhum documento para indexar.")
+                return None
+
+        if fingerprint:
+            save_analyzer(analyzer, cache_path)
+            self._save_document_digests(cache_path)
+            self._prune_cache(cache_dir, cache_path)
+            print(f"Índices gravados no cache: {cache_path}")
 
         return analyzer
 
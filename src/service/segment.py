@@ -0,0 +1,501 @@
+"""
+Formato de segmento em disco para os índices invertidos.
+
+Um segmento guarda um índice já construído em seções contíguas: o dicionário de
+termos ordenado, as postings (IDs de documento e frequências) de todos os termos
+em blocos únicos e a tabela de documentos. O arquivo é aberto com ``mmap``, de
+modo que a carga é praticamente instantânea e vários processos compartilham as
+mesmas páginas pelo cache de páginas do sistema operacional.
+
+Layout (inteiros little-endian, seções alinhadas em 8 bytes)::
+
+    cabeçalho    magic, versão, nº de termos, nº de documentos, nº de postings
+                 e o deslocamento de cada seção abaixo
+    term_offsets u64[num_terms + 1]   início de cada termo em term_blob
+    term_blob    termos em UTF-8, em ordem crescente
+    offsets      u64[num_terms + 1]   início das postings de cada termo
+    max_tf       u32[num_terms]       maior frequência do termo em um documento
+    docs         u32[num_postings]    IDs de documento, crescentes por termo
+    freqs        u32[num_postings]    frequência do termo em cada documento
+    doc_offsets  u64[num_docs + 1]    início de cada caminho em doc_blob
+    doc_blob     caminhos dos documentos em UTF-8
+    doc_lengths  u32[num_docs]        número de termos de cada documento
+"""
+
+import json
+import mmap
+import os
+import pickle
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Mapping, Sequence
+
+from service.index import CompactInvertedIndex, IndexAnalyzer, InvertedIndex
+
+MAGIC = b"IPEASEG\0"
+VERSION = 1
+SECTIONS = (
+    "term_offsets",
+    "term_blob",
+    "offsets",
+    "max_tf",
+    "docs",
+    "freqs",
+    "doc_offsets",
+    "doc_blob",
+    "doc_lengths",
+)
+_HEADER = struct.Struct(f"<8sIIQQQ{len(SECTIONS)}Q")
+
+
+def _to_compact(index):
+    """Converte um InvertedIndex em CompactInvertedIndex, preservando a ordem dos documentos"""
+    if isinstance(index, CompactInvertedIndex):
+        index.compact()
+        index.freeze()
+        return index
+
+    compact = CompactInvertedIndex()
+    compact.doc_paths = list(index.documents)
+    compact.doc_ids = {path: did for did, path in enumerate(compact.doc_paths)}
+    compact.doc_lengths = array("I", index.documents.values())
+    compact.total_docs = len(compact.doc_paths)
+    for term in index.index:
+        postings = index.get_postings(term)
+        if not postings:
+            continue
+        tid = compact._term_id(term)
+        entries = sorted((compact.doc_ids[doc_id], count) for doc_id, count in postings)
+        compact.postings_docs[tid].extend(did for did, _ in entries)
+        compact.postings_freqs[tid].extend(count for _, count in entries)
+        compact.max_tf[tid] = max(count for _, count in entries)
+    compact.freeze()
+    return compact
+
+
+def _string_table(strings):
+    """Codifica uma lista de strings como (offsets u64, blob UTF-8)"""
+    offsets = array("Q", [0])
+    blob = bytearray()
+    for value in strings:
+        blob += value.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def _as_bytes(values):
+    if isinstance(values, (bytes, bytearray)):
+        return bytes(values)
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_segment(index, filepath):
+    """
+    Grava um índice (InvertedIndex ou CompactInvertedIndex) em um arquivo de segmento.
+
+    Os termos são reordenados alfabeticamente para permitir busca binária no
+    dicionário; os IDs de documento seguem a ordem de inserção.
+
+    Args:
+        index (InvertedIndex): Índice a ser gravado.
+        filepath (str): Caminho do arquivo de segmento.
+    """
+    compact = _to_compact(index)
+    terms = sorted(compact.term_ids)
+
+    postings_offsets = array("Q", [0])
+    docs = array("I")
+    freqs = array("I")
+    max_tf = array("I")
+    for term in terms:
+        tid = compact.term_ids[term]
+        term_docs, term_freqs = compact._postings(tid)
+        docs.extend(term_docs)
+        freqs.extend(term_freqs)
+        postings_offsets.append(len(docs))
+        max_tf.append(compact.max_tf[tid])
+
+    term_offsets, term_blob = _string_table(terms)
+    doc_offsets, doc_blob = _string_table(compact.doc_paths)
+    sections = {
+        "term_offsets": term_offsets,
+        "term_blob": term_blob,
+        "offsets": postings_offsets,
+        "max_tf": max_tf,
+        "docs": docs,
+        "freqs": freqs,
+        "doc_offsets": doc_offsets,
+        "doc_blob": doc_blob,
+        "doc_lengths": array("I", compact.doc_lengths),
+    }
+
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        positions = []
+        for name in SECTIONS:
+            padding = -f.tell() % 8
+            f.write(b"\0" * padding)
+            positions.append(f.tell())
+            f.write(_as_bytes(sections[name]))
+        f.seek(0)
+        f.write(
+            _HEADER.pack(
+                MAGIC,
+                VERSION,
+                0,
+                len(terms),
+                len(compact.doc_paths),
+                len(docs),
+                *positions,
+            )
+        )
+    os.replace(tmp_path, filepath)
+
+
+class _StringTable(Sequence):
+    """Sequência de strings lida sob demanda de uma tabela (offsets, blob) mapeada"""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def raw(self, i):
+        return bytes(self._blob[self._offsets[i] : self._offsets[i + 1]])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return str(self.raw(i), "utf-8")
+
+
+class _TermDictionary(Mapping):
+    """Dicionário termo -> ID sobre a tabela ordenada de termos, com busca binária"""
+
+    def __init__(self, terms):
+        self._terms = terms
+
+    def _find(self, term):
+        if not isinstance(term, str):
+            return None
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self._terms)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._terms.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._terms) and self._terms.raw(lo) == key:
+            return lo
+        return None
+
+    def __getitem__(self, term):
+        tid = self._find(term)
+        if tid is None:
+            raise KeyError(term)
+        return tid
+
+    def get(self, term, default=None):
+        tid = self._find(term)
+        return default if tid is None else tid
+
+    def __contains__(self, term):
+        return self._find(term) is not None
+
+    def __iter__(self):
+        return iter(self._terms)
+
+    def __len__(self):
+        return len(self._terms)
+
+
+class SegmentInvertedIndex(CompactInvertedIndex):
+    """
+    Índice somente leitura aberto a partir de um arquivo de segmento com ``mmap``.
+
+    Nenhuma posting é carregada para a memória do processo: as consultas leem
+    diretamente das páginas mapeadas. A API de consulta é a mesma de
+    ``CompactInvertedIndex``. Para alterar documentos, ``to_compact`` copia o
+    segmento para um ``CompactInvertedIndex`` em memória.
+    """
+
+    read_only = True
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._mmap = None
+        try:
+            # O mapeamento continua válido depois que o arquivo é fechado
+            with open(filepath, "rb") as f:
+                # Arquivo vazio (mmap) ou menor que o cabeçalho (unpack_from)
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            num_docs, start, counts = self._read_header(self._mmap)
+        except (ValueError, struct.error) as e:
+            self.close()
+            raise ValueError(
+                f"Arquivo de segmento inválido ou incompatível: {filepath}"
+            ) from e
+        buffer = memoryview(self._mmap)
+
+        views = {}
+        for name, (typecode, count) in counts.items():
+            size = count * array(typecode).itemsize
+            views[name] = buffer[start[name] : start[name] + size].cast(typecode)
+        term_blob = buffer[start["term_blob"] : start["offsets"]]
+        doc_blob = buffer[start["doc_blob"] : start["doc_lengths"]]
+
+        self.term_ids = _TermDictionary(_StringTable(views["term_offsets"], term_blob))
+        self.doc_paths = _StringTable(views["doc_offsets"], doc_blob)
+        self.doc_lengths = views["doc_lengths"]
+        self.total_docs = num_docs
+        self.offsets = views["offsets"]
+        self.docs = views["docs"]
+        self.freqs = views["freqs"]
+        self.max_tf = views["max_tf"]
+        self.postings_docs = self.postings_freqs = None
+        self._views = (self.docs, self.freqs)
+        self._doc_ids = None
+        self.deleted = set()
+        self._stale_df = None
+
+    @staticmethod
+    def _read_header(data):
+        """
+        Lê o cabeçalho e confere que todas as seções cabem no arquivo.
+
+        Raises:
+            ValueError: Se o arquivo não for um segmento compatível ou estiver truncado.
+        """
+        magic, version, _, num_terms, num_docs, num_postings, *positions = (
+            _HEADER.unpack_from(data)
+        )
+        if magic != MAGIC or version != VERSION or sys.byteorder != "little":
+            raise ValueError("cabeçalho incompatível")
+
+        start = dict(zip(SECTIONS, positions))
+        counts = {
+            "term_offsets": ("Q", num_terms + 1),
+            "offsets": ("Q", num_terms + 1),
+            "max_tf": ("I", num_terms),
+            "docs": ("I", num_postings),
+            "freqs": ("I", num_postings),
+            "doc_offsets": ("Q", num_docs + 1),
+            "doc_lengths": ("I", num_docs),
+        }
+        ends = {
+            name: start[name] + count * array(typecode).itemsize
+            for name, (typecode, count) in counts.items()
+        }
+        ends["term_blob"] = start["offsets"]
+        ends["doc_blob"] = start["doc_lengths"]
+        for name in SECTIONS:
+            if not _HEADER.size <= start[name] <= ends[name] <= len(data):
+                raise ValueError(f"seção {name} fora do arquivo")
+        return num_docs, start, counts
+
+    def __getstate__(self):
+        return {"filepath": self.filepath}
+
+    def __setstate__(self, state):
+        self.__init__(state["filepath"])
+
+    @property
+    def doc_ids(self):
+        if self._doc_ids is None:
+            self._doc_ids = {path: did for did, path in enumerate(self.doc_paths)}
+        return self._doc_ids
+
+    def add_document(self, doc_id, tokens):
+        raise NotImplementedError("Índices em segmento são somente leitura")
+
+    def update_document(self, doc_id, tokens):
+        raise NotImplementedError("Índices em segmento são somente leitura")
+
+    def remove_document(self, doc_id):
+        raise NotImplementedError("Índices em segmento são somente leitura")
+
+    def merge(self, other):
+        raise NotImplementedError("Índices em segmento são somente leitura")
+
+    def compact(self):
+        """Segmentos não têm tombstones; nada a fazer"""
+
+    def to_compact(self):
+        """Copia o segmento para um CompactInvertedIndex em memória, que aceita alterações"""
+        compact = CompactInvertedIndex()
+        compact.term_ids = {term: tid for tid, term in enumerate(self.term_ids)}
+        compact.doc_paths = list(self.doc_paths)
+        compact.doc_ids = {path: did for did, path in enumerate(compact.doc_paths)}
+        compact.total_docs = len(compact.doc_paths)
+        for name, typecode in (
+            ("doc_lengths", "I"),
+            ("offsets", "Q"),
+            ("docs", "I"),
+            ("freqs", "I"),
+            ("max_tf", "I"),
+        ):
+            values = array(typecode)
+            values.frombytes(getattr(self, name).cast("B"))
+            setattr(compact, name, values)
+        compact.postings_docs = compact.postings_freqs = None
+        return compact
+
+    def save_index(self, filepath):
+        """Grava uma cópia do segmento em outro arquivo"""
+        write_segment(self, filepath)
+
+    def load_index(self, filepath):
+        """Reabre o índice a partir de outro arquivo de segmento"""
+        self.close()
+        self.__init__(filepath)
+
+    def estimate_size(self):
+        """Retorna o tamanho do arquivo de segmento, em bytes"""
+        return os.path.getsize(self.filepath)
+
+    def close(self):
+        """
+        Libera o mapeamento do arquivo.
+
+        Views ainda referenciadas fora do índice (por exemplo, arrays NumPy de uma
+        consulta em andamento) mantêm o mapeamento vivo até serem descartadas.
+        """
+        self.term_ids = {}
+        self.doc_paths = []
+        self.offsets = self.docs = self.freqs = self.max_tf = self.doc_lengths = None
+        self._views = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+            self._mmap = None
+
+
+def save_analyzer(analyzer, directory):
+    """
+    Grava os índices de um IndexAnalyzer como segmentos em um diretório.
+
+    Além de um segmento por índice, grava ``manifest.json`` com as estatísticas,
+    tempos e tamanhos de cada índice. O diretório é escrito em uma pasta
+    temporária própria (``<diretório>.<aleatório>.tmp``) e renomeado ao final,
+    para que leitores nunca vejam um cache incompleto. Se outro processo gravar
+    o mesmo diretório primeiro, a cópia deste é descartada e a dele é mantida.
+
+    Args:
+        analyzer (IndexAnalyzer): Analisador com os índices construídos.
+        directory (str): Diretório de destino.
+    """
+    directory = os.path.abspath(directory)
+    parent, name = os.path.split(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=f"{name}.", suffix=".tmp")
+    try:
+        manifest = {"indices": {}}
+        for i, (index_name, index) in enumerate(analyzer.indices.items()):
+            filename = f"{i}.seg"
+            write_segment(index, os.path.join(tmp_dir, filename))
+            manifest["indices"][index_name] = {
+                "file": filename,
+                "stats": analyzer.stats[index_name],
+                "time": analyzer.times[index_name],
+                "memory_usage": analyzer.memory_usage[index_name],
+                "params": analyzer.params.get(index_name),
+            }
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        if os.path.isdir(directory) and not _is_complete(directory):
+            # Sobra de uma versão que gravava direto no diretório
+            shutil.rmtree(directory, ignore_errors=True)
+        try:
+            os.rename(tmp_dir, directory)
+        except OSError:
+            if not _is_complete(directory):
+                raise
+            # Outro processo gravou o mesmo fingerprint antes
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _is_complete(directory):
+    """True se o diretório tem um cache gravado por inteiro"""
+    return os.path.exists(os.path.join(directory, "manifest.json"))
+
+
+def load_analyzer(directory, processor, documents):
+    """
+    Abre os índices gravados por ``save_analyzer`` em um novo IndexAnalyzer.
+
+    Args:
+        directory (str): Diretório do cache.
+        processor (TextProcessor): Processador usado nas consultas.
+        documents (dict): Documentos indexados (id -> texto).
+
+    Returns:
+        IndexAnalyzer: Analisador com índices ``SegmentInvertedIndex``.
+    """
+    with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    analyzer = IndexAnalyzer(processor, documents)
+    for name, entry in manifest["indices"].items():
+        analyzer.indices[name] = SegmentInvertedIndex(
+            os.path.join(directory, entry["file"])
+        )
+        analyzer.stats[name] = entry["stats"]
+        analyzer.times[name] = entry["time"]
+        analyzer.memory_usage[name] = entry["memory_usage"]
+        if entry.get("params") is not None:
+            analyzer.params[name] = entry["params"]
+    return analyzer
+
+
+def convert_pickle_to_segment(pickle_path, segment_path=None):
+    """
+    Converte um índice salvo com ``save_index`` (pickle) para o formato de segmento.
+
+    Aceita tanto arquivos de ``InvertedIndex`` quanto de ``CompactInvertedIndex``.
+
+    Args:
+        pickle_path (str): Caminho do arquivo pickle.
+        segment_path (str, opcional): Caminho do segmento. Padrão: mesmo nome com
+            extensão ``.seg``.
+
+    Returns:
+        str: Caminho do segmento gravado.
+    """
+    if segment_path is None:
+        segment_path = os.path.splitext(pickle_path)[0] + ".seg"
+
+    with open(pickle_path, "rb") as f:
+        data = pickle.load(f)
+    index = CompactInvertedIndex() if "term_ids" in data else InvertedIndex()
+    index.load_index(pickle_path)
+
+    write_segment(index, segment_path)
+    print(f"Segmento gravado em: {segment_path}")
+    return segment_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python -m service.segment <indice.pkl> [saida.seg]")
+        sys.exit(1)
+    convert_pickle_to_segment(*sys.argv[1:3])
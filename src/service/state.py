@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+# Diretório do estado da extração quando ele é mantido em disco local
+CRAWL_STATE_DIR = os.getenv("CRAWL_STATE_DIR") or os.path.join(
+    tempfile.gettempdir(), "crawl_state"
+)
+
+
+def _is_missing(error):
+    """Arquivo local ou objeto do S3 inexistente (primeira execução)"""
+    if isinstance(error, FileNotFoundError):
+        return True
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in ("NoSuchKey", "404")
+
+
+class JSONStore:
+    """
+    Dicionário mantido entre execuções como um JSON em disco local ou, com
+    ``bucket_name``, como um objeto no S3. Acesso seguro entre threads.
+    """
+
+    def __init__(self, path, bucket_name=None, s3_client=None):
+        """
+        Args:
+            path (str): Caminho do arquivo (chave do objeto, se houver bucket).
+            bucket_name (str, opcional): Bucket onde o JSON é mantido.
+            s3_client (opcional): Cliente S3 usado para ler e gravar no bucket.
+        """
+        self.path = path
+        self.bucket_name = bucket_name
+        self.s3 = s3_client
+        self.entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            if self.bucket_name:
+                body = self.s3.get_object(Bucket=self.bucket_name, Key=self.path)[
+                    "Body"
+                ].read()
+            else:
+                with open(self.path, "rb") as f:
+                    body = f.read()
+            self.entries = json.loads(body)
+        except Exception as e:
+            if not _is_missing(e):
+                print(f"Estado anterior ignorado ({self.path}): {e}")
+            self.entries = {}
+
+    def save(self):
+        with self._lock:
+            body = json.dumps(self.entries, ensure_ascii=False).encode("utf-8")
+        if self.bucket_name:
+            self.s3.put_object(
+                Bucket=self.bucket_name,
+                Key=self.path,
+                Body=body,
+                ContentType="application/json",
+            )
+        else:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(body)
+            os.replace(temp_path, self.path)
+
+    def get(self, key):
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key, entry):
+        with self._lock:
+            self.entries[key] = entry
+
+
+class CrawlState(JSONStore):
+    """
+    Estado das séries entre extrações, por numero_js: o último período visto na
+    grade, o SHA-256 do HTML salvo e a chave onde ele foi salvo.
+
+    Uma série cujo período não avançou não precisa ser baixada de novo; uma
+    página baixada com o mesmo conteúdo e a mesma chave não precisa ser reenviada.
+    Com ``force``, todas as séries são baixadas, mas o hash ainda evita reenviar
+    as que não mudaram.
+    """
+
+    def __init__(self, path=None, bucket_name=None, s3_client=None, force=False):
+        super().__init__(
+            path or os.path.join(CRAWL_STATE_DIR, "series.json"),
+            bucket_name,
+            s3_client,
+        )
+        self.force = force
+        self.skipped_fetch = 0
+        self.skipped_upload = 0
+
+    def period_unchanged(self, numero_js, periodo):
+        """True se a série já foi salva com este período"""
+        if self.force:
+            return False
+        with self._lock:
+            entry = self.entries.get(numero_js)
+            unchanged = entry is not None and entry.get("periodo") == periodo
+            if unchanged:
+                self.skipped_fetch += 1
+        return unchanged
+
+    def content_unchanged(self, numero_js, periodo, content, key):
+        """
+        Registra a página baixada e retorna True se ela é idêntica à última salva
+        na mesma chave (dispensando o envio).
+        """
+        sha256 = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            entry = self.entries.get(numero_js) or {}
+            unchanged = entry.get("sha256") == sha256 and entry.get("key") == key
+            self.entries[numero_js] = {
+                "periodo": periodo,
+                "sha256": sha256,
+                "key": key,
+                "updated_at": (
+                    entry.get("updated_at")
+                    if unchanged
+                    else datetime.now().isoformat()
+                ),
+            }
+            if unchanged:
+                self.skipped_upload += 1
+        return unchanged
+
+    def save(self, failed_keys=()):
+        """
+        Grava o estado, descartando as séries cujo envio falhou para que sejam
+        baixadas de novo na próxima extração.
+        """
+        failed_keys = set(failed_keys)
+        if failed_keys:
+            with self._lock:
+                self.entries = {
+                    numero_js: entry
+                    for numero_js, entry in self.entries.items()
+                    if entry.get("key") not in failed_keys
+                }
+        super().save()
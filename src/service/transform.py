@@ -1,16 +1,165 @@
 #!/usr/bin/env python3
 import concurrent.futures
+import hashlib
 import json
 import logging
 import multiprocessing
-from pathlib import Path
 import os
+from pathlib import Path
+
 import html_to_json
 from tqdm import tqdm
 
+from service.html_text import find_cell_values, html_to_dict
+
+# Motores de extração: "html_parser" monta a estrutura do html_to_json em uma única
+# passada do html.parser; "html_to_json" usa a biblioteca (árvore completa do BeautifulSoup)
+EXTRACTION_ENGINES = {
+    "html_parser": html_to_dict,
+    "html_to_json": html_to_json.convert,
+}
+
+# Célula com o texto da série nas páginas das pastas date=:
+# ["html"][0]["body"][0]["form"][0]["table"][0]["tbody"][0]["tr"][0]["td"][1].
+# O tbody é inserido pelo navegador; no HTML baixado por HTTP (FETCH_MODE=http)
+# as linhas ficam direto na tabela
+SERIES_CELL_PATHS = [
+    [
+        ("html", 0), ("body", 0), ("form", 0), ("table", 0),
+        ("tbody", 0), ("tr", 0), ("td", 1),
+    ],
+    [
+        ("html", 0), ("body", 0), ("form", 0), ("table", 0),
+        ("tr", 0), ("td", 1),
+    ],
+]
+
+
+def _series_cell_values(document):
+    """_values da célula da série na árvore, pelo primeiro caminho que existir"""
+    for path in SERIES_CELL_PATHS:
+        try:
+            node = document
+            for tag, index in path:
+                node = node[tag][index]
+            return node["_values"]
+        except (KeyError, IndexError):
+            continue
+    raise KeyError("_values")
+
+
+def file_sha256(file_path):
+    """Calcula o SHA-256 do conteúdo de um arquivo."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_jsonl_records(file_path):
+    """
+    Lê um mapeamento em JSON Lines registro a registro.
+
+    Yields:
+        dict: Um registro por arquivo HTML mapeado.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def process_html_file(task):
+    """
+    Processa um único arquivo HTML em um processo worker.
+
+    Args:
+        task (tuple): (caminho do arquivo, caminho relativo ao diretório 'ipea',
+            extract_content, is_pdf_format, motor de extração), todos com tipos
+            simples para serialização barata.
+
+    Returns:
+        tuple: (caminho do arquivo, file_info)
+    """
+    html_file, rel_path, extract_content, is_pdf_format, engine = task
+    stat = os.stat(html_file)
+    file_info = {
+        "path": rel_path,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": file_sha256(html_file),
+    }
+    if extract_content:
+        if is_pdf_format:
+            file_info["content"] = HTMLFileMapper.extract_html_content_pdf_format(html_file, engine)
+        else:
+            file_info["content"] = HTMLFileMapper.extract_html_content_date_format(html_file, engine)
+
+    return html_file, file_info
+
+
+def process_html_chunk(tasks):
+    """Processa um lote de arquivos HTML em um processo worker."""
+    return [process_html_file(task) for task in tasks]
+
+
+def plan_chunks(tasks, sizes, num_workers, chunks_per_worker=8, max_chunk_files=200):
+    """
+    Agrupa as tarefas em lotes de tamanho (em bytes) parecido, maiores primeiro.
+
+    Arquivos maiores que o orçamento de um lote viram lotes próprios e são
+    enviados primeiro; os pequenos fecham a fila, equilibrando o fim da execução
+    entre os workers.
+
+    Args:
+        tasks (list): Tarefas de ``process_html_file``.
+        sizes (list): Tamanho em bytes de cada tarefa.
+        num_workers (int): Número de processos.
+        chunks_per_worker (int): Lotes desejados por worker.
+        max_chunk_files (int): Máximo de arquivos por lote.
+
+    Returns:
+        list: Lotes de tarefas, na ordem de envio.
+    """
+    order = sorted(range(len(tasks)), key=lambda i: sizes[i], reverse=True)
+    budget = max(1, sum(sizes) // max(1, num_workers * chunks_per_worker))
+    chunks = []
+    chunk, chunk_bytes = [], 0
+    for i in order:
+        chunk.append(tasks[i])
+        chunk_bytes += sizes[i]
+        if chunk_bytes >= budget or len(chunk) >= max_chunk_files:
+            chunks.append(chunk)
+            chunk, chunk_bytes = [], 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
 
 class HTMLFileMapper:
-    def __init__(self, root_dir=None, output_file="html_files_map.json", num_workers=None):
+    """
+    Mapeia os arquivos HTML do diretório 'ipea' e extrai seu conteúdo.
+
+    Se ``output_file`` terminar em ``.jsonl``, o mapeamento é gravado em JSON
+    Lines, um registro por arquivo, à medida que cada lote termina, e o conteúdo
+    extraído não é mantido em memória. O registro traz o identificador do
+    documento (``id``, no formato ``<data>/<subdiretório>/<arquivo>``) além dos
+    campos de cada arquivo no JSON aninhado.
+
+    Os lotes terminam em ordem arbitrária; para que a saída não dependa disso,
+    os registros são reordenados pelo ``id`` ao final e, no JSON aninhado, os
+    arquivos de cada diretório são ordenados pelo nome.
+    """
+
+    def __init__(
+        self,
+        root_dir=None,
+        output_file="html_files_map.json",
+        num_workers=None,
+        incremental=False,
+        engine="html_parser",
+    ):
         self.root_dir = Path(root_dir) if root_dir else Path.cwd()
 
         # Garante que o arquivo de saída seja criado no diretório correto
@@ -22,17 +171,44 @@ class HTMLFileMapper:
 
         self.result = {"ipea": {}}
         self.num_workers = num_workers if num_workers else multiprocessing.cpu_count()
+        self.incremental = incremental
+        if engine not in EXTRACTION_ENGINES:
+            raise ValueError(f"Motor de extração desconhecido: {engine}")
+        self.engine = engine
+        self.streaming = self.output_file.endswith(".jsonl")
+        self._stream = None
+        # (id, caminho relativo, posição, tamanho) de cada registro gravado
+        self._stream_records = []
+        self._previous_stream = None
 
         logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
         self.logger = logging.getLogger(__name__)
 
+    def write_sorted_stream(self, unsorted_path):
+        """
+        Copia os registros gravados em ``unsorted_path`` para ``<saída>.tmp``
+        ordenados pelo ``id``, lendo cada um pela posição guardada ao gravá-lo.
+        """
+        with open(unsorted_path, "rb") as src, open(f"{self.output_file}.tmp", "wb") as dst:
+            for _, _, offset, length in sorted(self._stream_records):
+                src.seek(offset)
+                dst.write(src.read(length))
+        os.remove(unsorted_path)
+        self._stream_records = []
+
     def save_json(self):
-        """Salva a estrutura de dados em um arquivo JSON."""
+        """Salva a estrutura de dados em um arquivo JSON (ou finaliza o JSON Lines)."""
         try:
             os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
 
-            with open(self.output_file, "w", encoding="utf-8") as f:
-                json.dump(self.result, f, ensure_ascii=False, indent=2)
+            if self.streaming:
+                if not os.path.exists(f"{self.output_file}.tmp"):
+                    # Nenhum mapeamento feito (diretório raiz inexistente)
+                    open(f"{self.output_file}.tmp", "wb").close()
+                os.replace(f"{self.output_file}.tmp", self.output_file)
+            else:
+                with open(self.output_file, "w", encoding="utf-8") as f:
+                    json.dump(self.result, f, ensure_ascii=False, indent=2)
 
             self.logger.info(f"Arquivo JSON gerado com sucesso: {self.output_file}")
             file_size = os.path.getsize(self.output_file)
@@ -62,12 +238,13 @@ class HTMLFileMapper:
         return self.root_dir
 
     @staticmethod
-    def extract_html_content_date_format(html_file_path):
+    def extract_html_content_date_format(html_file_path, engine="html_parser"):
         """
-        Extrai o conteúdo de um arquivo HTML das pastas date= usando html_to_json.
+        Extrai o conteúdo de um arquivo HTML das pastas date=.
 
         Args:
             html_file_path (Path): Caminho para o arquivo HTML.
+            engine (str): Motor de extração (ver EXTRACTION_ENGINES).
 
         Returns:
             str: Texto extraído do arquivo HTML ou mensagem de erro.
@@ -76,11 +253,16 @@ class HTMLFileMapper:
             with open(html_file_path, "r", encoding="utf-8") as fp:
                 dados = fp.read()
 
-            output_json = html_to_json.convert(dados)
+            # A célula é lida sem montar a árvore; ela só é montada para a
+            # extração alternativa, que percorre todos os _values
+            if engine == "html_parser":
+                content = find_cell_values(dados, SERIES_CELL_PATHS)
+                if content:
+                    return "\n".join(content)
+
+            output_json = EXTRACTION_ENGINES[engine](dados)
             try:
-                content = output_json["html"][0]["body"][0]["form"][0]["table"][0][
-                    "tbody"
-                ][0]["tr"][0]["td"][1]["_values"]
+                content = _series_cell_values(output_json)
                 extracted_text = "\n".join(content)
                 return extracted_text
             except (KeyError, IndexError):
@@ -111,21 +293,28 @@ class HTMLFileMapper:
             return f"Erro: {e}"
 
     @staticmethod
-    def extract_html_content_pdf_format(html_file_path):
+    def extract_html_content_pdf_format(html_file_path, engine="html_parser"):
         """
-        Extrai o conteúdo de um arquivo HTML das pastas pdf_to_html usando html_to_json.
+        Extrai o conteúdo de um arquivo HTML das pastas pdf_to_html.
+
+        A extração alternativa reaproveita a estrutura já convertida; o arquivo só
+        é lido e convertido de novo se a primeira conversão tiver falhado.
 
         Args:
             html_file_path (Path): Caminho para o arquivo HTML.
+            engine (str): Motor de extração (ver EXTRACTION_ENGINES).
 
         Returns:
             str: Texto extraído do arquivo HTML ou mensagem de erro.
         """
+        convert = EXTRACTION_ENGINES[engine]
+        document = None
         try:
             with open(html_file_path, "r", encoding="utf-8") as fp:
                 dados = fp.read()
 
-            output_json = html_to_json.convert(dados)['html'][0]['body'][0]['html'][0]['body'][0]['div']
+            document = convert(dados)
+            output_json = document['html'][0]['body'][0]['html'][0]['body'][0]['div']
             _context = str()
 
             for i in output_json:
@@ -143,10 +332,11 @@ class HTMLFileMapper:
 
         except Exception as e:
             try:
-                with open(html_file_path, "r", encoding="utf-8") as fp:
-                    dados = fp.read()
+                if document is None:
+                    with open(html_file_path, "r", encoding="utf-8") as fp:
+                        dados = fp.read()
 
-                output_json = html_to_json.convert(dados)
+                    document = convert(dados)
                 all_values = []
 
                 def extract_values(obj):
@@ -160,33 +350,12 @@ class HTMLFileMapper:
                         for item in obj:
                             extract_values(item)
 
-                extract_values(output_json)
+                extract_values(document)
                 return "\n".join(all_values) if all_values else f"Erro na extração: {e}"
 
             except Exception as e2:
                 return f"Erro: {e} | Erro alternativo: {e2}"
 
-    def process_html_file(self, args):
-        """
-        Processa um único arquivo HTML e retorna suas informações.
-
-        Args:
-            args (tuple): Uma tupla contendo (html_file, ipea_dir, extract_content, is_pdf_format)
-
-        Returns:
-            tuple: (html_file, file_info) onde file_info é um dicionário com informações do arquivo
-        """
-        html_file, ipea_dir, extract_content, is_pdf_format = args
-        rel_path = html_file.relative_to(ipea_dir)
-        file_info = {"path": str(rel_path)}
-        if extract_content:
-            if is_pdf_format:
-                file_info["content"] = self.extract_html_content_pdf_format(html_file)
-            else:
-                file_info["content"] = self.extract_html_content_date_format(html_file)
-
-        return html_file, file_info
-
     @staticmethod
     def collect_html_files(ipea_dir):
         """
@@ -199,29 +368,148 @@ class HTMLFileMapper:
             dict: Dicionário organizado com a estrutura de diretórios e arquivos.
         """
         file_structure = {}
-        for date_dir in [d for d in ipea_dir.iterdir() if d.is_dir()]:
+        for date_dir in sorted(d for d in ipea_dir.iterdir() if d.is_dir()):
             if date_dir.name.startswith("date="):
                 date_key = date_dir.name
                 file_structure[date_key] = {}
-                for subdir in [d for d in date_dir.iterdir() if d.is_dir()]:
+                for subdir in sorted(d for d in date_dir.iterdir() if d.is_dir()):
                     file_structure[date_key][subdir.name] = {
-                        'files': list(subdir.glob("**/*.html")),
+                        'files': sorted(subdir.glob("**/*.html")),
                         'is_pdf_format': False
                     }
 
         pdf_to_html_dir = ipea_dir / "pdf_to_html"
         if pdf_to_html_dir.exists() and pdf_to_html_dir.is_dir():
             file_structure["pdf_to_html"] = {}
-            for date_dir in [d for d in pdf_to_html_dir.iterdir() if d.is_dir()]:
+            for date_dir in sorted(d for d in pdf_to_html_dir.iterdir() if d.is_dir()):
                 if date_dir.name.startswith("date="):
                     date_key = date_dir.name
                     file_structure["pdf_to_html"][date_key] = {
-                        'files': list(date_dir.glob("**/*.html")),
+                        'files': sorted(date_dir.glob("**/*.html")),
                         'is_pdf_format': True
                     }
 
         return file_structure
 
+    def load_previous_result(self):
+        """
+        Lê o mapeamento gerado na execução anterior, se existir.
+
+        Em JSON Lines, o conteúdo extraído não é carregado: cada file_info guarda
+        apenas os metadados e a posição (``offset``) do registro no arquivo, e o
+        registro completo é relido ao ser reaproveitado.
+
+        Returns:
+            dict: Caminho relativo do arquivo -> file_info da execução anterior.
+        """
+        if not os.path.exists(self.output_file):
+            return {}
+        try:
+            with open(self.output_file, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Mapeamento anterior ignorado: {e}")
+            return {}
+
+        file_infos = {}
+        for main_content in previous.get("ipea", {}).values():
+            for sub_content in main_content.values():
+                for file_info in sub_content.values():
+                    if isinstance(file_info, dict) and "path" in file_info:
+                        file_infos[file_info["path"]] = file_info
+        return file_infos
+
+    def load_previous_records(self):
+        """
+        Indexa os registros do JSON Lines anterior (``self._previous_stream``, aberto
+        por ``map_html_files``) sem manter o conteúdo extraído.
+        """
+        file_infos = {}
+        try:
+            offset = 0
+            for line in self._previous_stream:
+                if line.strip():
+                    record = json.loads(line)
+                    file_infos[record["path"]] = {
+                        "path": record["path"],
+                        "size": record.get("size"),
+                        "mtime_ns": record.get("mtime_ns"),
+                        "sha256": record.get("sha256"),
+                        "extracted": "content" in record,
+                        "offset": offset,
+                    }
+                offset += len(line)
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Mapeamento anterior ignorado: {e}")
+            return {}
+        return file_infos
+
+    def read_previous_record(self, file_info):
+        """Relê do JSON Lines anterior o registro completo de um arquivo reaproveitado."""
+        self._previous_stream.seek(file_info["offset"])
+        record = json.loads(self._previous_stream.readline())
+        record["mtime_ns"] = file_info["mtime_ns"]
+        record.pop("id", None)
+        return record
+
+    @staticmethod
+    def is_unchanged(html_file, file_info, extract_content):
+        """
+        Verifica se um arquivo não mudou desde a execução anterior.
+
+        Tamanho e mtime iguais bastam; se só o mtime mudou, compara o SHA-256 do
+        conteúdo e, sendo igual, atualiza o mtime registrado.
+
+        Args:
+            html_file (Path): Caminho do arquivo HTML.
+            file_info (dict): Informações do arquivo na execução anterior.
+            extract_content (bool): Se o mapeamento atual extrai o conteúdo.
+
+        Returns:
+            bool: True se as informações anteriores podem ser reaproveitadas.
+        """
+        if file_info.get("extracted", "content" in file_info) != extract_content:
+            return False
+        stat = html_file.stat()
+        if file_info.get("size") != stat.st_size:
+            return False
+        if file_info.get("mtime_ns") == stat.st_mtime_ns:
+            return True
+        if file_info.get("sha256") == file_sha256(html_file):
+            file_info["mtime_ns"] = stat.st_mtime_ns
+            return True
+        return False
+
+    def add_file_info(self, ipea_dir, html_file, file_info):
+        """Insere as informações de um arquivo na estrutura de resultado (ou no JSON Lines)."""
+        parts = html_file.relative_to(ipea_dir).parts
+
+        if self.streaming:
+            if len(parts) >= 2:
+                record = {"id": f"{parts[0]}/{parts[1]}/{html_file.name}", **file_info}
+                line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                self._stream_records.append(
+                    (record["id"], file_info["path"], self._stream.tell(), len(line))
+                )
+                self._stream.write(line)
+            return
+
+        if len(parts) >= 2:
+            if parts[0] == "pdf_to_html" and len(parts) >= 3:
+                main_key = parts[0]
+                date_key = parts[1]
+
+                if (main_key in self.result["ipea"] and
+                        date_key in self.result["ipea"][main_key]):
+                    self.result["ipea"][main_key][date_key][html_file.name] = file_info
+            else:
+                date_key = parts[0]
+                subdir_name = parts[1]
+
+                if (date_key in self.result["ipea"] and
+                        subdir_name in self.result["ipea"][date_key]):
+                    self.result["ipea"][date_key][subdir_name][html_file.name] = file_info
+
     def map_html_files(self, extract_content=True):
         """
         Mapeia todos os arquivos HTML a partir do diretório 'ipea' e cria uma estrutura JSON.
@@ -231,7 +519,8 @@ class HTMLFileMapper:
             extract_content (bool): Se True, extrai o conteúdo de cada arquivo HTML.
 
         Returns:
-            dict: Estrutura de dados contendo o mapeamento dos arquivos HTML.
+            dict: Estrutura de dados contendo o mapeamento dos arquivos HTML. Em
+                JSON Lines, apenas os diretórios; os arquivos ficam no arquivo de saída.
         """
         if not self.root_dir.exists() or not self.root_dir.is_dir():
             self.logger.error(
@@ -251,16 +540,66 @@ class HTMLFileMapper:
                 for subdir_name in subdirs:
                     self.result["ipea"][main_key][subdir_name] = {}
 
-        all_files = []
-        for main_key, subdirs in file_structure.items():
-            if main_key == "pdf_to_html":
-                for date_key, file_info in subdirs.items():
-                    for html_file in file_info['files']:
-                        all_files.append((html_file, ipea_dir, extract_content, file_info['is_pdf_format']))
+        if not self.streaming:
+            previous = self.load_previous_result() if self.incremental else {}
+            self.process_files(ipea_dir, file_structure, extract_content, previous)
+            for main_content in self.result["ipea"].values():
+                for subdir_name, files in main_content.items():
+                    main_content[subdir_name] = dict(sorted(files.items()))
+            return self.result
+
+        os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
+        unsorted_path = f"{self.output_file}.unsorted.tmp"
+        self._stream_records = []
+        with open(unsorted_path, "wb") as self._stream:
+            if self.incremental and os.path.exists(self.output_file):
+                with open(self.output_file, "rb") as self._previous_stream:
+                    previous = self.load_previous_records()
+                    self.process_files(ipea_dir, file_structure, extract_content, previous)
             else:
-                for subdir_name, file_info in subdirs.items():
-                    for html_file in file_info['files']:
-                        all_files.append((html_file, ipea_dir, extract_content, file_info['is_pdf_format']))
+                self.process_files(ipea_dir, file_structure, extract_content, {})
+        self._stream = self._previous_stream = None
+        self.write_sorted_stream(unsorted_path)
+        return self.result
+
+    def process_files(self, ipea_dir, file_structure, extract_content, previous):
+        """
+        Reaproveita os arquivos inalterados e processa os demais em paralelo,
+        inserindo cada um com ``add_file_info``.
+
+        Args:
+            ipea_dir (Path): Diretório base 'ipea'.
+            file_structure (dict): Estrutura de ``collect_html_files``.
+            extract_content (bool): Se True, extrai o conteúdo de cada arquivo HTML.
+            previous (dict): Caminho relativo -> file_info da execução anterior.
+        """
+        reused_files = 0
+        all_files = []
+        sizes = []
+        for subdirs in file_structure.values():
+            for file_info in subdirs.values():
+                for html_file in file_info['files']:
+                    previous_info = previous.get(str(html_file.relative_to(ipea_dir)))
+                    if previous_info and self.is_unchanged(
+                            html_file, previous_info, extract_content):
+                        if self.streaming:
+                            previous_info = self.read_previous_record(previous_info)
+                        self.add_file_info(ipea_dir, html_file, previous_info)
+                        reused_files += 1
+                    else:
+                        all_files.append((
+                            str(html_file),
+                            str(html_file.relative_to(ipea_dir)),
+                            extract_content,
+                            file_info['is_pdf_format'],
+                            self.engine,
+                        ))
+                        sizes.append(html_file.stat().st_size)
+
+        if self.incremental:
+            self.logger.info(
+                f"Modo incremental: {reused_files} arquivos reaproveitados do mapeamento anterior"
+            )
 
         total_files = len(all_files)
         self.logger.info(f"Encontrados {total_files} arquivos HTML para processamento")
@@ -270,56 +609,42 @@ class HTMLFileMapper:
                 f"Iniciando processamento paralelo com {self.num_workers} workers"
             )
 
+            chunks = plan_chunks(all_files, sizes, self.num_workers)
+            self.logger.info(
+                f"{len(chunks)} lotes, maiores primeiro, para {total_files} arquivos"
+            )
+
             processed_files = 0
+            next_report = 0
             with concurrent.futures.ProcessPoolExecutor(
                     max_workers=self.num_workers
-            ) as executor:
-                batch_size = max(1, min(1000, total_files // 10))
-
-                for i in range(0, total_files, batch_size):
-                    batch = all_files[i : i + batch_size]
-                    self.logger.info(
-                        f"Processando lote {i//batch_size + 1}/{(total_files-1)//batch_size + 1}"
+            ) as executor, tqdm(total=total_files, desc="Processando arquivos HTML") as progress:
+                # Todos os lotes são enviados de uma vez; os resultados são gravados assim
+                # que cada lote termina e descartados em seguida
+                pending = {executor.submit(process_html_chunk, chunk) for chunk in chunks}
+                del chunks
+
+                while pending:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
                     )
-                    results = list(
-                        tqdm(
-                            executor.map(self.process_html_file, batch),
-                            total=len(batch),
-                            desc="Processando arquivos HTML",
+                    for future in done:
+                        results = future.result()
+                        for html_file, file_info in results:
+                            self.add_file_info(ipea_dir, Path(html_file), file_info)
+                        processed_files += len(results)
+                        progress.update(len(results))
+
+                    if processed_files >= next_report:
+                        self.logger.info(
+                            f"Progresso: {processed_files}/{total_files} arquivos processados"
                         )
-                    )
-
-                    for html_file, file_info in results:
-                        processed_files += 1
-                        rel_path = html_file.relative_to(ipea_dir)
-                        parts = rel_path.parts
-
-                        if len(parts) >= 2:
-                            if parts[0] == "pdf_to_html" and len(parts) >= 3:
-                                main_key = parts[0]
-                                date_key = parts[1]
-
-                                if (main_key in self.result["ipea"] and
-                                        date_key in self.result["ipea"][main_key]):
-                                    self.result["ipea"][main_key][date_key][html_file.name] = file_info
-                            else:
-                                date_key = parts[0]
-                                subdir_name = parts[1]
-
-                                if (date_key in self.result["ipea"] and
-                                        subdir_name in self.result["ipea"][date_key]):
-                                    self.result["ipea"][date_key][subdir_name][html_file.name] = file_info
-
-                    self.logger.info(
-                        f"Progresso: {processed_files}/{total_files} arquivos processados"
-                    )
+                        next_report += max(1, total_files // 10)
 
             self.logger.info(
                 f"Processamento paralelo concluído. Total de {processed_files} arquivos processados."
             )
 
-        return self.result
-
     def run(self, extract_content=True):
         """
         Executa o processo completo de mapeamento e salvamento.
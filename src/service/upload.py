@@ -0,0 +1,171 @@
+import io
+import os
+import queue
+import random
+import threading
+import time
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+# Conteúdos a partir deste tamanho são enviados em partes (multipart upload)
+MULTIPART_THRESHOLD = 8 * 1024 * 1024
+
+_STOP = object()
+
+
+class S3Uploader:
+    """
+    Envio de arquivos para o S3 em segundo plano.
+
+    ``submit`` apenas enfileira o conteúdo; threads de envio consomem a fila e
+    fazem o upload com um único cliente boto3, com novas tentativas e espera
+    exponencial em caso de erro. A fila é limitada, então quem produz mais rápido
+    do que a rede consegue enviar fica bloqueado em vez de acumular memória.
+
+    Sem ``bucket_name`` os arquivos são gravados no disco local, usando a chave
+    como caminho.
+    """
+
+    def __init__(
+        self,
+        bucket_name=None,
+        num_workers=8,
+        queue_size=64,
+        max_attempts=4,
+        backoff=0.5,
+        multipart_threshold=MULTIPART_THRESHOLD,
+        client=None,
+    ):
+        """
+        Args:
+            bucket_name (str, opcional): Bucket de destino; None grava em disco.
+            num_workers (int): Threads de envio.
+            queue_size (int): Máximo de arquivos aguardando envio.
+            max_attempts (int): Tentativas por arquivo antes de registrar a falha.
+            backoff (float): Espera base, em segundos, entre tentativas.
+            multipart_threshold (int): Tamanho a partir do qual o envio é em partes.
+            client (opcional): Cliente S3 já criado, compartilhado com o chamador.
+        """
+        self.bucket_name = bucket_name
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.multipart_threshold = multipart_threshold
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold, max_concurrency=4
+        )
+        if bucket_name and client is None:
+            # Cliente próprio, com conexões suficientes para todas as threads
+            # (inclusive as partes dos envios multipart)
+            client = boto3.session.Session().client(
+                "s3",
+                config=Config(
+                    max_pool_connections=max(10, num_workers * 4),
+                    retries={"max_attempts": 0},
+                ),
+            )
+        self.s3 = client
+        self.failures = {}
+        self.uploaded = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"s3-upload-{i}", daemon=True)
+            for i in range(max(1, num_workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key, content, content_type="text/html"):
+        """
+        Enfileira um arquivo para envio; bloqueia enquanto a fila estiver cheia.
+
+        Args:
+            key (str): Chave do objeto (ou caminho local, sem bucket).
+            content (bytes ou str): Conteúdo do arquivo.
+            content_type (str): Content-Type gravado no S3.
+        """
+        if self._closed:
+            raise RuntimeError("S3Uploader já foi encerrado")
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        self._queue.put((key, content, content_type))
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._upload_with_retries(*item)
+            finally:
+                self._queue.task_done()
+
+    def _upload_with_retries(self, key, content, content_type):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self._upload(key, content, content_type)
+                with self._lock:
+                    self.uploaded += 1
+                return
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    with self._lock:
+                        self.failures[key] = f"{type(e).__name__}: {e}"
+                    print(f"Falha ao enviar {key} após {attempt} tentativas: {e}")
+                    return
+                delay = self.backoff * 2 ** (attempt - 1)
+                time.sleep(delay + random.uniform(0, delay))
+
+    def _upload(self, key, content, content_type):
+        if not self.bucket_name:
+            folder = os.path.dirname(key)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(key, "wb") as f:
+                f.write(content)
+            return
+
+        if len(content) >= self.multipart_threshold:
+            self.s3.upload_fileobj(
+                io.BytesIO(content),
+                self.bucket_name,
+                key,
+                ExtraArgs={"ContentType": content_type},
+                Config=self.transfer_config,
+            )
+        else:
+            self.s3.put_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                Body=content,
+                ContentType=content_type,
+            )
+        print(f"Arquivo salvo no S3 em: s3://{self.bucket_name}/{key}")
+
+    def join(self):
+        """Aguarda o envio de tudo o que já foi enfileirado."""
+        self._queue.join()
+
+    def close(self):
+        """
+        Envia o que restar na fila e encerra as threads.
+
+        Returns:
+            dict: Chave -> erro dos arquivos que não puderam ser enviados.
+        """
+        if not self._closed:
+            self._closed = True
+            for _ in self._threads:
+                self._queue.put(_STOP)
+            for thread in self._threads:
+                thread.join()
+        return dict(self.failures)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
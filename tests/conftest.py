@@ -0,0 +1,86 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Os módulos da aplicação são importados como em src/ (from service.x import ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+
+class _PrefixStemmer:
+    def stem(self, token):
+        return token[:5]
+
+
+@pytest.fixture
+def offline_processor(monkeypatch):
+    """
+    TextProcessor sem os corpora do NLTK (stopwords e RSLP), para testar a
+    indexação sem acesso à rede.
+    """
+    from service import index
+
+    class OfflineTextProcessor(index.TextProcessor):
+        def __init__(self, language="portuguese", cache_size=1000, tokenizer="fast"):
+            self.language = language
+            self.tokenizer = tokenizer
+            self.stopwords = {"a", "de", "do", "da", "e", "o"}
+            self.stemmer = _PrefixStemmer()
+            self.cache_size = cache_size
+            self._build_caches()
+
+    monkeypatch.setattr(index, "TextProcessor", OfflineTextProcessor)
+    return OfflineTextProcessor
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        self.server.connections.add(self.client_address)
+        status, headers, body = self.server.routes[self.path](self)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if isinstance(body, bytes):
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        # Corpo enviado aos poucos: a rota informa o Content-Length
+        self.end_headers()
+        try:
+            for chunk in body:
+                self.wfile.write(chunk)
+                self.wfile.flush()
+        except ConnectionError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    """
+    Servidor HTTP local. ``routes`` mapeia o caminho para uma função que recebe o
+    handler e retorna (status, cabeçalhos, corpo), onde o corpo pode ser um
+    iterável de partes enviadas aos poucos; ``requests`` registra o
+    caminho e os cabeçalhos de cada requisição e ``connections``, o endereço de
+    cada conexão aberta pelo cliente.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.routes = {}
+    server.requests = []
+    server.connections = set()
+    server.url = lambda path: f"http://127.0.0.1:{server.server_port}{path}"
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,69 @@
+import pytest
+
+from service.index import INDEX_VARIANTS, IndexAnalyzer
+
+DOCUMENTS = {
+    "pib.html": "Produto interno bruto a preços de mercado, taxa de variação anual",
+    "ipca.html": "Índice de preços ao consumidor amplo, taxa de variação mensal",
+    "selic.html": "Taxa de juros Selic fixada pelo Copom, taxa média diária",
+    "cambio.html": "Taxa de câmbio comercial, compra, média mensal do dólar",
+    "desemprego.html": "Taxa de desocupação da PNAD contínua, trimestre móvel",
+    "vazio.html": "",
+    "juros.html": "Juros reais, juros nominais e taxa de juros de longo prazo",
+}
+
+QUERIES = [
+    "taxa de juros",
+    "preços mensal",
+    "taxa taxa câmbio",
+    "inexistente",
+    "média mensal do dólar",
+]
+
+
+def analyzer(processor, backend, **kwargs):
+    analyzer = IndexAnalyzer(processor(), dict(DOCUMENTS), backend=backend)
+    analyzer.create_indices(INDEX_VARIANTS, **kwargs)
+    return analyzer
+
+
+def structure(analyzer):
+    """Documentos e postings de cada índice"""
+    return {
+        name: (
+            dict(index.documents),
+            {term: sorted(index.get_postings(term)) for term in sorted(index.vocabulary)},
+        )
+        for name, index in analyzer.indices.items()
+    }
+
+
+def rankings(analyzer, top_k=None):
+    """Ranking de cada consulta em cada índice, com scores arredondados"""
+    result = {}
+    for name, index in analyzer.indices.items():
+        for query in QUERIES:
+            terms = analyzer.processor.process_variants(query, {name: analyzer.params[name]})
+            ranked = index.rank_search(terms[name], top_k=top_k)
+            result[name, query] = [(doc_id, round(score, 9)) for doc_id, score in ranked]
+    return result
+
+
+@pytest.mark.parametrize("top_k", [None, 1, 3])
+def test_compact_ranks_like_dict(offline_processor, top_k):
+    expected = rankings(analyzer(offline_processor, "dict"), top_k)
+    assert any(expected.values())
+    assert rankings(analyzer(offline_processor, "compact"), top_k) == expected
+
+
+@pytest.mark.parametrize("backend", ["dict", "compact"])
+@pytest.mark.parametrize("streamed", [False, True])
+def test_parallel_build_matches_sequential(offline_processor, backend, streamed):
+    sequential = analyzer(offline_processor, backend)
+    kwargs = {"documents": iter(DOCUMENTS.items())} if streamed else {}
+    parallel = analyzer(offline_processor, backend, num_workers=2, **kwargs)
+
+    assert structure(parallel) == structure(sequential)
+    assert rankings(parallel) == rankings(sequential)
+    for index in parallel.indices.values():
+        assert list(index.documents) == list(DOCUMENTS)
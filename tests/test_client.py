@@ -0,0 +1,90 @@
+import pytest
+
+from service.client import HTTPClient, read_content
+
+LAST_MODIFIED = "Mon, 01 Jul 2024 12:00:00 GMT"
+
+
+@pytest.fixture
+def client():
+    client = HTTPClient(pool_size=4, max_retries=3, backoff=0)
+    yield client
+    client.close()
+
+
+def flaky(failures):
+    """Responde 503 às ``failures`` primeiras requisições e 200 às demais"""
+    calls = []
+
+    def route(handler):
+        calls.append(handler.path)
+        if len(calls) <= failures:
+            return 503, {}, b"indisponivel"
+        return 200, {}, b"ok"
+
+    return route
+
+
+def test_retries_server_errors(client, http_server):
+    http_server.routes["/serie"] = flaky(2)
+    response = client.get(http_server.url("/serie"))
+    assert response.status_code == 200
+    assert response.content == b"ok"
+    assert len(http_server.requests) == 3
+
+
+def test_gives_up_after_max_retries(client, http_server):
+    http_server.routes["/serie"] = flaky(10)
+    response = client.get(http_server.url("/serie"))
+    assert response.status_code == 503
+    assert len(http_server.requests) == 4
+
+
+def test_conditional_get_sends_recorded_validators(client, http_server):
+    def pdf(handler):
+        headers = {"ETag": '"abc"', "Last-Modified": LAST_MODIFIED}
+        if handler.headers.get("If-None-Match") == '"abc"':
+            return 304, headers, b""
+        return 200, headers, b"%PDF"
+
+    http_server.routes["/serie.pdf"] = pdf
+    url = http_server.url("/serie.pdf")
+
+    assert client.conditional_get(url).status_code == 200
+    assert client.validators[url] == {"etag": '"abc"', "last_modified": LAST_MODIFIED}
+
+    response = client.conditional_get(url)
+    assert response.status_code == 304
+    headers = http_server.requests[-1][1]
+    assert headers["If-None-Match"] == '"abc"'
+    assert headers["If-Modified-Since"] == LAST_MODIFIED
+
+    # Validadores explícitos (do cache de PDFs) têm precedência
+    assert client.conditional_get(url, {"etag": '"antigo"'}).status_code == 200
+    assert http_server.requests[-1][1]["If-None-Match"] == '"antigo"'
+    assert "If-Modified-Since" not in http_server.requests[-1][1]
+
+
+def test_sessions_share_the_connection_pool(client, http_server):
+    http_server.routes["/serie"] = lambda handler: (200, {}, b"ok")
+    url = http_server.url("/serie")
+    session = client.new_session()
+    assert session.get_adapter(url) is client.adapter
+    assert client.adapter.poolmanager.connection_pool_kw["maxsize"] == 4
+
+    for _ in range(3):
+        client.get(url)
+        session.get(url, timeout=5)
+    # Keep-alive: todas as requisições na mesma conexão
+    assert len(http_server.requests) == 6
+    assert len(http_server.connections) == 1
+
+
+def test_read_content_within_timeout(client, http_server):
+    body = b"%PDF" * 50000
+    http_server.routes["/serie.pdf"] = lambda handler: (200, {}, body)
+    url = http_server.url("/serie.pdf")
+
+    response = client.get(url, stream=True, timeout=5)
+    assert read_content(response, timeout=5) == body
+    assert read_content(client.get(url)) == body
@@ -0,0 +1,102 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from service import convert
+from service.convert import pdf_to_html_string
+from service.transform import HTMLFileMapper
+
+TEXT = "Taxa de juros Selic 2024"
+STDOUT_FIXTURE = Path(__file__).parent / "fixtures/pdftohtml_stdout/metodologia.html"
+
+requires_pdftohtml = pytest.mark.skipif(
+    shutil.which("pdftohtml") is None, reason="pdftohtml (poppler) não instalado"
+)
+
+
+def make_pdf(text):
+    """PDF de uma página com o texto em Helvetica"""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>"
+        ),
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return pdf
+
+
+def test_memory_mode_does_not_use_complex_output(monkeypatch):
+    # O modo complexo (-c) do pdftohtml ignora -stdout
+    calls = []
+
+    def fake_run(args, **kwargs):
+        calls.append(args)
+        return convert.subprocess.CompletedProcess(args, 0, stdout=b"<p>ok</p>")
+
+    monkeypatch.setattr(convert.subprocess, "run", fake_run)
+    html = pdf_to_html_string(make_pdf(TEXT), mode="memory")
+    assert "<p>ok</p>" in html
+    assert "-stdout" in calls[0]
+    assert "-c" not in calls[0]
+
+
+def extract_pdf_text(html, tmp_path, engine="html_parser"):
+    html_file = tmp_path / "pdf.html"
+    html_file.write_text(html, encoding="utf-8")
+    return HTMLFileMapper.extract_html_content_pdf_format(html_file, engine)
+
+
+def test_memory_mode_layout_is_read_by_extractor(monkeypatch, tmp_path):
+    # Saída do pdftohtml sem -c: linhas terminadas por <br/>, páginas por <hr/>
+    stdout = STDOUT_FIXTURE.read_bytes()
+    monkeypatch.setattr(
+        convert.subprocess,
+        "run",
+        lambda args, **kwargs: convert.subprocess.CompletedProcess(args, 0, stdout),
+    )
+    html = pdf_to_html_string(make_pdf(TEXT), mode="memory")
+
+    text = extract_pdf_text(html, tmp_path)
+    assert text.split("\n") == [
+        "Metodologia\xa0da\xa0série",
+        "Taxa\xa0média\xa0de\xa01.234,56\xa0pontos\xa0(+2,3%)",
+        "Disponível\xa0em\xa0https://www.ipea.gov.br/“dados”",
+        "Nota",
+        "nº\xa012",
+        "Período\xa0&\xa0cobertura",
+        "ajuste\xa0sazonal",
+        "X-13",
+        "",
+    ]
+    assert text == extract_pdf_text(html, tmp_path, "html_to_json")
+
+
+@requires_pdftohtml
+@pytest.mark.parametrize("mode", ["memory", "file"])
+def test_pdftohtml_output_is_read_by_extractor(mode, tmp_path):
+    html = pdf_to_html_string(make_pdf(TEXT), mode=mode, timeout=30)
+    assert TEXT in extract_pdf_text(html, tmp_path).replace("\xa0", " ")
+
+
+def test_pdfminer_mode():
+    pytest.importorskip("pdfminer3")
+    html = pdf_to_html_string(make_pdf(TEXT), mode="pdfminer")
+    assert TEXT in html
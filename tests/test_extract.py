@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+for module in ("selenium", "webdriver_manager", "boto3", "chardet"):
+    pytest.importorskip(module)
+
+from service import extract
+
+ROWS = [
+    ["javascript:show(1)", "Série 1", "R$", "Mensal", "jan 2000 - 2024.01"],
+    ["javascript:show(2)", "Série 2", "%", "Anual", "2000 - 2023"],
+    ["javascript:show(3)", "Série 3", "%", "Anual", "2000 - 2023"],
+]
+
+
+class FakeDriver:
+    """Navegador com a grade de ROWS; a página de cada série traz uma tabela"""
+
+    def __init__(self):
+        self.shown = []
+        self.page_source = ""
+        self.switch_to = self
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script):
+        if script == extract.GRID_ROWS_SCRIPT:
+            return json.dumps(ROWS)
+        if script.startswith("javascript:show("):
+            serid = script[len("javascript:show(") : -1]
+            self.shown.append(serid)
+            self.page_source = f"<html><table><tr><td>{serid}</td></tr></table></html>"
+        if script == "return navigator.userAgent":
+            return "FakeDriver"
+        return None
+
+    def find_element(self, by, value):
+        return object()
+
+    def frame(self, element):
+        pass
+
+    def get_cookies(self):
+        return []
+
+    def back(self):
+        pass
+
+
+class FakeUploader:
+    def __init__(self):
+        self.keys = []
+
+    def submit(self, key, content):
+        self.keys.append(key)
+
+    def close(self):
+        return {}
+
+
+def test_http_failures_fall_back_to_browser(http_server, monkeypatch):
+    def series(handler):
+        return 200, {}, b"<html><table><tr><td>http</td></tr></table></html>"
+
+    # Só a série 2 existe no endereço do modo "http"
+    http_server.routes["/ExibeSerie.aspx?serid=2&module=M"] = series
+    http_server.routes["/ExibeSerie.aspx?serid=3&module=M"] = lambda h: (200, {}, b"erro")
+    monkeypatch.setattr(
+        extract, "SERIES_URL_TEMPLATE", http_server.url("/ExibeSerie.aspx?serid={}&module=M")
+    )
+    monkeypatch.setattr(extract.time, "sleep", lambda seconds: None)
+    driver = FakeDriver()
+    uploader = FakeUploader()
+
+    extractor = extract.IPEAExtractor(
+        "js", driver=driver, fetch_mode="http", uploader=uploader
+    )
+    dados = extractor.run_extraction()
+
+    assert sorted(data[0] for data in dados) == ["1", "2", "3"]
+    assert sorted(driver.shown) == ["1", "3"]
+    assert extractor.http_fallbacks == 2
+    assert len(uploader.keys) == 3
+
+
+@pytest.mark.parametrize("headless", [True, False])
+def test_own_driver_uses_headless_flag(monkeypatch, headless):
+    started = []
+
+    class FakeManager:
+        def start_driver(self, headless=False):
+            started.append(headless)
+            return FakeDriver()
+
+    monkeypatch.setattr(extract.drive, "DriverManager", FakeManager)
+    extract.IPEAExtractor("js", headless=headless, uploader=FakeUploader())
+
+    assert started == [headless]
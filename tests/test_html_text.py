@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import html_to_json
+import pytest
+
+from service.convert import _wrap_html
+from service.html_text import find_cell_values, html_to_dict
+from service.transform import SERIES_CELL_PATHS, HTMLFileMapper, _series_cell_values
+
+FIXTURES = Path(__file__).parent / "fixtures"
+DATE_PAGES = sorted((FIXTURES / "date").glob("*.html"))
+PDF_PAGES = sorted((FIXTURES / "pdf_to_html").glob("*.html"))
+
+
+def without_attributes(obj):
+    if isinstance(obj, dict):
+        return {
+            k: without_attributes(v) for k, v in obj.items() if k != "_attributes"
+        }
+    if isinstance(obj, list):
+        return [without_attributes(item) for item in obj]
+    return obj
+
+
+def read_page(path):
+    content = path.read_text(encoding="utf-8")
+    # As páginas das pastas pdf_to_html passam pelo mesmo invólucro da conversão
+    return _wrap_html(content) if path.parent.name == "pdf_to_html" else content
+
+
+@pytest.mark.parametrize("path", DATE_PAGES + PDF_PAGES, ids=lambda p: p.name)
+def test_html_to_dict_matches_html_to_json(path):
+    content = read_page(path)
+    assert html_to_dict(content) == without_attributes(html_to_json.convert(content))
+
+
+@pytest.mark.parametrize("path", DATE_PAGES, ids=lambda p: p.name)
+def test_find_cell_values_matches_tree(path):
+    content = read_page(path)
+    try:
+        expected = _series_cell_values(html_to_json.convert(content))
+    except (KeyError, IndexError):
+        expected = None
+    assert find_cell_values(content, SERIES_CELL_PATHS) == expected
+
+
+def test_find_cell_values_finds_series_cell():
+    content = read_page(FIXTURES / "date" / "serie.html")
+    values = find_cell_values(content, SERIES_CELL_PATHS)
+    assert values[0].startswith("Taxa de câmbio")
+    # Como no BeautifulSoup, o <br/> após um <br> fica aberto e recebe o resto
+    assert values[1] == "Frequência: Mensal de 1953.01 até 2024.06"
+
+
+def test_find_cell_values_missing_cell():
+    content = read_page(FIXTURES / "date" / "serie_sem_celula.html")
+    assert find_cell_values(content, SERIES_CELL_PATHS) is None
+
+
+@pytest.mark.parametrize("path", DATE_PAGES, ids=lambda p: p.name)
+def test_date_format_engines_agree(path):
+    text = HTMLFileMapper.extract_html_content_date_format(path, "html_parser")
+    assert not text.startswith("Erro")
+    assert text == HTMLFileMapper.extract_html_content_date_format(
+        path, "html_to_json"
+    )
+
+
+@pytest.mark.parametrize("path", PDF_PAGES, ids=lambda p: p.name)
+def test_pdf_format_engines_agree(path, tmp_path):
+    html_file = tmp_path / path.name
+    html_file.write_text(read_page(path), encoding="utf-8")
+    text = HTMLFileMapper.extract_html_content_pdf_format(html_file, "html_parser")
+    assert text.startswith("Metodologia\xa0da\xa0série\n")
+    assert text == HTMLFileMapper.extract_html_content_pdf_format(
+        html_file, "html_to_json"
+    )
+
+
+def test_series_cell_without_tbody():
+    # HTML baixado por HTTP: a tabela não tem tbody
+    browser = HTMLFileMapper.extract_html_content_date_format(
+        FIXTURES / "date" / "serie.html"
+    )
+    http = HTMLFileMapper.extract_html_content_date_format(
+        FIXTURES / "date" / "serie_http.html"
+    )
+    assert http == browser
+    assert http.startswith("Taxa de câmbio")
@@ -0,0 +1,156 @@
+import random
+
+import pytest
+
+from service.index import CompactInvertedIndex, InvertedIndex
+
+BACKENDS = [InvertedIndex, CompactInvertedIndex]
+
+
+def snapshot(index):
+    """Estado observável do índice: documentos, df e postings de cada termo"""
+    terms = sorted(index.vocabulary)
+    return (
+        dict(index.documents),
+        index.total_docs,
+        {term: index.get_document_frequency(term) for term in terms},
+        {term: sorted(index.get_postings(term)) for term in terms},
+    )
+
+
+def build(cls, documents):
+    index = cls()
+    for doc_id, tokens in documents.items():
+        index.add_document(doc_id, tokens)
+    return index
+
+
+@pytest.mark.parametrize("cls", BACKENDS)
+def test_remove_document_without_tokens(cls):
+    index = build(cls, {"a": ["taxa", "juros"], "vazio": []})
+
+    assert index.remove_document("vazio") is True
+    assert index.remove_document("vazio") is False
+    assert snapshot(index) == snapshot(build(cls, {"a": ["taxa", "juros"]}))
+
+
+@pytest.mark.parametrize("cls", BACKENDS)
+def test_update_document_from_and_to_no_tokens(cls):
+    index = build(cls, {"a": ["taxa", "juros"], "b": []})
+
+    index.update_document("b", ["taxa", "selic"])
+    assert snapshot(index) == snapshot(
+        build(cls, {"a": ["taxa", "juros"], "b": ["taxa", "selic"]})
+    )
+
+    index.update_document("a", [])
+    index.remove_document("a")
+    index.compact()
+    assert snapshot(index) == snapshot(build(cls, {"b": ["taxa", "selic"]}))
+
+
+@pytest.mark.parametrize("cls", BACKENDS)
+@pytest.mark.parametrize("top_k", [None, 3])
+def test_rank_search_without_documents(cls, top_k):
+    assert cls().rank_search(["taxa"], top_k=top_k) == []
+
+    index = build(cls, {"a": ["taxa", "juros"], "b": ["selic"]})
+    index.remove_document("a")
+    index.remove_document("b")
+    assert index.rank_search(["taxa", "selic"], top_k=top_k) == []
+
+
+@pytest.mark.parametrize("cls", BACKENDS)
+def test_rank_search_skips_terms_without_postings(cls):
+    index = build(cls, {"a": ["taxa", "juros"], "b": ["selic"], "c": ["ipca"]})
+    index.remove_document("b")
+
+    ranked = index.rank_search(["taxa", "selic", "inexistente"])
+    assert [doc_id for doc_id, _ in ranked] == ["a"]
+
+
+def observed(index):
+    """snapshot mais as estatísticas usadas no ranking"""
+    terms = sorted(index.vocabulary)
+    return (
+        snapshot(index),
+        {term: index.get_max_term_frequency(term) for term in terms},
+        {term: round(index.get_idf(term), 9) for term in terms},
+        {
+            (term, doc_id): index.get_term_frequency(term, doc_id)
+            for term in terms
+            for doc_id, _ in index.get_postings(term)
+        },
+    )
+
+
+def test_compact_backend_matches_dict(tmp_path):
+    documents = {
+        "a": ["taxa", "juros", "taxa", "selic"],
+        "b": ["ipca", "taxa"],
+        "c": ["câmbio", "dólar", "dólar", "dólar"],
+        "d": ["juros", "juros", "longo", "prazo"],
+    }
+    shard = {"e": ["taxa", "câmbio"], "f": ["selic", "selic", "copom"]}
+    steps = [
+        lambda index: None,
+        lambda index: index.update_document("a", ["taxa", "copom"]),
+        lambda index: index.remove_document("c"),
+        lambda index: index.add_document("g", ["dólar", "ipca", "ipca"]),
+        lambda index: index.merge(build(type(index), shard)),
+        lambda index: index.compact(),
+    ]
+
+    indices = [build(cls, documents) for cls in BACKENDS]
+    for step in steps:
+        for index in indices:
+            step(index)
+        expected = observed(indices[0])
+        assert observed(indices[1]) == expected
+
+    for index in indices:
+        filepath = str(tmp_path / f"{type(index).__name__}.pkl")
+        index.save_index(filepath)
+        loaded = type(index)()
+        loaded.load_index(filepath)
+        assert observed(loaded) == expected
+
+
+@pytest.mark.parametrize("cls", BACKENDS)
+def test_max_score_top_k_matches_exhaustive_ranking(cls, monkeypatch):
+    rng = random.Random(7)
+    # Vocabulário com frequências bem diferentes, para que a poda ocorra
+    vocabulary = [f"t{i}" for i in range(40)]
+    weights = [1 / (i + 1) for i in range(len(vocabulary))]
+    documents = {
+        f"doc{i:03d}": rng.choices(vocabulary, weights, k=rng.randint(1, 30))
+        for i in range(300)
+    }
+    index = build(cls, documents)
+    for doc_id in ("doc010", "doc020", "doc030"):
+        index.remove_document(doc_id)
+
+    # Consultas respondidas pelo MaxScore (e não pela busca exaustiva)
+    answered = []
+
+    def max_score_search(terms, top_k):
+        ranked = cls._max_score_search(index, terms, top_k)
+        answered.append(ranked is not None)
+        return ranked
+
+    monkeypatch.setattr(index, "_max_score_search", max_score_search)
+
+    queries = [rng.sample(vocabulary, rng.randint(1, 6)) for _ in range(60)]
+    queries += [["t0", "t0", "t39"], ["t1", "inexistente"]]
+    for query in queries:
+        exhaustive = dict(index.rank_search(query))
+        expected = sorted(exhaustive.values(), reverse=True)
+        for top_k in (1, 3, 10, len(documents) + 5):
+            ranked = index.rank_search(query, top_k=top_k)
+            scores = [score for _, score in ranked]
+            # Com empates, qualquer documento com o mesmo score é válido
+            assert scores == pytest.approx(expected[:top_k])
+            for doc_id, score in ranked:
+                assert exhaustive[doc_id] == pytest.approx(score)
+
+    assert answered == [True] * (len(queries) * 4)
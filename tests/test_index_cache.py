@@ -0,0 +1,84 @@
+import json
+import os
+
+from service.index import Index
+
+DOCUMENTS = {
+    "date=2024-12-31/PIB==R$==Anual/pib.html": "Produto interno bruto a preços de mercado",
+    "date=2024-11-30/IPCA==%==Mensal/ipca.html": "Índice de preços ao consumidor amplo",
+    "date=2024-10-31/Selic==%==Diária/selic.html": "Taxa de juros Selic fixada pelo Copom",
+}
+
+
+def write_map(path, documents):
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(
+            json.dumps({"id": doc_id, "content": content}) + "\n"
+            for doc_id, content in documents.items()
+        )
+
+
+def write_nested_map(path, documents):
+    data = {"ipea": {}}
+    for doc_id, content in documents.items():
+        date_key, subdir, file_name = doc_id.split("/")
+        data["ipea"].setdefault(date_key, {}).setdefault(subdir, {})[file_name] = {
+            "content": content
+        }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def test_cache_hit_does_not_read_map(offline_processor, tmp_path, monkeypatch):
+    map_file = str(tmp_path / "html_files_map.json")
+    cache_dir = str(tmp_path / "cache")
+    write_nested_map(map_file, DOCUMENTS)
+    first = Index(map_file).start(cache_dir=cache_dir, keep_documents=False)
+
+    def fail(self):
+        raise AssertionError("o mapeamento não deveria ser lido num acerto de cache")
+
+    monkeypatch.setattr(Index, "iter_documents", fail)
+    second = Index(map_file).start(cache_dir=cache_dir, keep_documents=False)
+
+    assert second.stats.keys() == first.stats.keys()
+    for name, index in first.indices.items():
+        assert second.indices[name].search(["preco"]) == index.search(["preco"])
+
+
+def test_cache_hit_keeps_documents_when_requested(offline_processor, tmp_path):
+    map_file = str(tmp_path / "html_files_map.jsonl")
+    cache_dir = str(tmp_path / "cache")
+    write_map(map_file, DOCUMENTS)
+    Index(map_file).start(cache_dir=cache_dir)
+
+    index_system = Index(map_file)
+    index_system.start(cache_dir=cache_dir)
+    assert index_system.documents == DOCUMENTS
+
+
+def test_cache_prune_keeps_in_progress_and_newer_entries(offline_processor, tmp_path):
+    map_file = str(tmp_path / "html_files_map.jsonl")
+    cache_dir = tmp_path / "cache"
+    write_map(map_file, DOCUMENTS)
+
+    old = cache_dir / "old"
+    in_progress = cache_dir / "other.tmp"
+    for path in (old, in_progress):
+        path.mkdir(parents=True)
+        (path / "manifest.json").write_text("{}")
+    os.utime(old, (0, 0))
+
+    Index(map_file).start(cache_dir=str(cache_dir))
+
+    newer = cache_dir / "newer"
+    newer.mkdir()
+    (newer / "manifest.json").write_text("{}")
+    os.utime(newer, (4_000_000_000, 4_000_000_000))
+    write_map(map_file, {**DOCUMENTS, "date=2024-09-30/novo.html": "Nova série"})
+    Index(map_file).start(cache_dir=str(cache_dir))
+
+    entries = set(os.listdir(cache_dir))
+    assert "old" not in entries
+    assert {"other.tmp", "newer"} <= entries
+    assert len(entries - {"other.tmp", "newer"}) == 1
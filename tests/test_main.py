@@ -0,0 +1,139 @@
+import collections
+import importlib
+import threading
+import time
+from urllib.parse import quote, unquote
+
+import pytest
+
+for module in ("selenium", "boto3", "pandas", "chardet"):
+    pytest.importorskip(module)
+
+import main
+from service import client, convert, state
+
+FAILING_JS = "IrParaModuloPagina('M', 'Ser_Temas(7)')"
+
+
+class FakePool:
+    def __init__(self, size=1, headless=False):
+        self.size = size
+        self.headless = headless
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def driver(self):
+        return self
+
+
+@pytest.fixture
+def ipea(http_server, tmp_path, monkeypatch):
+    """
+    lambda_handler com o site do IPEA trocado pelo servidor local: cada comando
+    baixa a página do seu tema e a salva em disco, como uma série.
+    """
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def page(handler):
+        js = unquote(handler.path[1:])
+        if js == FAILING_JS:
+            return 404, {}, b"erro"
+        return 200, {}, f"<html><body>{js}</body></html>".encode()
+
+    http_server.routes = collections.defaultdict(lambda: page)
+
+    class FakeExtractor:
+        def __init__(self, js, bucket_name, prefix, uploader=None, **kwargs):
+            self.js = js
+            self.prefix = prefix
+            self.uploader = uploader
+
+        def run_extraction(self):
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            try:
+                time.sleep(0.02)
+                url = http_server.url("/" + quote(self.js))
+                response = client.get_client().get(url)
+                response.raise_for_status()
+                key = f"{self.prefix}{abs(hash(self.js))}.html"
+                self.uploader.submit(key, response.content)
+                return [{"js": self.js, "key": key}]
+            finally:
+                with lock:
+                    active["now"] -= 1
+
+        @staticmethod
+        def series_record(data):
+            return data
+
+    catalogs = []
+    previous_client = client.get_client()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "BUCKET", None)
+    monkeypatch.setattr(main, "DriverPool", FakePool)
+    monkeypatch.setattr(main, "IPEAExtractor", FakeExtractor)
+    monkeypatch.setattr(
+        main, "write_catalog", lambda records, *args: catalogs.append(records)
+    )
+    monkeypatch.setattr(convert, "PDF_CACHE_DIR", str(tmp_path / "pdf_cache"))
+    monkeypatch.setattr(state, "CRAWL_STATE_DIR", str(tmp_path / "crawl_state"))
+    yield active, catalogs
+    client.set_client(previous_client)
+
+
+def test_parallel_crawl_reports_failures_per_command(ipea, tmp_path):
+    active, catalogs = ipea
+    result = main.lambda_handler({"crawl_workers": 4}, None)
+
+    assert result["statusCode"] == 207
+    assert list(result["failures"]) == [FAILING_JS]
+    assert result["failures"][FAILING_JS].startswith("HTTPError: 404")
+    assert result["upload_failures"] == {}
+
+    # Os demais comandos seguiram e cada um gravou seu próprio arquivo
+    records = catalogs[0]
+    assert len(records) == 23
+    for record in records:
+        with open(tmp_path / record["key"]) as f:
+            assert record["js"] in f.read()
+    assert 1 < active["max"] <= 4
+
+
+def test_pool_uses_headless_flag(ipea, monkeypatch):
+    pools = []
+    monkeypatch.setattr(
+        main, "DriverPool", lambda **kwargs: pools.append(FakePool(**kwargs)) or pools[-1]
+    )
+    monkeypatch.setattr(main, "HEADLESS", False)
+    main.lambda_handler({"crawl_workers": 3}, None)
+
+    assert [(pool.size, pool.headless) for pool in pools] == [(3, False)]
+
+
+@pytest.mark.parametrize(
+    "env, workers, headless",
+    [
+        ({}, 2, True),
+        ({"CRAWL_WORKERS": "6", "HEADLESS": "false"}, 6, False),
+        ({"HEADLESS": "0"}, 2, False),
+        ({"HEADLESS": "True"}, 2, True),
+    ],
+)
+def test_crawl_settings_from_environment(monkeypatch, env, workers, headless):
+    monkeypatch.delenv("CRAWL_WORKERS", raising=False)
+    monkeypatch.delenv("HEADLESS", raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    try:
+        importlib.reload(main)
+        assert (main.CRAWL_WORKERS, main.HEADLESS) == (workers, headless)
+    finally:
+        monkeypatch.undo()
+        importlib.reload(main)
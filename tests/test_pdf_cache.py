@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+from service import convert
+from service.client import HTTPClient, get_client, set_client
+from service.convert import PDFCache, convert_pdf_cached
+
+
+@pytest.fixture
+def client():
+    previous = get_client()
+    client = HTTPClient(pool_size=2, max_retries=0)
+    set_client(client)
+    yield client
+    client.close()
+    set_client(previous)
+
+
+@pytest.fixture
+def conversions(monkeypatch):
+    """Substitui o pdftohtml, registrando os PDFs convertidos"""
+    converted = []
+
+    def fake_pdf_to_html_string(content, mode=None, timeout=None):
+        converted.append(content)
+        return f"<p>{content.decode()}</p>"
+
+    monkeypatch.setattr(convert, "pdf_to_html_string", fake_pdf_to_html_string)
+    return converted
+
+
+@pytest.fixture
+def pdf_server(http_server):
+    """Serve /serie.pdf com ETag, respondendo 304 ao If-None-Match igual"""
+    http_server.pdf = {"etag": '"v1"', "body": b"PDF v1"}
+
+    def pdf(handler):
+        etag = http_server.pdf["etag"]
+        if handler.headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag}, http_server.pdf["body"]
+
+    http_server.routes["/serie.pdf"] = pdf
+    return http_server
+
+
+def test_not_modified_skips_conversion(tmp_path, client, conversions, pdf_server):
+    cache = PDFCache(str(tmp_path / "index.json"))
+    url = pdf_server.url("/serie.pdf")
+
+    assert convert_pdf_cached(url, cache, key="pdf/serie.html") == "<p>PDF v1</p>"
+    assert cache.get(url)["etag"] == '"v1"'
+    assert cache.get(url)["key"] == "pdf/serie.html"
+
+    assert convert_pdf_cached(url, cache, key="pdf/serie.html") is None
+    assert pdf_server.requests[-1][1]["If-None-Match"] == '"v1"'
+    assert conversions == [b"PDF v1"]
+
+
+def test_changed_etag_converts_again(tmp_path, client, conversions, pdf_server):
+    cache = PDFCache(str(tmp_path / "index.json"))
+    url = pdf_server.url("/serie.pdf")
+    convert_pdf_cached(url, cache)
+    cache.save()
+
+    pdf_server.pdf = {"etag": '"v2"', "body": b"PDF v2"}
+    cache = PDFCache(str(tmp_path / "index.json"))
+    assert convert_pdf_cached(url, cache) == "<p>PDF v2</p>"
+    assert pdf_server.requests[-1][1]["If-None-Match"] == '"v1"'
+    assert cache.get(url)["etag"] == '"v2"'
+    assert conversions == [b"PDF v1", b"PDF v2"]
+
+
+def test_same_content_with_new_etag_is_not_converted(
+    tmp_path, client, conversions, pdf_server
+):
+    cache = PDFCache(str(tmp_path / "index.json"))
+    url = pdf_server.url("/serie.pdf")
+    convert_pdf_cached(url, cache)
+
+    pdf_server.pdf["etag"] = '"v1-gzip"'
+    assert convert_pdf_cached(url, cache) is None
+    assert cache.get(url)["etag"] == '"v1-gzip"'
+    assert conversions == [b"PDF v1"]
+
+
+def test_save_drops_failed_uploads(tmp_path):
+    path = str(tmp_path / "index.json")
+    cache = PDFCache(path)
+    cache.put("http://a/1.pdf", {"sha256": "1", "key": "pdf/1.html"})
+    cache.put("http://a/2.pdf", {"sha256": "2", "key": "pdf/2.html"})
+    cache.save(failed_keys={"pdf/1.html": "timeout"})
+
+    with open(path) as f:
+        assert list(json.load(f)) == ["http://a/2.pdf"]
+    assert PDFCache(path).get("http://a/1.pdf") is None
@@ -0,0 +1,169 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from service import convert
+from service.client import HTTPClient, get_client, set_client
+from service.convert import PDFCache, PDFConversionService
+
+# pdftohtml falso: trava com PDFs que contêm "trava" e, nos demais, grava o
+# conteúdo do PDF em <saída>.html, como no modo "file"
+FAKE_PDFTOHTML = f"""#!{sys.executable}
+import os, sys, time
+pdf_path, output = sys.argv[-2:]
+with open(pdf_path) as f:
+    content = f.read()
+if "trava" in content:
+    with open(os.environ["PDFTOHTML_PID_FILE"], "w") as f:
+        f.write(str(os.getpid()))
+    time.sleep(60)
+with open(output + ".html", "w") as f:
+    f.write("<p>" + content + "</p>")
+"""
+
+
+class FakeUploader:
+    def __init__(self):
+        self.files = {}
+
+    def submit(self, key, content, content_type="text/html"):
+        self.files[key] = content
+
+
+@pytest.fixture
+def pdftohtml(tmp_path, monkeypatch):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "pdftohtml"
+    script.write_text(FAKE_PDFTOHTML)
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("PDFTOHTML_PID_FILE", str(tmp_path / "pid"))
+    monkeypatch.setattr(convert, "PDF_CONVERSION", "file")
+    return tmp_path
+
+
+def write_pdf(folder, name, content):
+    path = folder / name
+    path.write_text(content)
+    return str(path)
+
+
+def test_timeout_kills_stuck_conversion(pdftohtml):
+    ok = write_pdf(pdftohtml, "ok.pdf", "série")
+    stuck = write_pdf(pdftohtml, "trava.pdf", "trava")
+    uploader = FakeUploader()
+    service = PDFConversionService(uploader, num_workers=2, timeout=1)
+
+    start = time.monotonic()
+    assert service.submit(stuck, "pdf/trava.html")
+    assert service.submit(ok, "pdf/ok.html")
+    failures = service.close()
+
+    assert time.monotonic() - start < 10
+    assert list(failures) == [stuck]
+    assert "timed out" in failures[stuck]
+    assert "<p>série</p>" in uploader.files["pdf/ok.html"]
+    assert service.converted == 1
+    # O pdftohtml travado foi encerrado
+    with open(pdftohtml / "pid") as f:
+        pid = int(f.read())
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+
+
+def test_submit_converts_each_url_once(pdftohtml):
+    ok = write_pdf(pdftohtml, "ok.pdf", "série")
+    uploader = FakeUploader()
+    with PDFConversionService(uploader, num_workers=2) as service:
+        assert service.submit(ok, "pdf/ok.html")
+        assert not service.submit(ok, "pdf/outra.html")
+    assert list(uploader.files) == ["pdf/ok.html"]
+
+
+def test_bounded_queue_blocks_submit(monkeypatch):
+    release = threading.Event()
+
+    def slow_pdf_to_html_string(url, mode=None, timeout=None):
+        release.wait(5)
+        return f"<p>{url}</p>"
+
+    monkeypatch.setattr(convert, "pdf_to_html_string", slow_pdf_to_html_string)
+    uploader = FakeUploader()
+    service = PDFConversionService(uploader, num_workers=1, queue_size=1)
+    service.submit("1.pdf", "pdf/1.html")
+    producer = threading.Thread(
+        target=lambda: [service.submit(f"{i}.pdf", f"pdf/{i}.html") for i in (2, 3)]
+    )
+    producer.start()
+    producer.join(0.2)
+    # Uma conversão em andamento e uma na fila: a terceira espera
+    assert producer.is_alive()
+
+    release.set()
+    producer.join(5)
+    assert not producer.is_alive()
+    assert service.close() == {}
+    assert sorted(uploader.files) == ["pdf/1.html", "pdf/2.html", "pdf/3.html"]
+
+
+def test_close_stops_workers():
+    service = PDFConversionService(FakeUploader(), num_workers=3)
+    assert service.close() == {}
+    assert service.close() == {}
+    assert not any(thread.is_alive() for thread in service._threads)
+    with pytest.raises(RuntimeError):
+        service.submit("1.pdf", "pdf/1.html")
+
+
+def test_timeout_kills_stuck_pdfminer(pdftohtml, monkeypatch):
+    # Conversão do pdfminer que nunca termina
+    monkeypatch.setattr(convert, "PDF_CONVERSION", "pdfminer")
+    monkeypatch.setattr(
+        convert, "PDFMINER_ARGS", [sys.executable, "-c", "import time; time.sleep(60)"]
+    )
+    pdf = write_pdf(pdftohtml, "ok.pdf", "série")
+    service = PDFConversionService(FakeUploader(), num_workers=1, timeout=1)
+
+    start = time.monotonic()
+    service.submit(pdf, "pdf/ok.html")
+    failures = service.close()
+
+    assert time.monotonic() - start < 10
+    assert "timed out" in failures[pdf]
+
+
+@pytest.fixture
+def client():
+    previous = get_client()
+    client = HTTPClient(pool_size=2, max_retries=0)
+    set_client(client)
+    yield client
+    client.close()
+    set_client(previous)
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_timeout_stops_slow_download(cached, client, http_server, tmp_path):
+    def slow_pdf(handler):
+        def chunks():
+            for _ in range(20):
+                time.sleep(0.25)
+                yield b"x"
+
+        return 200, {"Content-Length": "20"}, chunks()
+
+    http_server.routes["/lento.pdf"] = slow_pdf
+    url = http_server.url("/lento.pdf")
+    cache = PDFCache(str(tmp_path / "index.json")) if cached else None
+    service = PDFConversionService(FakeUploader(), cache, num_workers=1, timeout=1)
+
+    start = time.monotonic()
+    service.submit(url, "pdf/lento.html")
+    failures = service.close()
+
+    assert time.monotonic() - start < 3
+    assert "Download excedeu" in failures[url]
@@ -0,0 +1,114 @@
+import os
+
+import pytest
+
+from service.index import INDEX_VARIANTS, CompactInvertedIndex, IndexAnalyzer
+from service.segment import (
+    SegmentInvertedIndex,
+    load_analyzer,
+    save_analyzer,
+    write_segment,
+)
+
+DOCUMENTS = {
+    "pib.html": "Produto interno bruto a preços de mercado",
+    "ipca.html": "Índice de preços ao consumidor amplo",
+    "selic.html": "Taxa de juros Selic fixada pelo Copom",
+}
+
+
+@pytest.fixture
+def analyzer(offline_processor):
+    analyzer = IndexAnalyzer(offline_processor(), dict(DOCUMENTS), backend="compact")
+    analyzer.create_indices(INDEX_VARIANTS)
+    return analyzer
+
+
+def test_save_analyzer_keeps_other_writers_temp_dir(analyzer, tmp_path):
+    # Gravação em andamento de outro processo com o mesmo fingerprint
+    other = tmp_path / "abc.tmp"
+    other.mkdir()
+    (other / "0.seg").write_bytes(b"parcial")
+
+    save_analyzer(analyzer, str(tmp_path / "abc"))
+
+    assert (other / "0.seg").read_bytes() == b"parcial"
+    assert sorted(os.listdir(tmp_path)) == ["abc", "abc.tmp"]
+    loaded = load_analyzer(str(tmp_path / "abc"), analyzer.processor, {})
+    assert sorted(loaded.indices) == sorted(analyzer.indices)
+
+
+def test_save_analyzer_keeps_existing_entry(analyzer, tmp_path):
+    directory = tmp_path / "abc"
+    save_analyzer(analyzer, str(directory))
+    inode = directory.stat().st_ino
+    manifest = (directory / "manifest.json").read_bytes()
+
+    # Outro processo que também não achou o cache grava o mesmo diretório
+    save_analyzer(analyzer, str(directory))
+
+    assert directory.stat().st_ino == inode
+    assert (directory / "manifest.json").read_bytes() == manifest
+    assert os.listdir(tmp_path) == ["abc"]
+
+
+def test_save_analyzer_replaces_incomplete_entry(analyzer, tmp_path):
+    directory = tmp_path / "abc"
+    directory.mkdir()
+    (directory / "0.seg").write_bytes(b"parcial")
+
+    save_analyzer(analyzer, str(directory))
+
+    assert (directory / "manifest.json").exists()
+    assert os.listdir(tmp_path) == ["abc"]
+
+
+def test_segment_round_trip(analyzer, tmp_path):
+    for name, index in analyzer.indices.items():
+        assert isinstance(index, CompactInvertedIndex)
+        filepath = str(tmp_path / f"{name}.seg")
+        write_segment(index, filepath)
+
+        segment = SegmentInvertedIndex(filepath)
+        try:
+            assert segment.total_docs == index.total_docs
+            assert segment.documents == index.documents
+            assert sorted(segment.vocabulary) == sorted(index.vocabulary)
+            for term in index.vocabulary:
+                assert segment.get_postings(term) == index.get_postings(term)
+                assert segment.get_max_term_frequency(term) == (
+                    index.get_max_term_frequency(term)
+                )
+            query = sorted(index.vocabulary)[:3] + ["inexistente"]
+            assert segment.rank_search(query) == index.rank_search(query)
+            assert segment.rank_search(query, top_k=2) == index.rank_search(query, top_k=2)
+
+            copy = segment.to_compact()
+            assert copy.documents == index.documents
+            assert copy.rank_search(query) == index.rank_search(query)
+        finally:
+            segment.close()
+
+
+@pytest.mark.parametrize("cut", [None, 4, 150, -8])
+def test_truncated_segment_is_rejected(analyzer, tmp_path, monkeypatch, cut):
+    filepath = tmp_path / "0.seg"
+    write_segment(next(iter(analyzer.indices.values())), str(filepath))
+    # Vazio, menor que o cabeçalho, só o cabeçalho e sem o fim da última seção
+    with open(filepath, "r+b") as f:
+        f.truncate(0 if cut is None else cut if cut > 0 else filepath.stat().st_size + cut)
+
+    closed = []
+    close = SegmentInvertedIndex.close
+    monkeypatch.setattr(
+        SegmentInvertedIndex, "close", lambda self: closed.append(self) or close(self)
+    )
+
+    open_fds = len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else None
+    with pytest.raises(ValueError, match="inválido ou incompatível"):
+        SegmentInvertedIndex(str(filepath))
+    if open_fds is not None:
+        assert len(os.listdir("/proc/self/fd")) == open_fds
+
+    assert len(closed) == 1
+    assert closed[0]._mmap is None
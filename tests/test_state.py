@@ -0,0 +1,69 @@
+import json
+
+from service.state import CrawlState
+
+
+def saved_run(path, pages):
+    """Execução que baixou e salvou as páginas: numero_js -> (período, conteúdo, chave)"""
+    state = CrawlState(path)
+    for numero_js, (periodo, content, key) in pages.items():
+        state.content_unchanged(numero_js, periodo, content, key)
+    state.save()
+    return CrawlState(path)
+
+
+def test_period_unchanged(tmp_path):
+    path = str(tmp_path / "series.json")
+    assert CrawlState(path).period_unchanged("1", "2000 - 2023") is False
+
+    state = saved_run(path, {"1": ("2000 - 2023", b"<html>1</html>", "ipea/1.html")})
+    assert state.period_unchanged("1", "2000 - 2023") is True
+    assert state.period_unchanged("1", "2000 - 2024") is False
+    assert state.period_unchanged("2", "2000 - 2023") is False
+    assert state.skipped_fetch == 1
+
+    forced = CrawlState(path, force=True)
+    assert forced.period_unchanged("1", "2000 - 2023") is False
+    assert forced.skipped_fetch == 0
+
+
+def test_content_unchanged(tmp_path):
+    path = str(tmp_path / "series.json")
+    state = saved_run(path, {"1": ("2000 - 2023", b"<html>1</html>", "ipea/1.html")})
+    updated_at = state.get("1")["updated_at"]
+
+    assert state.content_unchanged("1", "2000 - 2024", b"<html>1</html>", "ipea/1.html")
+    # O período é registrado mesmo sem envio; a data de atualização se mantém
+    assert state.get("1")["periodo"] == "2000 - 2024"
+    assert state.get("1")["updated_at"] == updated_at
+    assert state.skipped_upload == 1
+
+    assert not state.content_unchanged("1", "2000 - 2024", b"<html>1</html>", "ipea/1b.html")
+    assert not state.content_unchanged("1", "2000 - 2024", b"<html>novo</html>", "ipea/1b.html")
+    assert not state.content_unchanged("2", "2000 - 2023", b"<html>2</html>", "ipea/2.html")
+    assert state.skipped_upload == 1
+
+
+def test_save_drops_failed_uploads(tmp_path):
+    path = str(tmp_path / "series.json")
+    state = CrawlState(path)
+    state.content_unchanged("1", "2000 - 2023", b"<html>1</html>", "ipea/1.html")
+    state.content_unchanged("2", "2000 - 2023", b"<html>2</html>", "ipea/2.html")
+    state.save(failed_keys={"ipea/1.html": "timeout"})
+
+    with open(path) as f:
+        assert list(json.load(f)) == ["2"]
+    # A série cujo envio falhou é baixada de novo na próxima execução
+    state = CrawlState(path)
+    assert state.period_unchanged("1", "2000 - 2023") is False
+    assert state.period_unchanged("2", "2000 - 2023") is True
+
+
+def test_unreadable_state_starts_empty(tmp_path):
+    path = tmp_path / "series.json"
+    path.write_text("{corrompido")
+
+    state = CrawlState(str(path))
+    assert state.entries == {}
+    state.save()
+    assert json.loads(path.read_text()) == {}
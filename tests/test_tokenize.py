@@ -0,0 +1,39 @@
+import pytest
+from nltk.tokenize import word_tokenize
+
+from service.index import TextProcessor
+
+SAMPLES = [
+    "Índice Nacional de Preços ao Consumidor Amplo (IPCA) - variação mensal",
+    "PIB a preços de mercado: R$ 1.234.567,89 milhões (2010=100)",
+    "Taxa de juros - Selic - fixada pelo Copom - % a.a.",
+    'Série "histórica" da população economicamente ativa — região Nordeste',
+    "Fonte: IBGE/SCN; ver http://www.ipeadata.gov.br/ExibeSerie.aspx?serid=38590",
+    "Exportações (FOB) - US$ - 1º trim./2024 - 12,5% a.m.",
+    "crédito pró-cíclico, não-financeiro e sub-índice; d'água",
+    "Câmbio R$/US$ cannot gonna gimme lemme wanna gotta",
+    "",
+    "   \t\n",
+]
+
+
+@pytest.fixture(scope="module")
+def processor():
+    try:
+        return TextProcessor(tokenizer="nltk")
+    except LookupError as e:
+        pytest.skip(f"Dados do NLTK indisponíveis: {e}")
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_fast_tokenize_matches_nltk_pipeline(processor, text):
+    expected = processor.tokenize(processor.normalize_text(text))
+    assert TextProcessor.fast_tokenize(text) == expected
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_fast_tokenize_matches_word_tokenizer(text):
+    # O texto normalizado não tem pontuação, então é uma única sentença e o
+    # word_tokenize dispensa o punkt (preserve_line) sem mudar o resultado
+    expected = word_tokenize(TextProcessor.normalize_text(text), preserve_line=True)
+    assert TextProcessor.fast_tokenize(text) == expected
@@ -0,0 +1,109 @@
+import json
+import os
+
+import pytest
+
+from service.transform import HTMLFileMapper, iter_jsonl_records
+
+# Nomes em ordem inversa ao tamanho: os lotes (maiores primeiro) terminam fora
+# da ordem alfabética
+PAGES = {
+    "date=2024-01-01/serie_a/a.html": 1,
+    "date=2024-01-01/serie_a/b.html": 20,
+    "date=2024-01-01/serie_a/c.html": 400,
+    "date=2024-01-01/serie_b/d.html": 8000,
+    "pdf_to_html/date=2024-01-01/e.html": 3,
+    "pdf_to_html/date=2024-01-01/f.html": 5000,
+}
+
+
+def page(text, size):
+    return (
+        "<html><body><form><table><tr><td>x</td>"
+        f"<td>{text}<br/>{'z' * size}</td></tr></table></form></body></html>"
+    )
+
+
+@pytest.fixture
+def ipea_dir(tmp_path):
+    root = tmp_path / "ipea"
+    for rel_path, size in PAGES.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(page(rel_path, size), encoding="utf-8")
+    return root
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_jsonl_records_are_sorted_by_id(ipea_dir, tmp_path, incremental):
+    output = str(tmp_path / "map.jsonl")
+    mapper = HTMLFileMapper(ipea_dir, output, num_workers=2, incremental=incremental)
+    mapper.run()
+    if incremental:
+        # Reaproveitados e reprocessados se intercalam na segunda execução
+        (ipea_dir / "date=2024-01-01/serie_a/b.html").write_text("alterado")
+        HTMLFileMapper(ipea_dir, output, num_workers=2, incremental=True).run()
+
+    ids = [record["id"] for record in iter_jsonl_records(output)]
+    assert ids == sorted(ids)
+    assert len(ids) == len(PAGES)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_nested_json_files_are_sorted(ipea_dir, tmp_path):
+    output = str(tmp_path / "map.json")
+    HTMLFileMapper(ipea_dir, output, num_workers=2).run()
+
+    with open(output, encoding="utf-8") as f:
+        result = json.load(f)["ipea"]
+    names = [
+        list(files)
+        for main_content in result.values()
+        for files in main_content.values()
+    ]
+    assert names == [["a.html", "b.html", "c.html"], ["d.html"], ["e.html", "f.html"]]
+
+
+def mapped_records(output):
+    """Caminho relativo -> registro, no JSON Lines ou no JSON aninhado"""
+    if output.endswith(".jsonl"):
+        return {record["path"]: record for record in iter_jsonl_records(output)}
+    with open(output, encoding="utf-8") as f:
+        result = json.load(f)["ipea"]
+    return {
+        file_info["path"]: file_info
+        for main_content in result.values()
+        for files in main_content.values()
+        for file_info in files.values()
+    }
+
+
+@pytest.mark.parametrize("name", ["map.json", "map.jsonl"])
+def test_incremental_run_reuses_unchanged_files(ipea_dir, tmp_path, name):
+    output = str(tmp_path / name)
+    HTMLFileMapper(ipea_dir, output, num_workers=2, incremental=True).run()
+    before = mapped_records(output)
+
+    # Mesmo tamanho e mtime: reaproveitado sem ler o arquivo (o texto novo não aparece)
+    kept = ipea_dir / "date=2024-01-01/serie_a/a.html"
+    stat = kept.stat()
+    kept.write_text(kept.read_text().replace("serie_a/a", "serie_a/A"))
+    os.utime(kept, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    # Só o mtime mudou: reaproveitado pelo SHA-256, com o mtime atualizado
+    touched = ipea_dir / "date=2024-01-01/serie_b/d.html"
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    # Conteúdo novo é reprocessado; arquivo apagado sai do mapeamento
+    (ipea_dir / "date=2024-01-01/serie_a/c.html").write_text(page("novo", 10))
+    (ipea_dir / "date=2024-01-01/serie_a/b.html").unlink()
+
+    HTMLFileMapper(ipea_dir, output, num_workers=2, incremental=True).run()
+    after = mapped_records(output)
+
+    assert sorted(after) == sorted(set(before) - {"date=2024-01-01/serie_a/b.html"})
+    assert after["date=2024-01-01/serie_a/a.html"] == before["date=2024-01-01/serie_a/a.html"]
+    d_path = "date=2024-01-01/serie_b/d.html"
+    assert after[d_path]["mtime_ns"] == touched.stat().st_mtime_ns
+    assert after[d_path] == {**before[d_path], "mtime_ns": touched.stat().st_mtime_ns}
+    assert after["date=2024-01-01/serie_a/c.html"]["content"].startswith("novo\n")
+    e_path = "pdf_to_html/date=2024-01-01/e.html"
+    assert after[e_path] == before[e_path]
@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+
+pytest.importorskip("boto3")
+
+from service import upload
+from service.upload import S3Uploader
+
+
+class StubS3:
+    """Cliente S3 que falha as ``fail_times`` primeiras chamadas de cada chave"""
+
+    def __init__(self, fail_times=0, release=None):
+        self.fail_times = fail_times
+        self.release = release
+        self.attempts = {}
+        self.objects = {}
+        self.multipart = []
+        self._lock = threading.Lock()
+
+    def _attempt(self, key):
+        if self.release is not None:
+            self.release.wait(5)
+        with self._lock:
+            self.attempts[key] = self.attempts.get(key, 0) + 1
+            if self.attempts[key] <= self.fail_times:
+                raise ConnectionError("conexão encerrada")
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self._attempt(Key)
+        self.objects[Key] = (Body, ContentType)
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs=None, Config=None):
+        self._attempt(Key)
+        self.multipart.append(Key)
+        self.objects[Key] = (Fileobj.read(), ExtraArgs["ContentType"])
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(upload.time, "sleep", delays.append)
+    return delays
+
+
+def test_retries_with_exponential_backoff(sleeps):
+    s3 = StubS3(fail_times=2)
+    uploader = S3Uploader("bucket", num_workers=1, backoff=1, client=s3)
+    uploader.submit("ipea/serie.html", "<html>série</html>")
+
+    assert uploader.close() == {}
+    assert s3.attempts == {"ipea/serie.html": 3}
+    assert s3.objects["ipea/serie.html"] == (
+        "<html>série</html>".encode(),
+        "text/html",
+    )
+    assert uploader.uploaded == 1
+    # Espera base de 1s e 2s, mais um jitter de até a própria espera
+    assert 1 <= sleeps[0] <= 2
+    assert 2 <= sleeps[1] <= 4
+
+
+def test_failures_after_max_attempts(sleeps):
+    s3 = StubS3(fail_times=10)
+    uploader = S3Uploader("bucket", num_workers=2, max_attempts=3, client=s3)
+    uploader.submit("ipea/a.html", b"a")
+    uploader.submit("ipea/b.html", b"b")
+
+    failures = uploader.close()
+    assert sorted(failures) == ["ipea/a.html", "ipea/b.html"]
+    assert failures["ipea/a.html"] == "ConnectionError: conexão encerrada"
+    assert s3.attempts == {"ipea/a.html": 3, "ipea/b.html": 3}
+    assert uploader.uploaded == 0
+    assert len(sleeps) == 4
+
+
+def test_multipart_from_threshold():
+    s3 = StubS3()
+    uploader = S3Uploader("bucket", num_workers=1, multipart_threshold=10, client=s3)
+    uploader.submit("ipea/pequeno.html", b"123456789")
+    uploader.submit("ipea/grande.html", b"1234567890", "application/pdf")
+
+    assert uploader.close() == {}
+    assert s3.multipart == ["ipea/grande.html"]
+    assert s3.objects["ipea/grande.html"] == (b"1234567890", "application/pdf")
+    assert s3.objects["ipea/pequeno.html"] == (b"123456789", "text/html")
+
+
+def test_disk_fallback_without_bucket(tmp_path):
+    uploader = S3Uploader(num_workers=2)
+    key = str(tmp_path / "ipea" / "date=2024-07-01" / "serie.html")
+    uploader.submit(key, "conteúdo")
+
+    assert uploader.close() == {}
+    with open(key, encoding="utf-8") as f:
+        assert f.read() == "conteúdo"
+
+
+def test_bounded_queue_blocks_submit():
+    release = threading.Event()
+    s3 = StubS3(release=release)
+    uploader = S3Uploader("bucket", num_workers=1, queue_size=1, client=s3)
+    uploader.submit("ipea/1.html", b"1")
+    producer = threading.Thread(
+        target=lambda: [uploader.submit(f"ipea/{i}.html", b"x") for i in (2, 3)]
+    )
+    producer.start()
+    producer.join(0.2)
+    # Um arquivo em envio e um na fila: o terceiro espera
+    assert producer.is_alive()
+
+    release.set()
+    producer.join(5)
+    assert not producer.is_alive()
+    assert uploader.close() == {}
+    assert sorted(s3.objects) == ["ipea/1.html", "ipea/2.html", "ipea/3.html"]
+
+
+def test_submit_after_close():
+    uploader = S3Uploader(num_workers=1)
+    uploader.close()
+    with pytest.raises(RuntimeError):
+        uploader.submit("ipea/serie.html", b"")